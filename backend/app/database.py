@@ -1,27 +1,434 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
+from pymongo.errors import OperationFailure, PyMongoError
+import asyncio
+import importlib.util
+import inspect
+import logging
 import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Union
 from dotenv import load_dotenv
+from metrics import mongo_command_metrics
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Python module each wire compressor needs (zlib ships with Python)
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters fed by the driver's CMAP events.
+
+    Events arrive on driver threads, so updates take a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pools = 0
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.pool_clears = 0
+        self.created = 0
+        self.closed = 0
+
+    def pool_created(self, event):
+        with self._lock:
+            self.pools += 1
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pools": self.pools,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "pool_clears": self.pool_clears,
+                "connections_created": self.created,
+                "connections_closed": self.closed
+            }
+
 class Database:
     client: AsyncIOMotorClient = None
     database = None
+    options: dict = {}
+    warmed_up: bool = False
+    warm_up_task: Optional[asyncio.Task] = None
+    # Problems from the last ensure_indexes run (None until it has run)
+    index_problems: Optional[List[str]] = None
 
 db = Database()
+pool_stats = PoolStats()
 
 async def get_database():
     return db.database
 
-async def connect_to_mongo():
-    """Create database connection"""
-    db.client = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+def available_compressors(requested: str) -> list:
+    """Keep the requested compressors whose Python package is installed, in order"""
+    compressors = []
+    for name in (item.strip() for item in requested.split(",")):
+        module = COMPRESSOR_MODULES.get(name)
+        if module and importlib.util.find_spec(module) is not None:
+            compressors.append(name)
+    return compressors
+
+def client_options() -> dict:
+    """
+    Pool, timeout and compression settings for the Motor client.
+
+    Configuration (environment variables):
+        MONGO_MAX_POOL_SIZE: connections per server (default: 100)
+        MONGO_MIN_POOL_SIZE: connections kept open while idle (default: 10)
+        MONGO_MAX_IDLE_TIME_MS: close idle connections after this (default: 300000)
+        MONGO_SERVER_SELECTION_TIMEOUT_MS: fail fast when no server is reachable (default: 5000)
+        MONGO_CONNECT_TIMEOUT_MS: TCP/TLS connect timeout (default: 10000)
+        MONGO_WAIT_QUEUE_TIMEOUT_MS: max wait for a free pooled connection (default: 10000)
+        MONGO_COMPRESSORS: preferred wire compressors (default: zstd,snappy,zlib;
+            ones whose package is not installed are skipped)
+    """
+    options = {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "10")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000")),
+    }
+    compressors = available_compressors(os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib"))
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+async def warm_up(connections: int) -> float:
+    """Ping until `connections` pooled connections are established; returns seconds taken"""
+    started = time.perf_counter()
+    # Concurrent pings force the pool to open (and TLS-handshake) that many connections now
+    await asyncio.gather(*(db.client.admin.command("ping") for _ in range(max(connections, 1))))
+    db.warmed_up = True
+    return time.perf_counter() - started
+
+async def keep_warming_up(connections: int, after_warm_up: Optional[Callable[[], Awaitable[None]]] = None):
+    """
+    Retry warm-up with backoff until it succeeds, then run `after_warm_up`.
+
+    Readiness reports not-ready until the pool is warm, so a warm-up that
+    failed at startup (e.g. MongoDB briefly unreachable during a deploy)
+    must not leave the instance out of rotation for the life of the process.
+    """
+    delay = 1.0
+    while not db.warmed_up:
+        try:
+            elapsed = await warm_up(connections)
+            logger.info("mongo.warmed_up", extra={"connections": connections, "duration_ms": round(elapsed * 1000)})
+        except Exception as e:
+            logger.warning("mongo.warm_up_failed", extra={"error": str(e), "retry_in_s": delay})
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+    if after_warm_up is not None:
+        await after_warm_up()
+
+async def connect_to_mongo(after_warm_up: Optional[Callable[[], Awaitable[None]]] = None):
+    """
+    Create database connection
+
+    `after_warm_up` (e.g. index creation) runs once the pool is warm: before
+    returning when MongoDB is reachable now, otherwise from the background
+    retry, so an unreachable server never aborts startup.
+    """
+    db.options = client_options()
+    db.client = AsyncIOMotorClient(
+        os.getenv("MONGODB_URL"),
+        event_listeners=[pool_stats, mongo_command_metrics],
+        **db.options
+    )
     db.database = db.client[os.getenv("DATABASE_NAME")]
-    print(f"Connected to MongoDB at {os.getenv('MONGODB_URL')}")
+    logger.info("mongo.connected", extra={"database": os.getenv("DATABASE_NAME")})
+
+    # Pay connection setup before serving traffic instead of on the first requests
+    warm_connections = int(os.getenv("MONGO_WARMUP_CONNECTIONS", str(db.options["minPoolSize"])))
+    try:
+        elapsed = await warm_up(warm_connections)
+        logger.info("mongo.warmed_up", extra={"connections": warm_connections, "duration_ms": round(elapsed * 1000)})
+    except Exception as e:
+        logger.warning("mongo.warm_up_failed", extra={"error": str(e)})
+        # Keep trying in the background; readiness stays 503 until one succeeds
+        db.warm_up_task = asyncio.create_task(keep_warming_up(warm_connections, after_warm_up))
+        return
+    if after_warm_up is not None:
+        await after_warm_up()
+
+# Server error codes meaning change streams are unavailable (standalone server / unsupported)
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324}
+# Server error codes meaning the saved resume token can no longer be used
+RESUME_TOKEN_LOST = {136, 280, 286}
+# Documents read per query by the polling fallback
+POLL_PAGE_SIZE = 500
+# Lower bound for polling an empty collection
+POLL_EPOCH = datetime(1970, 1, 1)
+
+ChangeHandler = Callable[[dict], Union[None, Awaitable[None]]]
+
+class ChangeListener:
+    """
+    Feeds writes made by any instance to local cache invalidation handlers.
+
+    On a replica set one database-level change stream covers every watched
+    collection. Its resume token is saved in `change_stream_state` (one
+    document per instance), so a restart or dropped connection picks up where
+    it stopped. If the token has expired, the stream restarts from now and
+    handlers receive a `reset` change so they can drop everything. On a
+    standalone server (local development) change streams are unavailable, so
+    the listener polls each collection for documents whose `updated_at`
+    moved past the last one seen, paging on (updated_at, _id) and re-reading
+    a short lookback window so writes that commit late are not skipped; a
+    first poll starts from the newest `updated_at` in the collection rather
+    than the local clock. Deletes are not visible in that mode.
+
+    Handlers receive {"collection", "operation", "document_id", "document"}
+    where `document` is the full post-change document (None for deletes and
+    resets) and may be sync or async.
+
+    Configuration (environment variables):
+        CHANGE_STREAMS: auto, on (never poll) or off (always poll) (default: auto)
+        CHANGE_POLL_SECONDS: polling interval for the fallback (default: 2)
+        CHANGE_POLL_LOOKBACK_SECONDS: window re-read by each poll (default: 10)
+        INSTANCE_NAME: key of this instance's saved resume state (default: hostname)
+    """
+
+    def __init__(self):
+        self.mode = os.getenv("CHANGE_STREAMS", "auto").lower()
+        self.poll_interval = float(os.getenv("CHANGE_POLL_SECONDS", "2"))
+        self.poll_lookback = timedelta(seconds=float(os.getenv("CHANGE_POLL_LOOKBACK_SECONDS", "10")))
+        self.instance = os.getenv("INSTANCE_NAME", socket.gethostname())
+        self.handlers: Dict[str, List[ChangeHandler]] = {}
+        self.source: Optional[str] = None  # "change_stream" or "polling" once running
+        self.changes = 0
+        self.errors = 0
+        self._resume_token = None
+        self._task: Optional[asyncio.Task] = None
+
+    def on(self, collection: str, handler: ChangeHandler):
+        """Call `handler` for every change to `collection`"""
+        self.handlers.setdefault(collection, []).append(handler)
+
+    def start(self):
+        if self._task is None and self.handlers:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Keep the latest position, which the per-second save may not have written yet
+        if self._resume_token is not None:
+            try:
+                await self._save_state(resume_token=self._resume_token)
+            except PyMongoError:
+                pass
+
+    async def _dispatch(self, change: dict):
+        self.changes += 1
+        for handler in self.handlers.get(change["collection"], []):
+            try:
+                result = handler(change)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                self.errors += 1
+                logger.exception("changes.handler_failed", extra={"collection": change["collection"]})
+
+    async def _reset(self):
+        """Changes were missed: tell every handler to drop what it holds"""
+        for collection in self.handlers:
+            await self._dispatch({"collection": collection, "operation": "reset", "document_id": None, "document": None})
+
+    async def _load_state(self) -> dict:
+        return await db.database.change_stream_state.find_one({"_id": self.instance}) or {}
+
+    async def _save_state(self, **fields):
+        await db.database.change_stream_state.update_one({"_id": self.instance}, {"$set": fields}, upsert=True)
+
+    async def _run(self):
+        while True:
+            try:
+                if self.mode != "off" and self.source != "polling":
+                    try:
+                        await self._watch()
+                        continue
+                    except OperationFailure as e:
+                        if e.code not in CHANGE_STREAMS_UNSUPPORTED or self.mode == "on":
+                            raise
+                        logger.info("changes.polling_fallback", extra={"reason": str(e)})
+                await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                self.errors += 1
+                logger.warning("changes.listener_failed", extra={"error": str(e)})
+                await asyncio.sleep(self.poll_interval)
+
+    async def _watch(self):
+        """Follow the change stream until it fails; returns after discarding an expired resume token"""
+        # Within a process resume from memory; after a restart from the saved state
+        token = self._resume_token or (await self._load_state()).get("resume_token")
+        pipeline = [{"$match": {"ns.coll": {"$in": list(self.handlers)}}}]
+        saved_at = time.monotonic()
+        try:
+            async with db.database.watch(pipeline, full_document="updateLookup", resume_after=token) as stream:
+                self.source = "change_stream"
+                async for event in stream:
+                    await self._dispatch({
+                        "collection": event["ns"]["coll"],
+                        "operation": event["operationType"],
+                        "document_id": event.get("documentKey", {}).get("_id"),
+                        "document": event.get("fullDocument")
+                    })
+                    self._resume_token = stream.resume_token
+                    # Persist the position at most once a second rather than once per change
+                    if time.monotonic() - saved_at >= 1:
+                        await self._save_state(resume_token=self._resume_token)
+                        saved_at = time.monotonic()
+        except OperationFailure as e:
+            if token is None or e.code not in RESUME_TOKEN_LOST:
+                raise
+            logger.warning("changes.resume_token_lost", extra={"error": str(e)})
+            self._resume_token = None
+            await self._save_state(resume_token=None)
+            await self._reset()
+
+    async def _latest_update(self, collection: str) -> datetime:
+        """Newest `updated_at` in a collection, so a first poll starts from the database's clock"""
+        document = await db.database[collection].find_one(
+            {"updated_at": {"$exists": True}},
+            projection={"updated_at": 1},
+            sort=[("updated_at", -1)]
+        )
+        return document["updated_at"] if document else POLL_EPOCH
+
+    async def _poll_collection(self, collection: str, since: datetime, seen: Dict) -> datetime:
+        """
+        Dispatch documents updated at or after `since` minus the lookback,
+        skipping (_id, updated_at) pairs already dispatched; returns the
+        newest `updated_at` seen.
+        """
+        start = max(since - self.poll_lookback, POLL_EPOCH)
+        query = {"updated_at": {"$gte": start}}
+        newest = since
+        while True:
+            page = await db.database[collection].find(query).sort(
+                [("updated_at", 1), ("_id", 1)]
+            ).limit(POLL_PAGE_SIZE).to_list(POLL_PAGE_SIZE)
+            for document in page:
+                newest = max(newest, document["updated_at"])
+                if seen.get(document["_id"]) == document["updated_at"]:
+                    continue
+                seen[document["_id"]] = document["updated_at"]
+                await self._dispatch({
+                    "collection": collection,
+                    "operation": "update",
+                    "document_id": document["_id"],
+                    "document": document
+                })
+            if len(page) < POLL_PAGE_SIZE:
+                break
+            # Documents sharing one updated_at (a bulk write) may straddle pages, so
+            # continue after the last (updated_at, _id) pair rather than the timestamp
+            last = page[-1]
+            query = {"$or": [
+                {"updated_at": {"$gt": last["updated_at"]}},
+                {"updated_at": last["updated_at"], "_id": {"$gt": last["_id"]}}
+            ]}
+        # Anything older than the lookback is never queried again
+        horizon = newest - self.poll_lookback
+        for document_id in [key for key, updated_at in seen.items() if updated_at < horizon]:
+            del seen[document_id]
+        return newest
+
+    async def _poll(self):
+        self.source = "polling"
+        polled_until = (await self._load_state()).get("polled_until", {})
+        last_seen = {}
+        for collection in self.handlers:
+            last_seen[collection] = polled_until.get(collection) or await self._latest_update(collection)
+        seen = {collection: {} for collection in self.handlers}
+        while True:
+            for collection in self.handlers:
+                last_seen[collection] = await self._poll_collection(collection, last_seen[collection], seen[collection])
+            await self._save_state(polled_until=last_seen)
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> dict:
+        return {"source": self.source, "instance": self.instance, "changes": self.changes, "errors": self.errors}
+
+change_listener = ChangeListener()
 
 async def close_mongo_connection():
     """Close database connection"""
+    if db.warm_up_task is not None:
+        db.warm_up_task.cancel()
+        db.warm_up_task = None
     if db.client:
         db.client.close()
-        print("Disconnected from MongoDB")
+        db.warmed_up = False
+        logger.info("mongo.disconnected")
@@ -0,0 +1,187 @@
+"""
+MongoDB index declarations.
+
+Every query shape the routers and background workers issue is listed here
+together with the index that serves it. Listing indexes end in
+(created_at, _id) so both the legacy sort and keyset pagination
+(app.utils.pagination.KEYSET_SORT) avoid in-memory sorts. `ensure_indexes`
+creates them at startup (create_indexes is a no-op for indexes that already
+exist) and `diagnose_indexes` reports anything missing plus the explain()
+plan for each query shape, flagging collection scans and in-memory sorts.
+"""
+import logging
+from typing import Dict, List, Optional
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # get_current_user / login / register look users up by email
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        # get_users keyset pagination
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created"),
+        # Change listener polling fallback (standalone servers)
+        IndexModel([("updated_at", ASCENDING)], name="updated"),
+    ],
+    "requests": [
+        # Employees: own requests, newest first (optionally by status)
+        IndexModel([("employee_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="employee_created"),
+        IndexModel(
+            [("employee_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="employee_status_created"
+        ),
+        # Managers: the $or branch for requests awaiting their approval
+        IndexModel([("current_approver_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="approver_created"),
+        IndexModel(
+            [("current_approver_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="approver_status_created"
+        ),
+        # HR/Admin: everything, optionally filtered by status
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="status_created"
+        ),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created"),
+        # Change listener polling fallback (standalone servers)
+        IndexModel([("updated_at", ASCENDING)], name="updated"),
+    ],
+    "approval_events": [
+        # Request detail view: one request's history in decision order
+        IndexModel([("request_id", ASCENDING), ("approved_at", ASCENDING), ("_id", ASCENDING)], name="request_approved"),
+        # Audits of one approver's decisions, newest first
+        IndexModel([("approver_id", ASCENDING), ("approved_at", DESCENDING)], name="approver_approved"),
+    ],
+    "email_outbox": [
+        # Worker claims due messages in next_attempt_at order
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt"),
+    ],
+    "notification_digest_items": [
+        IndexModel([("window_end", ASCENDING), ("claimed_by", ASCENDING)], name="window_claim"),
+        IndexModel([("claimed_by", ASCENDING)], name="claimed_by"),
+    ],
+}
+
+# Representative query shapes, checked with explain() by diagnose_indexes
+QUERY_SHAPES = [
+    {
+        "name": "current user by email",
+        "collection": "users",
+        "filter": {"email": "user@example.com"},
+    },
+    {
+        "name": "employee requests",
+        "collection": "requests",
+        "filter": {"employee_id": "employee_id"},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "employee requests by status",
+        "collection": "requests",
+        "filter": {"employee_id": "employee_id", "status": "pending"},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "manager requests (own or awaiting approval)",
+        "collection": "requests",
+        "filter": {"$or": [{"employee_id": "manager_id"}, {"current_approver_id": "manager_id"}]},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "all requests by status",
+        "collection": "requests",
+        "filter": {"status": "pending"},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "all requests",
+        "collection": "requests",
+        "filter": {},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "users page",
+        "collection": "users",
+        "filter": {},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "request approval history",
+        "collection": "approval_events",
+        "filter": {"request_id": "request_id"},
+        "sort": [("approved_at", ASCENDING), ("_id", ASCENDING)],
+    },
+    {
+        "name": "approver decisions",
+        "collection": "approval_events",
+        "filter": {"approver_id": "approver_id"},
+        "sort": [("approved_at", DESCENDING)],
+    },
+]
+
+async def ensure_indexes(database) -> List[str]:
+    """Create all declared indexes; returns a list of problems (empty when all is well)"""
+    problems = []
+    for collection_name, models in INDEXES.items():
+        try:
+            await database[collection_name].create_indexes(models)
+        except OperationFailure as e:
+            # e.g. duplicate emails blocking the unique index, or a conflicting definition
+            problems.append(f"{collection_name}: {e}")
+            logger.warning("indexes.create_failed", extra={"collection": collection_name, "error": str(e)})
+        except PyMongoError as e:
+            # Server unreachable: the remaining collections would only wait out the same timeout
+            problems.append(f"{collection_name}: {e}")
+            logger.warning("indexes.create_failed", extra={"collection": collection_name, "error": str(e)})
+            break
+    return problems
+
+def _plan_stages(plan: dict) -> List[str]:
+    """Flatten an explain() winning plan into its list of stage names"""
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+async def diagnose_indexes(database, creation_problems: Optional[List[str]] = None) -> dict:
+    """
+    Report missing indexes and the winning plan for each declared query shape,
+    along with the problems the startup `ensure_indexes` run returned
+    """
+    missing = {}
+    for collection_name, models in INDEXES.items():
+        existing = await database[collection_name].index_information()
+        absent = [model.document["name"] for model in models if model.document["name"] not in existing]
+        if absent:
+            missing[collection_name] = absent
+
+    plans = []
+    for shape in QUERY_SHAPES:
+        cursor = database[shape["collection"]].find(shape["filter"])
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        explain = await cursor.explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning_plan)
+        plans.append({
+            "name": shape["name"],
+            "collection": shape["collection"],
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages,
+            "in_memory_sort": "SORT" in stages,
+        })
+
+    return {
+        "missing_indexes": missing,
+        "creation_problems": creation_problems,
+        "query_plans": plans,
+        "healthy": (
+            not missing
+            and not creation_problems
+            and not any(p["collection_scan"] or p["in_memory_sort"] for p in plans)
+        ),
+    }
@@ -1,7 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, requests, users
-from app.database import connect_to_mongo, close_mongo_connection
+from app.routers import auth, requests, users, reports, diagnostics, events
+from app.database import connect_to_mongo, close_mongo_connection, get_database, db, pool_stats, change_listener
+from app.indexes import ensure_indexes
+from app.utils.outbox import email_outbox
+from app.utils.digest import digest_scheduler
+from app.utils.auth import password_pool
+import health
+from metrics import metrics, metrics_response, MetricsMiddleware
+from app.utils.principal_cache import principal_cache
+from logs import log_pipeline, RequestContextMiddleware
 import os
 from dotenv import load_dotenv
 
@@ -23,24 +31,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latency histograms, in-flight gauge and status counts for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Correlation IDs and sampled access logs (outermost, so every log line carries the ID)
+app.add_middleware(RequestContextMiddleware)
+
+def collect_runtime_gauges():
+    """Pool, cache and queue state sampled at scrape time"""
+    stats = pool_stats.snapshot()
+    cache = principal_cache.stats()
+    return [
+        ("mongo_pool_connections_open", "Open pooled MongoDB connections", {}, stats["open_connections"]),
+        ("mongo_pool_connections_checked_out", "MongoDB connections in use", {}, stats["checked_out"]),
+        ("mongo_pool_waiters", "Operations waiting for a pooled connection", {}, stats["waiting"]),
+        ("principal_cache_entries", "Users held in the authenticated-user cache", {}, cache["entries"]),
+        ("password_pool_pending", "bcrypt calls running or queued", {}, password_pool.pending),
+    ]
+
+metrics.register_collector(collect_runtime_gauges)
+
+async def create_indexes():
+    # Kept for /api/diagnostics/indexes: a missing unique index is otherwise only logged
+    db.index_problems = await ensure_indexes(await get_database())
+
 # Database connection events
 @app.on_event("startup")
 async def startup_db_client():
-    await connect_to_mongo()
+    log_pipeline.start()
+    # Indexes are created once MongoDB answers, which may be after startup
+    await connect_to_mongo(after_warm_up=create_indexes)
+    email_outbox.start()
+    digest_scheduler.start()
+    # Writes from other instances invalidate this instance's caches and reach its event streams
+    change_listener.on("users", principal_cache.apply_change)
+    change_listener.on("users", events.revoke_user_streams)
+    change_listener.on("requests", requests.relay_request_change)
+    change_listener.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await change_listener.stop()
+    await digest_scheduler.stop()
+    await email_outbox.stop()
     await close_mongo_connection()
+    password_pool.shutdown()
+    log_pipeline.stop()
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(requests.router, prefix="/api/requests", tags=["requests"])
+app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(diagnostics.router, prefix="/api/diagnostics", tags=["diagnostics"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
 
 @app.get("/")
 async def root():
     return {"message": "Payment Management System API", "status": "running"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus text-format metrics"""
+    return metrics_response()
+
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
-    return {"status": "healthy"}
+    """Liveness: the process is running"""
+    return health.liveness()
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: MongoDB reachable and fast, pool not saturated, outbox keeping up"""
+    if db.client is None:
+        return await health.readiness({"mongo": {"ok": False, "error": "not connected"}})
+    return await health.readiness({
+        "warm_up": {"ok": db.warmed_up},
+        "mongo": health.check_mongo(db.client),
+        "pool": health.check_pool(pool_stats.snapshot(), db.options["maxPoolSize"]),
+        "email_outbox": health.check_backlog(email_outbox.backlog())
+    })
@@ -1,6 +1,6 @@
 # Models package
-from .user import User, UserCreate, UserLogin, UserUpdate, UserRole
-from .request import PaymentRequest, RequestCreate, RequestUpdate, RequestApproval, RequestType, RequestStatus, ApprovalHistory
+from .user import User, UserCreate, UserLogin, UserUpdate, UserRole, NotificationFrequency, UserPage
+from .request import PaymentRequest, RequestCreate, RequestUpdate, RequestApproval, RequestType, RequestStatus, ApprovalHistory, RequestPage, BulkApproval, BulkApprovalItem, BulkApprovalResult
 
 __all__ = [
     "User",
@@ -8,11 +8,17 @@ __all__ = [
     "UserLogin",
     "UserUpdate",
     "UserRole",
+    "NotificationFrequency",
+    "UserPage",
     "PaymentRequest",
     "RequestCreate",
     "RequestUpdate", 
     "RequestApproval",
     "RequestType",
     "RequestStatus",
-    "ApprovalHistory"
+    "ApprovalHistory",
+    "RequestPage",
+    "BulkApproval",
+    "BulkApprovalItem",
+    "BulkApprovalResult"
 ]
@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
+import os
 
 class RequestType(str, Enum):
     OVERTIME = "overtime"
@@ -19,6 +20,7 @@ class RequestStatus(str, Enum):
     PAID = "paid"
 
 class ApprovalHistory(BaseModel):
+    """One approval decision, stored in the `approval_events` collection"""
     approver_id: str
     approver_name: str
     status: RequestStatus
@@ -35,13 +37,16 @@ class PaymentRequest(BaseModel):
     description: str
     supporting_documents: Optional[List[str]] = []  # URLs or file paths
     status: RequestStatus = RequestStatus.PENDING
+    # Filled in by the detail view from `approval_events` (plus any entries embedded by older versions)
     approval_history: List[ApprovalHistory] = []
+    latest_decision: Optional[ApprovalHistory] = None
     current_approver_id: Optional[str] = None
     rejection_reason: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     requested_payment_date: Optional[datetime] = None
     actual_payment_date: Optional[datetime] = None
+    version: int = 0  # Incremented by every approval transition
 
     class Config:
         populate_by_name = True
@@ -57,6 +62,10 @@ class PaymentRequest(BaseModel):
             }
         }
 
+class RequestPage(BaseModel):
+    items: List[PaymentRequest]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` for the next page; None at the end
+
 class RequestCreate(BaseModel):
     request_type: RequestType
     amount: float
@@ -73,3 +82,23 @@ class RequestUpdate(BaseModel):
 class RequestApproval(BaseModel):
     status: RequestStatus
     comments: Optional[str] = None
+    expected_version: Optional[int] = None  # Reject with 409 if the request changed since it was read
+
+# Most requests one bulk approval call may decide
+BULK_APPROVAL_LIMIT = int(os.getenv("BULK_APPROVAL_LIMIT", "500"))
+
+class BulkApproval(BaseModel):
+    request_ids: List[str] = Field(min_length=1, max_length=BULK_APPROVAL_LIMIT)
+    status: RequestStatus
+    comments: Optional[str] = None
+
+class BulkApprovalItem(BaseModel):
+    request_id: str
+    result: str  # updated, not_found, forbidden, conflict or invalid_id
+    status: Optional[RequestStatus] = None  # Status after the call, when the request exists
+    version: Optional[int] = None
+
+class BulkApprovalResult(BaseModel):
+    updated: int
+    failed: int
+    results: List[BulkApprovalItem]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
 
@@ -9,6 +9,12 @@ class UserRole(str, Enum):
     HR = "hr"
     ADMIN = "admin"
 
+class NotificationFrequency(str, Enum):
+    IMMEDIATE = "immediate"
+    HOURLY = "hourly"
+    DAILY = "daily"
+    WEEKLY = "weekly"
+
 class User(BaseModel):
     id: Optional[str] = Field(alias="_id")
     email: EmailStr
@@ -17,6 +23,7 @@ class User(BaseModel):
     department: Optional[str] = None
     manager_id: Optional[str] = None
     is_active: bool = True
+    notifications: Optional[Dict[str, Any]] = None  # e.g. {"notificationFrequency": "daily"}
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -32,6 +39,10 @@ class User(BaseModel):
             }
         }
 
+class UserPage(BaseModel):
+    items: List[User]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` for the next page; None at the end
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
@@ -49,3 +60,4 @@ class UserUpdate(BaseModel):
     department: Optional[str] = None
     manager_id: Optional[str] = None
     is_active: Optional[bool] = None
+    notifications: Optional[Dict[str, Any]] = None
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from app.models import User, UserCreate, UserLogin
-from app.utils.auth import verify_password, get_password_hash, create_access_token, verify_token
+from app.utils.auth import (
+    verify_password, get_password_hash, create_access_token, verify_token,
+    password_pool, PasswordPoolBusyError
+)
 from app.database import get_database
-from datetime import timedelta
+from app.utils.principal_cache import principal_cache
+from datetime import datetime, timedelta
 import os
 
 router = APIRouter()
@@ -21,12 +25,29 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     if email is None:
         raise credentials_exception
     
+    cached = principal_cache.get(email)
+    if cached is not None:
+        return cached
+    
     db = await get_database()
     user = await db.users.find_one({"email": email})
     if user is None:
         raise credentials_exception
     
-    return User(**user)
+    current_user = User(**user)
+    principal_cache.put(email, current_user)
+    return current_user
+
+async def run_password_work(func, *args):
+    """Run bcrypt work off the event loop; 503 with Retry-After when the pool sheds it"""
+    try:
+        return await password_pool.run(func, *args)
+    except PasswordPoolBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
 @router.post("/register", response_model=dict)
 async def register(user: UserCreate):
@@ -42,13 +63,15 @@ async def register(user: UserCreate):
         )
     
     # Hash password and create user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await run_password_work(get_password_hash, user.password)
     user_dict = user.dict(exclude={"password"})  # Exclude password from dict
     
     user_doc = {
         **user_dict,
         "hashed_password": hashed_password,
-        "is_active": True
+        "is_active": True,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
     }
     
     result = await db.users.insert_one(user_doc)
@@ -68,7 +91,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     except Exception:
         # Fallback to in-memory mock authentication
         from app.auth_mock import verify_user_credentials
-        user = verify_user_credentials(form_data.username, form_data.password)
+        user = await run_password_work(verify_user_credentials, form_data.username, form_data.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -77,7 +100,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             )
     else:
         # MongoDB authentication
-        if not user or not verify_password(form_data.password, user["hashed_password"]):
+        if not user or not await run_password_work(verify_password, form_data.password, user["hashed_password"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.models import User
+from app.routers.auth import get_current_user
+from app.database import get_database, db, pool_stats, change_listener
+from app.indexes import diagnose_indexes
+from app.utils.principal_cache import principal_cache
+
+router = APIRouter()
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    """Diagnostics are restricted to admins"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
+@router.get("/indexes")
+async def index_diagnostics(current_user: User = Depends(require_admin)):
+    """Report missing indexes, startup index creation problems and explain() plans for the API's query shapes"""
+    database = await get_database()
+    return await diagnose_indexes(database, db.index_problems)
+
+@router.get("/principal-cache")
+async def principal_cache_stats(current_user: User = Depends(require_admin)):
+    """Hit/miss counters for the authenticated-user cache"""
+    return principal_cache.stats()
+
+@router.get("/pool")
+async def connection_pool_stats(current_user: User = Depends(require_admin)):
+    """MongoDB client pool settings and live CMAP counters"""
+    return {
+        "options": db.options,
+        "warmed_up": db.warmed_up,
+        "stats": pool_stats.snapshot()
+    }
+
+@router.get("/changes")
+async def change_listener_stats(current_user: User = Depends(require_admin)):
+    """Whether cache invalidation follows a change stream or polls, and its counters"""
+    return change_listener.stats()
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.models import User
+from app.routers.auth import get_current_user
+from app.routers.diagnostics import require_admin
+from app.utils.auth import token_expiry
+from events import request_events, EventHubFullError
+
+router = APIRouter()
+
+@router.get("/stream")
+async def stream_request_events(token: str = Query(...)):
+    """
+    Server-Sent Events for request.created / request.decided.
+
+    EventSource cannot send an Authorization header, so the access token is
+    passed as `token`. Employees receive events for their own requests,
+    managers for their own and those awaiting their approval, HR/admin for
+    every request, matching GET /api/requests. The stream ends with an
+    `expired` event when the token expires, and is closed if the user's
+    role changes or the account is removed or disabled.
+    """
+    current_user = await get_current_user(token)
+    try:
+        return request_events.stream(current_user.id, current_user.role, token_expiry(token))
+    except EventHubFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event streams, please retry shortly",
+            headers={"Retry-After": "5"}
+        )
+
+def revoke_user_streams(change: dict):
+    """
+    Change listener handler for the users collection: close the streams of a
+    user whose role changed or who was removed or disabled, on any instance.
+    """
+    if change["operation"] == "reset":
+        # Changes may have been missed; every stream reconnects and re-authenticates
+        request_events.revoke_all()
+        return
+    document = change["document"]
+    user_id = str(change["document_id"])
+    if document is None or document.get("is_active") is False:
+        request_events.revoke(user_id)
+    else:
+        request_events.revoke(user_id, document.get("role"))
+
+@router.get("/stats")
+async def event_stream_stats(current_user: User = Depends(require_admin)):
+    """Open streams and fan-out counters for this instance"""
+    return request_events.stats()
@@ -0,0 +1,204 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.models import User, RequestStatus
+from app.routers.auth import get_current_user
+from app.routers.requests import visible_requests_query
+from app.database import get_database
+from app.utils.pagination import KEYSET_SORT, MAX_PAGE_SIZE, apply_keyset, encode_cursor
+
+router = APIRouter()
+
+APPROVED_STATUSES = [RequestStatus.APPROVED_FINAL.value, RequestStatus.PAID.value]
+IN_PROGRESS_STATUSES = [
+    RequestStatus.PENDING.value,
+    RequestStatus.APPROVED_L1.value,
+    RequestStatus.APPROVED_L2.value
+]
+
+# Columns returned for each row of the summary report's detail page
+SUMMARY_FIELDS = {
+    "employee_name": 1,
+    "employee_email": 1,
+    "request_type": 1,
+    "amount": 1,
+    "status": 1,
+    "created_at": 1
+}
+
+def _count_if(statuses: list) -> dict:
+    return {"$sum": {"$cond": [{"$in": ["$status", statuses]}, 1, 0]}}
+
+def _totals_stage() -> dict:
+    """$group stage producing request counts and amount totals"""
+    return {"$group": {
+        "_id": None,
+        "total_requests": {"$sum": 1},
+        "approved_count": _count_if(APPROVED_STATUSES),
+        "pending_count": _count_if(IN_PROGRESS_STATUSES),
+        "rejected_count": _count_if([RequestStatus.REJECTED.value]),
+        "total_requested": {"$sum": "$amount"},
+        "total_approved": {"$sum": {"$cond": [{"$in": ["$status", APPROVED_STATUSES]}, "$amount", 0]}}
+    }}
+
+def _counts(rows: list) -> dict:
+    return {row["_id"]: row["count"] for row in rows if row["_id"] is not None}
+
+def _date_range_query(start_date: Optional[str], end_date: Optional[str]) -> dict:
+    """created_at filter for inclusive YYYY-MM-DD bounds"""
+    created_at = {}
+    try:
+        if start_date:
+            created_at["$gte"] = datetime.fromisoformat(start_date)
+        if end_date:
+            created_at["$lt"] = datetime.fromisoformat(end_date) + timedelta(days=1)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Dates must be in YYYY-MM-DD format"
+        )
+    return {"created_at": created_at} if created_at else {}
+
+def _combine(*queries: dict) -> dict:
+    queries = [query for query in queries if query]
+    if not queries:
+        return {}
+    return queries[0] if len(queries) == 1 else {"$and": queries}
+
+@router.get("/analytics")
+async def get_analytics(current_user: User = Depends(get_current_user)):
+    """
+    Dashboard analytics computed by one aggregation pipeline.
+
+    The role filter runs as the leading $match, so it is served by the
+    requests indexes. $facet then groups the matched rows into totals, types
+    and months on the server; only those aggregates reach the app.
+    """
+    db = await get_database()
+    pipeline = [
+        {"$match": visible_requests_query(current_user)},
+        {"$facet": {
+            "summary": [_totals_stage()],
+            "request_types": [
+                {"$group": {"_id": "$request_type", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}}
+            ],
+            "monthly_trends": [
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+                    "count": {"$sum": 1}
+                }},
+                {"$sort": {"_id": 1}}
+            ]
+        }}
+    ]
+    result = (await db.requests.aggregate(pipeline).to_list(1))[0]
+
+    totals = result["summary"][0] if result["summary"] else {}
+    total_requests = totals.get("total_requests", 0)
+    approved_count = totals.get("approved_count", 0)
+    total_requested = totals.get("total_requested", 0)
+
+    monthly_trends = {}
+    for month, count in _counts(result["monthly_trends"]).items():
+        monthly_trends[datetime.strptime(month, "%Y-%m").strftime("%B %Y")] = count
+
+    return {
+        "summary": {
+            "total_requests": total_requests,
+            "approved_count": approved_count,
+            "pending_count": totals.get("pending_count", 0),
+            "rejected_count": totals.get("rejected_count", 0),
+            "approval_rate": round((approved_count / total_requests * 100) if total_requests > 0 else 0, 1)
+        },
+        "request_types": {
+            request_type.replace("_", " ").title(): count
+            for request_type, count in _counts(result["request_types"]).items()
+        },
+        "monthly_trends": monthly_trends,
+        "amounts": {
+            "total_requested": round(total_requested, 2),
+            "total_approved": round(totals.get("total_approved", 0), 2),
+            "average_request": round(total_requested / total_requests if total_requests > 0 else 0, 2)
+        }
+    }
+
+@router.get("/summary")
+async def get_summary(
+    current_user: User = Depends(get_current_user),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    Summary report: totals for the date range plus one page of detail rows.
+
+    Totals and per-status/per-type breakdowns come from a $match/$facet
+    pipeline. The detail rows are a separate projected keyset query
+    (pass `next_cursor` back as `cursor`) so the sort is served by the
+    (…, created_at, _id) indexes instead of running inside $facet.
+    """
+    if current_user.role not in ["manager", "hr", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to generate summary reports"
+        )
+
+    query = _combine(
+        visible_requests_query(current_user),
+        _date_range_query(start_date, end_date),
+        {"status": status_filter} if status_filter else {}
+    )
+    try:
+        page_query = apply_keyset(query, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    db = await get_database()
+    pipeline = [
+        {"$match": query},
+        {"$facet": {
+            "totals": [_totals_stage()],
+            "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}, "amount": {"$sum": "$amount"}}}],
+            "by_type": [{"$group": {"_id": "$request_type", "count": {"$sum": 1}, "amount": {"$sum": "$amount"}}}]
+        }}
+    ]
+    page_cursor = db.requests.find(page_query, SUMMARY_FIELDS).sort(KEYSET_SORT).limit(limit + 1)
+    facets, rows = await asyncio.gather(
+        db.requests.aggregate(pipeline).to_list(1),
+        page_cursor.to_list(limit + 1)
+    )
+    facets = facets[0]
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    items = []
+    for row in rows[:limit]:
+        row["id"] = str(row.pop("_id"))
+        items.append(row)
+
+    totals = facets["totals"][0] if facets["totals"] else {}
+    totals.pop("_id", None)
+    for field in ("total_requested", "total_approved"):
+        if field in totals:
+            totals[field] = round(totals[field], 2)
+
+    def breakdown(groups: list) -> dict:
+        return {
+            group["_id"]: {"count": group["count"], "amount": round(group["amount"], 2)}
+            for group in groups if group["_id"] is not None
+        }
+
+    return {
+        "date_range": {
+            "start_date": start_date or "Beginning",
+            "end_date": end_date or "Present"
+        },
+        "totals": totals,
+        "by_status": breakdown(facets["by_status"]),
+        "by_type": breakdown(facets["by_type"]),
+        "items": items,
+        "next_cursor": next_cursor
+    }
@@ -1,14 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional, Tuple, Union
 from bson import ObjectId
-from app.models import PaymentRequest, RequestCreate, RequestUpdate, RequestApproval, User
+from app.models import (
+    PaymentRequest, RequestCreate, RequestUpdate, RequestApproval, RequestPage, User,
+    BulkApproval, BulkApprovalItem, BulkApprovalResult
+)
 from app.routers.auth import get_current_user
 from app.database import get_database
 from app.utils.email import email_service
+from app.utils.outbox import email_outbox
+from app.utils.digest import digest_scheduler
+from events import request_events, REQUEST_CREATED, REQUEST_DECIDED
+from app.utils.pagination import KEYSET_SORT, MAX_PAGE_SIZE, apply_keyset, encode_cursor
+from app.utils.serialization import (
+    from_mongo, trusted_response, parse_fields, mongo_projection, partial_model, page_model
+)
 from datetime import datetime
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Statuses in which a request still awaits an approval decision
+DECIDABLE_STATUSES = ["pending", "approved_l1", "approved_l2"]
+
+# approval_events order within one request's history
+APPROVAL_EVENT_SORT = [("approved_at", ASCENDING), ("_id", ASCENDING)]
+
+# Decision IDs kept on a request to confirm which conditional updates applied
+RECENT_DECISION_IDS = 5
+
+# Columns of the dashboard request table, returned by `view=summary`
+REQUEST_SUMMARY_FIELDS = "request_type,amount,status,created_at"
+
+def visible_requests_query(current_user: User) -> dict:
+    """Mongo filter for the requests a user may see, based on their role"""
+    if current_user.role == "employee":
+        # Employees can only see their own requests
+        return {"employee_id": current_user.id}
+    if current_user.role == "manager":
+        # Managers can see requests they need to approve + their own
+        return {
+            "$or": [
+                {"employee_id": current_user.id},
+                {"current_approver_id": current_user.id}
+            ]
+        }
+    # HR and Admin can see all requests
+    return {}
+
 @router.post("/", response_model=dict)
 async def create_request(
     request: RequestCreate,
@@ -24,7 +67,7 @@ async def create_request(
         "employee_name": current_user.full_name,
         "employee_email": current_user.email,
         "status": "pending",
-        "approval_history": [],
+        "version": 0,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
@@ -32,72 +75,143 @@ async def create_request(
     # Set initial approver (manager)
     if current_user.manager_id:
         request_doc["current_approver_id"] = current_user.manager_id
-        
+    
+    result = await db.requests.insert_one(request_doc)
+    publish_request_event(REQUEST_CREATED, {**request_doc, "id": str(result.inserted_id)})
+    
+    if current_user.manager_id:
         # Get manager details for email notification
         manager = await db.users.find_one({"_id": current_user.manager_id})
         if manager:
-            # Send email notification to manager
-            await email_service.send_request_notification(
-                to_email=manager["email"],
+            # Notify manager now or in their next digest, per their notification preference
+            await digest_scheduler.notify_approver(
+                manager,
                 employee_name=current_user.full_name,
                 request_type=request.request_type,
                 amount=request.amount,
-                request_id="pending"  # Will update after insert
+                request_id=str(result.inserted_id)
             )
     
-    result = await db.requests.insert_one(request_doc)
-    
     return {
         "message": "Request created successfully",
         "request_id": str(result.inserted_id)
     }
 
-@router.get("/", response_model=List[PaymentRequest])
+# Roles that see every request (see visible_requests_query)
+ALL_REQUESTS_ROLES = ("hr", "admin")
+
+def publish_request_event(event_type: str, request: dict, *user_ids: Optional[str]):
+    """Push an event to everyone whose request list includes `request`, plus `user_ids`"""
+    request_events.publish(
+        event_type,
+        request,
+        user_ids=(request.get("employee_id"), request.get("current_approver_id"), *user_ids),
+        roles=ALL_REQUESTS_ROLES
+    )
+
+def relay_request_change(change: dict):
+    """
+    Change listener handler for the requests collection: push writes made
+    by other instances to this instance's event streams. Writes made here
+    were published when they happened and are skipped.
+    """
+    document = change["document"]
+    if document is None or change["operation"] not in ("insert", "update", "replace"):
+        return
+    request = {**document, "id": str(document["_id"])}
+    if request_events.already_published(request):
+        return
+    # Every approval transition bumps the version, so version 0 is a new request
+    if request.get("version", 0) == 0:
+        publish_request_event(REQUEST_CREATED, request)
+    else:
+        publish_request_event(REQUEST_DECIDED, request, (request.get("latest_decision") or {}).get("approver_id"))
+
+def selected_fields(fields: Optional[str], view: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """PaymentRequest fields asked for by `fields=`/`view=`; None means the whole document"""
+    if view not in (None, "full", "summary"):
+        raise ValueError("view must be 'summary' or 'full'")
+    if fields:
+        return parse_fields(PaymentRequest, fields)
+    if view == "summary":
+        return parse_fields(PaymentRequest, REQUEST_SUMMARY_FIELDS)
+    return None
+
+@router.get("/", response_model=Union[List[PaymentRequest], RequestPage])
 async def get_requests(
     current_user: User = Depends(get_current_user),
     status: str = None,
-    skip: int = 0,
-    limit: int = 100
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None
 ):
-    """Get payment requests based on user role"""
+    """
+    Get payment requests based on user role.
+
+    Passing `cursor` (empty for the first page, then each response's
+    `next_cursor`) switches to keyset pagination and returns a RequestPage;
+    without it the legacy skip/limit list is returned.
+
+    `fields=request_type,amount` (any PaymentRequest fields; `_id` is always
+    included) or `view=summary` (the dashboard table columns) becomes a
+    Mongo projection, so descriptions are neither read, validated nor sent
+    unless asked for. Approval history is left to the detail view;
+    `latest_decision` summarises it here.
+    """
     db = await get_database()
     
-    # Build query based on user role
-    query = {}
+    try:
+        selected = selected_fields(fields, view)
+    except ValueError as e:
+        # `status` is shadowed by the query parameter here
+        raise HTTPException(status_code=400, detail=str(e))
+    if selected is None:
+        # History is only loaded by the detail view; skip entries embedded by older versions
+        item_model, projection = PaymentRequest, {"approval_history": 0}
+    else:
+        item_model = partial_model(PaymentRequest, selected)
+        # created_at is needed for sorting and cursors even when not returned
+        projection = mongo_projection(PaymentRequest, selected, extra=["created_at"])
     
-    if current_user.role == "employee":
-        # Employees can only see their own requests
-        query["employee_id"] = current_user.id
-    elif current_user.role == "manager":
-        # Managers can see requests they need to approve + their own
-        query = {
-            "$or": [
-                {"employee_id": current_user.id},
-                {"current_approver_id": current_user.id}
-            ]
-        }
-    elif current_user.role in ["hr", "admin"]:
-        # HR and Admin can see all requests
-        pass
+    # Build query based on user role
+    query = visible_requests_query(current_user)
     
     if status:
         query["status"] = status
     
-    requests_cursor = db.requests.find(query).skip(skip).limit(limit).sort("created_at", -1)
-    requests = []
+    if cursor is not None:
+        try:
+            page_query = apply_keyset(query, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Fetch one extra document to know whether another page exists
+        documents = await db.requests.find(page_query, projection).sort(KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+        next_cursor = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+        items = [from_mongo(request) for request in documents[:limit]]
+        page_type = RequestPage if selected is None else page_model(item_model)
+        return trusted_response(page_type, {"items": items, "next_cursor": next_cursor})
     
-    async for request in requests_cursor:
-        request["_id"] = str(request["_id"])
-        requests.append(PaymentRequest(**request))
+    requests_cursor = db.requests.find(query, projection).skip(skip).limit(limit).sort("created_at", -1)
+    requests = [from_mongo(request) async for request in requests_cursor]
     
-    return requests
+    return trusted_response(List[item_model], requests)
+
+async def load_approval_history(db, request: dict) -> list:
+    """Decisions for one request in order: entries embedded by older versions, then approval_events"""
+    events = await db.approval_events.find(
+        {"request_id": str(request["_id"])},
+        {"_id": 0, "request_id": 0}
+    ).sort(APPROVAL_EVENT_SORT).to_list(None)
+    return request.get("approval_history", []) + events
 
 @router.get("/{request_id}", response_model=PaymentRequest)
 async def get_request(
     request_id: str,
     current_user: User = Depends(get_current_user)
 ):
-    """Get specific payment request"""
+    """Get specific payment request, with its approval history"""
     db = await get_database()
     
     try:
@@ -127,8 +241,81 @@ async def get_request(
             detail="Not enough permissions"
         )
     
-    request["_id"] = str(request["_id"])
-    return PaymentRequest(**request)
+    request["approval_history"] = await load_approval_history(db, request)
+    return trusted_response(PaymentRequest, from_mongo(request))
+
+def approval_filter(request_id: ObjectId, current_user: User, expected_version: Optional[int] = None) -> dict:
+    """
+    Conditions under which `current_user` may decide a request right now.
+
+    The request must still be awaiting a decision and, unless the user is
+    HR/admin, be assigned to them; with `expected_version` it must also be
+    unchanged since the caller read it.
+    """
+    query = {"_id": request_id, "status": {"$in": DECIDABLE_STATUSES}}
+    if current_user.role not in ["hr", "admin"]:
+        query["current_approver_id"] = current_user.id
+    if expected_version is not None:
+        # Documents written before versioning have no field and count as version 0
+        query["version"] = {"$in": [0, None]} if expected_version == 0 else expected_version
+    return query
+
+def approval_decision(approval: RequestApproval, current_user: User) -> dict:
+    """One decision, as stored in `latest_decision` and (with request_id) in approval_events"""
+    return {
+        "decision_id": uuid.uuid4().hex,
+        "approver_id": current_user.id,
+        "approver_name": current_user.full_name,
+        "status": approval.status.value,
+        "comments": approval.comments,
+        "approved_at": datetime.utcnow()
+    }
+
+def approval_update(approval: RequestApproval, decision: dict) -> dict:
+    """
+    Update document applying `decision` to a request.
+
+    The request keeps only the latest decision plus the IDs of its last few
+    decisions (so a caller can tell afterwards which conditional updates it
+    won); the full history lives in approval_events.
+    """
+    fields = {"status": approval.status.value, "updated_at": decision["approved_at"], "latest_decision": decision}
+    if approval.status == "rejected":
+        fields["rejection_reason"] = approval.comments
+        fields["current_approver_id"] = None
+    return {
+        "$set": fields,
+        "$inc": {"version": 1},
+        "$push": {"recent_decision_ids": {"$each": [decision["decision_id"]], "$slice": -RECENT_DECISION_IDS}}
+    }
+
+def approval_event(request_id: str, decision: dict) -> dict:
+    return {"request_id": request_id, **decision}
+
+async def record_approval_events(db, events: List[dict]):
+    """
+    Write history events for decisions that are already applied.
+
+    The request documents have committed by now (and keep latest_decision),
+    so a failed history write is logged rather than turned into an error
+    for a decision that did happen.
+    """
+    if not events:
+        return
+    try:
+        await db.approval_events.insert_many(events, ordered=False)
+    except Exception:
+        logger.exception("approval.history_write_failed", extra={
+            "payment_request_ids": [event["request_id"] for event in events],
+            "decision_id": events[0]["decision_id"]
+        })
+
+async def queue_decision_emails(messages: List[dict]):
+    """Queue employee notifications for applied decisions; failures are logged, not raised"""
+    try:
+        await email_outbox.enqueue_many(messages)
+    except Exception:
+        logger.exception("approval.notification_enqueue_failed", extra={"messages": len(messages)})
 
 @router.put("/{request_id}/approve", response_model=dict)
 async def approve_reject_request(
@@ -136,58 +323,62 @@ async def approve_reject_request(
     approval: RequestApproval,
     current_user: User = Depends(get_current_user)
 ):
-    """Approve or reject a payment request"""
+    """
+    Approve or reject a payment request.
+
+    The permission and state checks are the filter of a single
+    find_one_and_update, so two approvers racing on the same request cannot
+    both win: the loser gets 409 instead of silently overwriting. The
+    document is only read again when the update did not match, to tell
+    404/403/409 apart.
+    """
     db = await get_database()
     
-    # Get the request
-    try:
-        request = await db.requests.find_one({"_id": ObjectId(request_id)})
-    except:
+    if not ObjectId.is_valid(request_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid request ID"
         )
+    object_id = ObjectId(request_id)
     
-    if not request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Request not found"
-        )
+    decision = approval_decision(approval, current_user)
+    request = await db.requests.find_one_and_update(
+        approval_filter(object_id, current_user, approval.expected_version),
+        approval_update(approval, decision),
+        projection={"approval_history": 0, "recent_decision_ids": 0},
+        return_document=ReturnDocument.AFTER
+    )
     
-    # Check if user can approve this request
-    if request.get("current_approver_id") != current_user.id and current_user.role not in ["hr", "admin"]:
+    if request is None:
+        current = await db.requests.find_one(
+            {"_id": object_id},
+            {"status": 1, "current_approver_id": 1, "version": 1}
+        )
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Request not found"
+            )
+        if current.get("current_approver_id") != current_user.id and current_user.role not in ["hr", "admin"]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You are not authorized to approve this request"
+            )
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not authorized to approve this request"
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Request was already decided or changed by someone else",
+                "status": current["status"],
+                "version": current.get("version", 0)
+            }
         )
     
-    # Add to approval history
-    approval_entry = {
-        "approver_id": current_user.id,
-        "approver_name": current_user.full_name,
-        "status": approval.status,
-        "comments": approval.comments,
-        "approved_at": datetime.utcnow()
-    }
-    
-    # Update request
-    update_data = {
-        "status": approval.status,
-        "updated_at": datetime.utcnow(),
-        "$push": {"approval_history": approval_entry}
-    }
+    # The decision is committed; nothing below may turn it into an error response
+    publish_request_event(REQUEST_DECIDED, {**request, "id": request_id}, current_user.id)
+    await record_approval_events(db, [approval_event(request_id, decision)])
     
-    if approval.status == "rejected":
-        update_data["rejection_reason"] = approval.comments
-        update_data["current_approver_id"] = None
-    
-    await db.requests.update_one(
-        {"_id": ObjectId(request_id)},
-        {"$set": update_data}
-    )
-    
-    # Send email notification to employee
-    await email_service.send_approval_notification(
+    # Queue email notification to employee
+    await queue_decision_emails([email_service.build_approval_notification(
         to_email=request["employee_email"],
         employee_name=request["employee_name"],
         request_type=request["request_type"],
@@ -195,6 +386,90 @@ async def approve_reject_request(
         status=approval.status,
         approver_name=current_user.full_name,
         comments=approval.comments
-    )
+    )])
+    
+    request["_id"] = str(request["_id"])
+    return {
+        "message": f"Request {approval.status} successfully",
+        "request": PaymentRequest(**request)
+    }
+
+@router.post("/bulk/approve", response_model=BulkApprovalResult)
+async def bulk_approve_reject_requests(
+    bulk: BulkApproval,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Apply one decision to many requests in a single bulk_write.
+
+    Each request gets the same conditional update as the single-item
+    endpoint, so items that are no longer assigned to the caller or were
+    already decided are skipped rather than overwritten. Every request
+    updated by this call records one decision ID, which lets a single
+    follow-up find tell applied items from not_found/forbidden/conflict.
+    History events and notifications for the applied items are each
+    written with one insert.
+    """
+    db = await get_database()
+    
+    # Keep the caller's order, drop repeats
+    request_ids = list(dict.fromkeys(bulk.request_ids))
+    object_ids = {request_id: ObjectId(request_id) for request_id in request_ids if ObjectId.is_valid(request_id)}
+    
+    approval = RequestApproval(status=bulk.status, comments=bulk.comments)
+    decision = approval_decision(approval, current_user)
+    update = approval_update(approval, decision)
+    if object_ids:
+        await db.requests.bulk_write(
+            [UpdateOne(approval_filter(object_id, current_user), update) for object_id in object_ids.values()],
+            ordered=False
+        )
+    
+    documents = {}
+    projection = {
+        "employee_id": 1, "employee_email": 1, "employee_name": 1, "request_type": 1, "amount": 1,
+        "status": 1, "current_approver_id": 1, "version": 1, "created_at": 1, "updated_at": 1,
+        "recent_decision_ids": 1
+    }
+    async for document in db.requests.find({"_id": {"$in": list(object_ids.values())}}, projection):
+        documents[document["_id"]] = document
+    
+    results = []
+    events = []
+    notifications = []
+    for request_id in request_ids:
+        object_id = object_ids.get(request_id)
+        document = documents.get(object_id) if object_id else None
+        if object_id is None:
+            result = "invalid_id"
+        elif document is None:
+            result = "not_found"
+        elif decision["decision_id"] in document.get("recent_decision_ids", []):
+            result = "updated"
+            events.append(approval_event(request_id, decision))
+            publish_request_event(REQUEST_DECIDED, {**document, "id": request_id}, current_user.id)
+            notifications.append(email_service.build_approval_notification(
+                to_email=document["employee_email"],
+                employee_name=document["employee_name"],
+                request_type=document["request_type"],
+                amount=document["amount"],
+                status=approval.status,
+                approver_name=current_user.full_name,
+                comments=approval.comments
+            ))
+        elif document.get("current_approver_id") != current_user.id and current_user.role not in ["hr", "admin"]:
+            result = "forbidden"
+        else:
+            result = "conflict"
+        results.append(BulkApprovalItem(
+            request_id=request_id,
+            result=result,
+            status=document["status"] if document else None,
+            version=document.get("version", 0) if document else None
+        ))
+    
+    await record_approval_events(db, events)
+    await queue_decision_emails(notifications)
     
-    return {"message": f"Request {approval.status} successfully"}
+    updated = len(notifications)
+    return BulkApprovalResult(updated=updated, failed=len(results) - updated, results=results)
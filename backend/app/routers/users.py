@@ -1,18 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.models import User, UserUpdate
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional, Union
+from app.models import User, UserPage, UserUpdate
 from app.routers.auth import get_current_user
 from app.database import get_database
+from app.utils.pagination import KEYSET_SORT, MAX_PAGE_SIZE, apply_keyset, encode_cursor
+from app.utils.principal_cache import principal_cache
+from app.routers.events import revoke_user_streams
+from app.utils.serialization import from_mongo, trusted_response
 
 router = APIRouter()
 
-@router.get("/", response_model=List[User])
+@router.get("/", response_model=Union[List[User], UserPage])
 async def get_users(
     current_user: User = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
 ):
-    """Get all users (admin/hr only)"""
+    """Get all users (admin/hr only); pass `cursor` for keyset pagination"""
     if current_user.role not in ["admin", "hr"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -20,13 +25,24 @@ async def get_users(
         )
     
     db = await get_database()
-    users_cursor = db.users.find().skip(skip).limit(limit)
-    users = []
     
-    async for user in users_cursor:
-        users.append(User(**user))
+    if cursor is not None:
+        try:
+            page_query = apply_keyset({}, cursor)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        documents = await db.users.find(page_query).sort(KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+        next_cursor = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+        items = [from_mongo(user) for user in documents[:limit]]
+        return trusted_response(UserPage, {"items": items, "next_cursor": next_cursor})
+    
+    users_cursor = db.users.find().skip(skip).limit(limit)
+    users = [from_mongo(user) async for user in users_cursor]
     
-    return users
+    return trusted_response(List[User], users)
 
 @router.get("/{user_id}", response_model=User)
 async def get_user(
@@ -50,7 +66,7 @@ async def get_user(
             detail="User not found"
         )
     
-    return User(**user)
+    return trusted_response(User, from_mongo(user))
 
 @router.put("/{user_id}", response_model=User)
 async def update_user(
@@ -70,6 +86,10 @@ async def update_user(
     
     # Build update document
     update_data = {k: v for k, v in user_update.dict().items() if v is not None}
+    
+    # Merge notification preferences key by key instead of replacing the whole object
+    for key, value in update_data.pop("notifications", {}).items():
+        update_data[f"notifications.{key}"] = value
     if not update_data:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -91,6 +111,12 @@ async def update_user(
             detail="User not found"
         )
     
+    # Cached principals must not outlive a role/manager/status change
+    principal_cache.invalidate(user_id=user_id)
+    
     # Return updated user
     updated_user = await db.users.find_one({"_id": user_id})
+    principal_cache.invalidate(subject=updated_user["email"])
+    # Event streams opened under the old role or before deactivation close at once
+    revoke_user_streams({"operation": "update", "document_id": user_id, "document": updated_user})
     return User(**updated_user)
@@ -1,9 +1,12 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
+from metrics import password_hash_duration
 
 load_dotenv()
 
@@ -23,6 +26,75 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+class PasswordPoolBusyError(Exception):
+    """Raised when the password hashing queue is full and the call is shed"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Password hashing queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+class PasswordHashPool:
+    """
+    Bounded thread pool for bcrypt work.
+
+    bcrypt deliberately takes hundreds of milliseconds per call. Running it
+    inline in an async handler blocks the event loop for every other request.
+    Here it runs on a few dedicated threads (bcrypt releases the GIL while
+    hashing). At most `max_queue` callers wait behind them; anything beyond
+    that is shed with PasswordPoolBusyError rather than queueing without bound.
+
+    Configuration (environment variables):
+        BCRYPT_WORKERS: hashing threads (default: min(4, CPU count))
+        BCRYPT_MAX_QUEUE: callers allowed to wait for a thread (default: 32)
+        BCRYPT_RETRY_AFTER: Retry-After seconds suggested when shedding (default: 1)
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        retry_after: Optional[int] = None
+    ):
+        self.max_workers = max_workers or int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("BCRYPT_MAX_QUEUE", "32"))
+        self.retry_after = retry_after or int(os.getenv("BCRYPT_RETRY_AFTER", "1"))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.shed = 0
+
+    @property
+    def pending(self) -> int:
+        """Calls running or waiting for a thread"""
+        return self._pending
+
+    async def run(self, func, *args):
+        """Run a blocking password function on the pool, shedding load when full"""
+        if self._pending >= self.max_workers + self.max_queue:
+            self.shed += 1
+            raise PasswordPoolBusyError(self.retry_after)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+
+        def timed():
+            # Timed on the worker thread so the histogram shows bcrypt cost, not queueing
+            with password_hash_duration.time(operation=func.__name__):
+                return func(*args)
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Global password hashing pool
+password_pool = PasswordHashPool()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -35,6 +107,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def token_expiry(token: str) -> Optional[float]:
+    """Expiry of an already verified token as a Unix timestamp, or None if it has none"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    expires = payload.get("exp")
+    return float(expires) if expires is not None else None
+
 def verify_token(token: str):
     """Verify and decode a JWT token"""
     try:
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+from app.database import get_database
+from app.models import NotificationFrequency
+from app.utils.email import email_service
+from app.utils.outbox import email_outbox, EmailOutbox
+from notification_digest import notification_frequency, digest_window_end, wants_email
+
+logger = logging.getLogger(__name__)
+
+class DigestScheduler:
+    """
+    Groups pending-approval notices per approver into digest emails.
+
+    Each approver's `notifications.notificationFrequency` preference decides
+    the window: "immediate" notices go straight to the outbox, the others are
+    parked in `notification_digest_items` until their window closes (top of
+    the hour, midnight UTC, or Monday midnight UTC) and are then sent as one
+    email per approver per window.
+
+    A flush claims the due items before building the emails. If the flush
+    fails the claim is released, and a claim left behind by an instance that
+    died mid-flush is taken over once it is older than the claim lease.
+
+    Configuration (environment variables):
+        DIGEST_FLUSH_SECONDS: how often closed windows are checked (default: 60)
+        DIGEST_CLAIM_LEASE_SECONDS: age after which a stuck claim is retaken (default: 300)
+    """
+
+    collection_name = "notification_digest_items"
+
+    def __init__(self, outbox: EmailOutbox = email_outbox):
+        self.outbox = outbox
+        self.flush_interval = float(os.getenv("DIGEST_FLUSH_SECONDS", "60"))
+        self.claim_lease = timedelta(seconds=int(os.getenv("DIGEST_CLAIM_LEASE_SECONDS", "300")))
+        self._task: Optional[asyncio.Task] = None
+
+    async def _collection(self):
+        db = await get_database()
+        return db[self.collection_name]
+
+    @staticmethod
+    def frequency_for(user: dict) -> NotificationFrequency:
+        """Read a user's digest preference, defaulting to immediate"""
+        return NotificationFrequency(notification_frequency(user))
+
+    @staticmethod
+    def window_end(frequency: NotificationFrequency, now: datetime) -> datetime:
+        """End of the digest window that `now` falls into"""
+        return digest_window_end(NotificationFrequency(frequency).value, now)
+
+    async def notify_approver(
+        self,
+        approver: dict,
+        employee_name: str,
+        request_type: str,
+        amount: float,
+        request_id: str
+    ):
+        """Send or schedule a new-request notice for an approver"""
+        if not wants_email(approver):
+            return
+
+        frequency = self.frequency_for(approver)
+        if frequency == NotificationFrequency.IMMEDIATE:
+            await self.outbox.enqueue(**email_service.build_request_notification(
+                to_email=approver["email"],
+                employee_name=employee_name,
+                request_type=request_type,
+                amount=amount,
+                request_id=request_id
+            ))
+            return
+
+        now = datetime.utcnow()
+        collection = await self._collection()
+        await collection.insert_one({
+            "approver_email": approver["email"],
+            "approver_name": approver.get("full_name", ""),
+            "frequency": frequency.value,
+            "window_end": self.window_end(frequency, now),
+            "claimed_by": None,
+            "claimed_at": None,
+            "employee_name": employee_name,
+            "request_type": request_type,
+            "amount": amount,
+            "request_id": request_id,
+            "created_at": now
+        })
+
+    async def flush_due(self) -> int:
+        """Turn every closed window into one digest email per approver; returns emails queued"""
+        collection = await self._collection()
+        now = datetime.utcnow()
+
+        # Claim the due items first so concurrent instances never send the same digest twice
+        claim = uuid.uuid4().hex
+        claimed = await collection.update_many(
+            {
+                "window_end": {"$lte": now},
+                "$or": [{"claimed_by": None}, {"claimed_at": {"$lt": now - self.claim_lease}}]
+            },
+            {"$set": {"claimed_by": claim, "claimed_at": now}}
+        )
+        if not claimed.modified_count:
+            return 0
+
+        try:
+            messages = await self._build_digests(collection, claim)
+            await self.outbox.enqueue_many(messages)
+        except Exception:
+            # Hand the items back so the next flush (here or on another instance) retries them
+            await collection.update_many({"claimed_by": claim}, {"$set": {"claimed_by": None, "claimed_at": None}})
+            raise
+
+        await collection.delete_many({"claimed_by": claim})
+        return len(messages)
+
+    async def _build_digests(self, collection, claim: str) -> List[dict]:
+        """One digest email per approver and window for the items under `claim`"""
+        groups = collection.aggregate([
+            {"$match": {"claimed_by": claim}},
+            {"$sort": {"created_at": 1}},
+            {"$group": {
+                "_id": {"email": "$approver_email", "window_end": "$window_end"},
+                "approver_name": {"$last": "$approver_name"},
+                "frequency": {"$last": "$frequency"},
+                "notices": {"$push": {
+                    "employee_name": "$employee_name",
+                    "request_type": "$request_type",
+                    "amount": "$amount",
+                    "request_id": "$request_id"
+                }}
+            }}
+        ])
+
+        messages = []
+        async for group in groups:
+            messages.append(email_service.build_digest_notification(
+                to_email=group["_id"]["email"],
+                approver_name=group["approver_name"],
+                frequency=group["frequency"],
+                notices=group["notices"]
+            ))
+        return messages
+
+    def start(self):
+        """Start the periodic flush loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.flush_due()
+            except Exception as e:
+                logger.exception("digest.flush_failed")
+            await asyncio.sleep(self.flush_interval)
+
+# Global digest scheduler instance
+digest_scheduler = DigestScheduler()
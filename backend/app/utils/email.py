@@ -1,15 +1,27 @@
+import asyncio
+import logging
+import smtplib
+import time
+from email.message import EmailMessage
 import sendgrid
 from sendgrid.helpers.mail import Mail, To
 import os
 from dotenv import load_dotenv
 from typing import List, Optional
+from metrics import email_send_duration
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class EmailService:
     def __init__(self):
         self.sg = sendgrid.SendGridAPIClient(api_key=os.getenv('SENDGRID_API_KEY'))
         self.from_email = os.getenv('FROM_EMAIL')
+        # "sendgrid" (default) or "smtp" for a local stand-in sink
+        self.transport = os.getenv('EMAIL_TRANSPORT', 'sendgrid').lower()
+        self.smtp_host = os.getenv('SMTP_HOST', 'localhost')
+        self.smtp_port = int(os.getenv('SMTP_PORT', '1025'))
     
     async def send_email(
         self, 
@@ -18,8 +30,28 @@ class EmailService:
         html_content: str, 
         plain_text_content: Optional[str] = None
     ):
-        """Send email using SendGrid"""
+        """Send email using SendGrid (or the configured SMTP sink), timing the delivery"""
+        started = time.perf_counter()
+        result = await self._send(to_emails, subject, html_content, plain_text_content)
+        email_send_duration.observe(
+            time.perf_counter() - started, transport=self.transport, result=result["status"]
+        )
+        return result
+    
+    async def _send(
+        self, 
+        to_emails: List[str], 
+        subject: str, 
+        html_content: str, 
+        plain_text_content: Optional[str] = None
+    ):
         try:
+            if self.transport == 'smtp':
+                await asyncio.to_thread(
+                    self._send_smtp, to_emails, subject, html_content, plain_text_content
+                )
+                return {"status": "success", "status_code": 250}
+            
             message = Mail(
                 from_email=self.from_email,
                 to_emails=to_emails,
@@ -28,13 +60,32 @@ class EmailService:
                 plain_text_content=plain_text_content or html_content
             )
             
-            response = self.sg.send(message)
+            # The SendGrid client is synchronous; keep the HTTPS round trip off the event loop
+            response = await asyncio.to_thread(self.sg.send, message)
             return {"status": "success", "status_code": response.status_code}
         
         except Exception as e:
-            print(f"Error sending email: {str(e)}")
+            logger.error("email.send_failed", extra={"transport": self.transport, "error": str(e)})
             return {"status": "error", "message": str(e)}
     
+    def _send_smtp(
+        self,
+        to_emails: List[str],
+        subject: str,
+        html_content: str,
+        plain_text_content: Optional[str] = None
+    ):
+        """Deliver through a plain SMTP server (e.g. `python -m aiosmtpd -n -l localhost:1025`)"""
+        message = EmailMessage()
+        message['From'] = self.from_email or 'noreply@localhost'
+        message['To'] = ', '.join(to_emails)
+        message['Subject'] = subject
+        message.set_content(plain_text_content or html_content)
+        message.add_alternative(html_content, subtype='html')
+        
+        with smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=10) as smtp:
+            smtp.send_message(message)
+    
     async def send_request_notification(
         self, 
         to_email: str, 
@@ -44,6 +95,20 @@ class EmailService:
         request_id: str
     ):
         """Send notification for new request submission"""
+        message = self.build_request_notification(
+            to_email, employee_name, request_type, amount, request_id
+        )
+        return await self.send_email(**message)
+    
+    def build_request_notification(
+        self, 
+        to_email: str, 
+        employee_name: str, 
+        request_type: str, 
+        amount: float, 
+        request_id: str
+    ) -> dict:
+        """Build the message for a new request submission"""
         subject = f"New Payment Request: {request_type} - {employee_name}"
         html_content = f"""
         <html>
@@ -60,7 +125,7 @@ class EmailService:
         </html>
         """
         
-        return await self.send_email([to_email], subject, html_content)
+        return {"to_emails": [to_email], "subject": subject, "html_content": html_content}
     
     async def send_approval_notification(
         self, 
@@ -73,6 +138,22 @@ class EmailService:
         comments: Optional[str] = None
     ):
         """Send notification for request approval/rejection"""
+        message = self.build_approval_notification(
+            to_email, employee_name, request_type, amount, status, approver_name, comments
+        )
+        return await self.send_email(**message)
+    
+    def build_approval_notification(
+        self, 
+        to_email: str, 
+        employee_name: str, 
+        request_type: str, 
+        amount: float, 
+        status: str, 
+        approver_name: str,
+        comments: Optional[str] = None
+    ) -> dict:
+        """Build the message for a request approval/rejection"""
         action = "approved" if "approved" in status.lower() else "rejected"
         subject = f"Payment Request {action.title()}: {request_type}"
         
@@ -92,7 +173,47 @@ class EmailService:
         </html>
         """
         
-        return await self.send_email([to_email], subject, html_content)
+        return {"to_emails": [to_email], "subject": subject, "html_content": html_content}
+    
+    def build_digest_notification(
+        self,
+        to_email: str,
+        approver_name: str,
+        frequency: str,
+        notices: List[dict]
+    ) -> dict:
+        """Build one message summarising several new requests awaiting approval"""
+        total_amount = sum(notice["amount"] for notice in notices)
+        subject = f"{len(notices)} Payment Request{'s' if len(notices) != 1 else ''} Awaiting Approval ({frequency.title()} Digest)"
+        
+        rows = "".join(
+            f"""
+                <tr>
+                    <td>{notice['employee_name']}</td>
+                    <td>{notice['request_type']}</td>
+                    <td>${notice['amount']:,.2f}</td>
+                    <td>{notice['request_id']}</td>
+                </tr>"""
+            for notice in notices
+        )
+        
+        html_content = f"""
+        <html>
+        <body>
+            <h2>Payment Requests Awaiting Your Approval</h2>
+            <p>Hello {approver_name},</p>
+            <p>{len(notices)} new request(s) totalling ${total_amount:,.2f} were submitted for your review.</p>
+            <table border="1" cellpadding="6" cellspacing="0">
+                <tr><th>Employee</th><th>Request Type</th><th>Amount</th><th>Request ID</th></tr>{rows}
+            </table>
+            <p>Please review and approve/reject these requests in the system.</p>
+            <br>
+            <p>Best regards,<br>Payment Management System</p>
+        </body>
+        </html>
+        """
+        
+        return {"to_emails": [to_email], "subject": subject, "html_content": html_content}
 
 # Global email service instance
 email_service = EmailService()
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+from pymongo import ASCENDING, ReturnDocument
+from app.database import get_database
+from app.utils.email import email_service, EmailService
+
+logger = logging.getLogger(__name__)
+
+class EmailOutbox:
+    """
+    Persistent email queue stored in the `email_outbox` collection.
+
+    Request handlers enqueue messages (one insert) and return immediately; a
+    background worker claims batches, delivers them with bounded concurrency
+    and retries failures with exponential backoff.
+
+    Document lifecycle: pending -> sending -> sent, or back to pending with
+    a later `next_attempt_at`, or failed once `max_attempts` is exhausted.
+    """
+
+    collection_name = "email_outbox"
+
+    def __init__(self, sender: EmailService = email_service):
+        self.sender = sender
+        self.batch_size = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+        self.concurrency = int(os.getenv("EMAIL_OUTBOX_CONCURRENCY", "4"))
+        self.max_attempts = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "5"))
+        self.poll_interval = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+        # A claimed message whose worker died is retried after this lease expires
+        self.lease = timedelta(seconds=int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "120")))
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def _collection(self):
+        db = await get_database()
+        return db[self.collection_name]
+
+    def _new_document(self, message: dict) -> dict:
+        now = datetime.utcnow()
+        return {
+            "to_emails": message["to_emails"],
+            "subject": message["subject"],
+            "html_content": message["html_content"],
+            "plain_text_content": message.get("plain_text_content"),
+            "status": "pending",
+            "attempts": 0,
+            "last_error": None,
+            "next_attempt_at": now,
+            "created_at": now,
+            "updated_at": now
+        }
+
+    async def enqueue(
+        self,
+        to_emails: List[str],
+        subject: str,
+        html_content: str,
+        plain_text_content: Optional[str] = None
+    ) -> str:
+        """Queue one email for background delivery"""
+        collection = await self._collection()
+        result = await collection.insert_one(self._new_document({
+            "to_emails": to_emails,
+            "subject": subject,
+            "html_content": html_content,
+            "plain_text_content": plain_text_content
+        }))
+        self._wakeup.set()
+        return str(result.inserted_id)
+
+    async def enqueue_many(self, messages: List[dict]) -> int:
+        """Queue several emails (dicts with to_emails/subject/html_content) in one insert"""
+        if not messages:
+            return 0
+        collection = await self._collection()
+        result = await collection.insert_many([self._new_document(m) for m in messages], ordered=False)
+        self._wakeup.set()
+        return len(result.inserted_ids)
+
+    async def backlog(self) -> int:
+        """Number of messages waiting for delivery"""
+        collection = await self._collection()
+        return await collection.count_documents({"status": {"$in": ["pending", "sending"]}})
+
+    def start(self):
+        """Start the background delivery worker"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker; claimed-but-unsent messages are retried after their lease"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                batch = await self._claim_batch()
+            except Exception as e:
+                logger.exception("outbox.claim_failed")
+                batch = []
+
+            if batch:
+                await asyncio.gather(*(self._deliver(doc) for doc in batch))
+                continue
+
+            # Nothing due: sleep until the next poll or until something is enqueued
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim_batch(self) -> List[dict]:
+        """Atomically move up to batch_size due messages to 'sending'"""
+        collection = await self._collection()
+        now = datetime.utcnow()
+        batch = []
+        for _ in range(self.batch_size):
+            doc = await collection.find_one_and_update(
+                {
+                    "$or": [
+                        {"status": "pending", "next_attempt_at": {"$lte": now}},
+                        {"status": "sending", "locked_until": {"$lt": now}}
+                    ]
+                },
+                {
+                    "$set": {"status": "sending", "locked_until": now + self.lease, "updated_at": now},
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("next_attempt_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                break
+            batch.append(doc)
+        return batch
+
+    def _backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(30 * (2 ** (attempts - 1)), 3600))
+
+    async def _deliver(self, doc: dict):
+        """Send one claimed message and record the outcome (never raises, so the worker keeps running)"""
+        async with self._semaphore:
+            try:
+                result = await self.sender.send_email(
+                    to_emails=doc["to_emails"],
+                    subject=doc["subject"],
+                    html_content=doc["html_content"],
+                    plain_text_content=doc.get("plain_text_content")
+                )
+            except Exception as e:
+                # Treated like a failed send: retried with backoff until max_attempts
+                logger.exception("outbox.send_failed", extra={"outbox_id": str(doc["_id"])})
+                result = {"status": "error", "message": str(e)}
+
+        try:
+            await self._record(doc, result)
+        except Exception:
+            # The message stays 'sending' and is claimed again once its lease expires
+            logger.exception("outbox.record_failed", extra={"outbox_id": str(doc["_id"])})
+
+    async def _record(self, doc: dict, result: dict):
+        collection = await self._collection()
+        now = datetime.utcnow()
+        if result.get("status") == "success":
+            update = {"status": "sent", "sent_at": now, "updated_at": now, "last_error": None}
+        elif doc["attempts"] >= self.max_attempts:
+            update = {"status": "failed", "updated_at": now, "last_error": result.get("message")}
+        else:
+            update = {
+                "status": "pending",
+                "next_attempt_at": now + self._backoff(doc["attempts"]),
+                "updated_at": now,
+                "last_error": result.get("message")
+            }
+
+        await collection.update_one({"_id": doc["_id"]}, {"$set": update})
+
+# Global outbox instance
+email_outbox = EmailOutbox()
@@ -0,0 +1,57 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING
+
+# Keyset order shared by every cursor-paginated listing (newest first, _id breaks ties)
+KEYSET_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+# Largest page a listing will return (`limit` is validated against it)
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(document: dict) -> str:
+    """Build an opaque cursor pointing just after `document` in KEYSET_SORT order"""
+    created_at = document.get("created_at")
+    doc_id = document["_id"]
+    payload = {
+        "c": created_at.isoformat() if isinstance(created_at, datetime) else None,
+        "i": str(doc_id),
+        "o": isinstance(doc_id, ObjectId),
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Any]:
+    """Decode a cursor from encode_cursor; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        doc_id = ObjectId(payload["i"]) if payload["o"] else payload["i"]
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+    return created_at, doc_id
+
+def keyset_filter(cursor: str) -> dict:
+    """Filter matching documents that come after the cursor in KEYSET_SORT order"""
+    created_at, doc_id = decode_cursor(cursor)
+    if created_at is None:
+        # Documents without created_at sort last; only the _id tie-break remains
+        return {"created_at": None, "_id": {"$lt": doc_id}}
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": doc_id}},
+            {"created_at": None},
+        ]
+    }
+
+def apply_keyset(query: dict, cursor: Optional[str]) -> dict:
+    """Combine a listing query with the keyset condition for `cursor` (empty = first page)"""
+    if not cursor:
+        return query
+    condition = keyset_filter(cursor)
+    return {"$and": [query, condition]} if query else condition
@@ -0,0 +1,109 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+from app.models import User
+
+class PrincipalCache:
+    """
+    TTL + LRU cache of authenticated users keyed by token subject (email).
+
+    get_current_user consults it before touching the users collection, so
+    hot sessions skip the per-request find_one. Changes made through this
+    instance are dropped immediately via `invalidate`, and changes made by
+    other instances arrive through the database change listener
+    (`apply_change`); entries still expire after `ttl` seconds as a
+    backstop. Only found users are cached, never misses.
+
+    Configuration (environment variables):
+        PRINCIPAL_CACHE_TTL_SECONDS: entry lifetime (default: 60, 0 disables)
+        PRINCIPAL_CACHE_MAX_ENTRIES: LRU capacity (default: 10000)
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+        self.max_entries = max_entries if max_entries is not None else int(
+            os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000")
+        )
+        self._entries = OrderedDict()  # subject -> (expires_at, User)
+        self._subjects_by_id = {}      # user id -> subject, for invalidation by id
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, subject: str) -> Optional[User]:
+        entry = self._entries.get(subject)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            self._remove(subject)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return user
+
+    def put(self, subject: str, user: User):
+        if not self.enabled:
+            return
+        self._remove(subject)
+        self._entries[subject] = (time.monotonic() + self.ttl, user)
+        if user.id is not None:
+            self._subjects_by_id[user.id] = subject
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, subject: Optional[str] = None, user_id: Optional[str] = None):
+        """Drop a user by subject and/or id (the id also covers a changed email)"""
+        for key in {subject, self._subjects_by_id.get(user_id)}:
+            if key is not None and key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def apply_change(self, change: dict):
+        """Change listener handler for the users collection"""
+        if change["operation"] == "reset":
+            self.clear()
+            return
+        document = change["document"] or {}
+        self.invalidate(subject=document.get("email"), user_id=str(change["document_id"]))
+
+    def clear(self):
+        self._entries.clear()
+        self._subjects_by_id.clear()
+
+    def _remove(self, subject: str):
+        entry = self._entries.pop(subject, None)
+        if entry is not None and self._subjects_by_id.get(entry[1].id) == subject:
+            del self._subjects_by_id[entry[1].id]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+# Global principal cache instance
+principal_cache = PrincipalCache()
@@ -0,0 +1,73 @@
+"""
+JSON responses for documents read from our own database.
+
+Returning model instances makes FastAPI validate every row again against
+`response_model` and then walk it with jsonable_encoder, so each nested
+ApprovalHistory is validated twice and serialized in Python. Documents
+from MongoDB were written by this app, so here they are validated once by
+a cached TypeAdapter (in pydantic-core) and dumped straight to JSON bytes;
+the returned Response bypasses FastAPI's response_model pass. The
+decorators keep `response_model` for the OpenAPI schema.
+"""
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Tuple, Type
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+@lru_cache(maxsize=512)
+def type_adapter(response_type: Any) -> TypeAdapter:
+    """One TypeAdapter per response type (building the core schema is the expensive part)"""
+    return TypeAdapter(response_type)
+
+def from_mongo(document: dict) -> dict:
+    """Expose the ObjectId as the string `_id` the models expect"""
+    document["_id"] = str(document["_id"])
+    return document
+
+def to_json(response_type: Any, data: Any) -> bytes:
+    """Validate `data` once as `response_type` and dump it with field aliases, as FastAPI would"""
+    adapter = type_adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(data), by_alias=True)
+
+def trusted_response(response_type: Any, data: Any, status_code: int = 200) -> Response:
+    """JSON response for database documents (raw dicts or model instances)"""
+    return Response(content=to_json(response_type, data), status_code=status_code, media_type="application/json")
+
+def parse_fields(model: Type[BaseModel], fields: str) -> Tuple[str, ...]:
+    """
+    Split a `fields=a,b,c` parameter into model field names, always with id
+    and in declaration order, so equivalent requests share one cached
+    partial model.
+
+    Raises ValueError naming any field the model does not have.
+    """
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in model.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    wanted = {"id", *names}
+    return tuple(name for name in model.model_fields if name in wanted)
+
+def mongo_projection(model: Type[BaseModel], fields: Iterable[str], extra: Iterable[str] = ()) -> dict:
+    """Mongo projection for the given model fields (by alias) plus any `extra` document keys"""
+    projection = {model.model_fields[name].alias or name: 1 for name in fields}
+    projection.update({key: 1 for key in extra})
+    return projection
+
+@lru_cache(maxsize=256)
+def partial_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Model with only `fields` of `model` (same types, aliases and defaults), cached per field set"""
+    return create_model(
+        f"{model.__name__}Fields",
+        __config__=ConfigDict(populate_by_name=True),
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+    )
+
+@lru_cache(maxsize=256)
+def page_model(item_model: Type[BaseModel]) -> Type[BaseModel]:
+    """Keyset page of `item_model` rows, shaped like RequestPage/UserPage"""
+    return create_model(
+        f"{item_model.__name__}Page",
+        items=(List[item_model], ...),
+        next_cursor=(Optional[str], None)
+    )
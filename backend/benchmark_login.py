@@ -0,0 +1,113 @@
+"""
+Login storm benchmark for the bcrypt thread pool
+Fires concurrent logins while a steady stream of lightweight (non-login)
+requests runs on the same event loop, once with bcrypt inline in the handler
+and once through password_pool, and reports p50/p99 latency for both kinds
+
+Run from the backend directory: python benchmark_login.py [logins] [concurrency]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from fastapi import HTTPException
+
+from app.routers.auth import run_password_work
+from app.utils.auth import get_password_hash, password_pool, verify_password
+
+PASSWORD = "testpassword123"
+HASHED = get_password_hash(PASSWORD)
+
+# One lightweight request every 5 ms, e.g. a cached GET /api/requests
+PING_INTERVAL = 0.005
+
+
+async def login_inline():
+    """Login handler as it used to run: bcrypt on the event loop"""
+    return verify_password(PASSWORD, HASHED)
+
+
+async def login_pooled():
+    """Login handler with bcrypt on the bounded pool"""
+    return await run_password_work(verify_password, PASSWORD, HASHED)
+
+
+async def ping():
+    await asyncio.sleep(0)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def storm(handler, logins: int, concurrency: int) -> dict:
+    login_latencies, ping_latencies = [], []
+    shed = 0
+    gate = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async def one_login(arrived: float):
+        nonlocal shed
+        async with gate:
+            try:
+                await handler()
+            except HTTPException:
+                shed += 1
+                return
+            login_latencies.append(time.perf_counter() - arrived)
+
+    async def pinger():
+        while not done.is_set():
+            started = time.perf_counter()
+            await ping()
+            ping_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(PING_INTERVAL)
+
+    ping_task = asyncio.create_task(pinger())
+    # The whole storm arrives at once; login latency counts from arrival
+    started = time.perf_counter()
+    await asyncio.gather(*(one_login(started) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ping_task
+
+    return {
+        "login_p50": percentile(login_latencies, 0.50) if login_latencies else 0.0,
+        "login_p99": percentile(login_latencies, 0.99) if login_latencies else 0.0,
+        "ping_p50": percentile(ping_latencies, 0.50),
+        "ping_p99": percentile(ping_latencies, 0.99),
+        "pings": len(ping_latencies),
+        "shed": shed,
+        "elapsed": elapsed,
+    }
+
+
+def report(label: str, result: dict):
+    print(f"   {label}")
+    print(f"      login     p50 {result['login_p50'] * 1e3:8.1f} ms   p99 {result['login_p99'] * 1e3:8.1f} ms"
+          f"   (shed {result['shed']})")
+    print(f"      non-login p50 {result['ping_p50'] * 1e3:8.1f} ms   p99 {result['ping_p99'] * 1e3:8.1f} ms"
+          f"   ({result['pings']} requests served in {result['elapsed']:.2f}s)")
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    print("🧪 Login storm benchmark")
+    print("=" * 40)
+    print(f"   {logins} logins, {concurrency} concurrent, bcrypt pool: {password_pool.max_workers} threads, "
+          f"queue {password_pool.max_queue}")
+
+    report("before (bcrypt inline)", asyncio.run(storm(login_inline, logins, concurrency)))
+    report("after (bounded bcrypt pool)", asyncio.run(storm(login_pooled, logins, concurrency)))
+    password_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
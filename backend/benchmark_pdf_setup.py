@@ -0,0 +1,72 @@
+"""
+Micro-benchmark for PDF generator setup cost
+Compares rebuilding styles per document with the shared process-wide theme
+
+Run from the backend directory: python benchmark_pdf_setup.py [documents]
+"""
+
+import sys
+import timeit
+
+from pdf_generator import PDFTheme, PaymentPDFGenerator, generate_paycheck_pdf, get_theme
+
+SAMPLE_REQUEST = {
+    'id': 'REQ-001',
+    'request_type': 'overtime',
+    'amount': '1500.00',
+    'description': 'Additional work on project completion',
+    'status': 'approved_final',
+    'created_at': '2025-10-15',
+    'approved_at': '2025-10-15',
+    'approved_by': 'Manager Smith'
+}
+
+SAMPLE_USER = {
+    'id': 'EMP-001',
+    'name': 'John Doe',
+    'email': 'john.doe@example.com',
+    'role': 'Employee',
+    'department': 'Engineering'
+}
+
+
+def per_document_setup_uncached():
+    """Setup as it used to run for every document: a fresh stylesheet and table styles"""
+    PaymentPDFGenerator(theme=PDFTheme())
+
+
+def per_document_setup_shared():
+    """Setup with the shared theme"""
+    PaymentPDFGenerator(theme=get_theme())
+
+
+def report(label: str, seconds: float, documents: int):
+    print(f"   {label:<32} {seconds / documents * 1e6:10.1f} µs/doc   ({documents} docs in {seconds:.3f}s)")
+
+
+def main():
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    print("🧪 PDF generator setup benchmark")
+    print("=" * 40)
+
+    # Build the shared theme once, as the worker initializer does at startup
+    get_theme()
+
+    print("⚙️  Per-document setup only")
+    uncached = timeit.timeit(per_document_setup_uncached, number=documents)
+    shared = timeit.timeit(per_document_setup_shared, number=documents)
+    report("before (styles per document)", uncached, documents)
+    report("after (shared theme)", shared, documents)
+    print(f"   speed-up: {uncached / shared:.0f}x")
+
+    render_docs = max(documents // 20, 10)
+    print(f"\n📄 Full paycheck render ({render_docs} docs)")
+    full = timeit.timeit(lambda: generate_paycheck_pdf(SAMPLE_REQUEST, SAMPLE_USER), number=render_docs)
+    report("render with shared theme", full, render_docs)
+    saved = (uncached - shared) / documents
+    print(f"   setup saved per document: {saved * 1e3:.2f} ms ({saved / (full / render_docs) * 100:.0f}% of a render)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+List serialization benchmark for documents read from MongoDB
+Serves the same request documents two ways, as the listing endpoints used to
+(PaymentRequest(**doc) per row, then FastAPI's response_model validation and
+jsonable_encoder) and through app.utils.serialization.trusted_response, and
+reports rows/sec for 100- and 1000-row pages
+
+Run from the backend directory: python benchmark_serialization.py [rounds]
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+
+from app.models import PaymentRequest
+from app.utils.serialization import from_mongo, trusted_response
+
+PAGE_SIZES = (100, 1000)
+
+
+def make_documents(count: int) -> List[dict]:
+    """Request documents shaped like the `requests` collection, two history entries each"""
+    now = datetime.utcnow()
+    documents = []
+    for i in range(count):
+        history = [
+            {
+                "approver_id": f"manager_{i % 7}",
+                "approver_name": "Manager User",
+                "status": status,
+                "comments": "Looks good",
+                "approved_at": now - timedelta(hours=h)
+            }
+            for h, status in ((2, "approved_l1"), (1, "approved_final"))
+        ]
+        documents.append({
+            "_id": ObjectId(),
+            "employee_id": f"employee_{i % 50}",
+            "employee_name": "Test User",
+            "employee_email": "test@example.com",
+            "request_type": "overtime",
+            "amount": 100.0 + i,
+            "description": "Overtime work for project deadline",
+            "supporting_documents": [],
+            "status": "approved_final",
+            "approval_history": history,
+            "current_approver_id": None,
+            "created_at": now - timedelta(days=i),
+            "updated_at": now,
+            "version": 2
+        })
+    return documents
+
+
+def build_app(pages: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/legacy/{size}", response_model=List[PaymentRequest])
+    async def legacy(size: int):
+        requests = []
+        for request in pages[size]:
+            request = dict(request)
+            request["_id"] = str(request["_id"])
+            requests.append(PaymentRequest(**request))
+        return requests
+
+    @app.get("/trusted/{size}", response_model=List[PaymentRequest])
+    async def trusted(size: int):
+        return trusted_response(List[PaymentRequest], [from_mongo(dict(request)) for request in pages[size]])
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, rows: int, rounds: int) -> float:
+    """Rows served per second over `rounds` sequential requests"""
+    await client.get(path)  # warm up (TypeAdapter and route caches)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        response = await client.get(path)
+        response.raise_for_status()
+    return rows * rounds / (time.perf_counter() - started)
+
+
+async def run(rounds: int):
+    pages = {size: make_documents(size) for size in PAGE_SIZES}
+    app = build_app(pages)
+    async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+        legacy = await client.get(f"/legacy/{PAGE_SIZES[0]}")
+        trusted = await client.get(f"/trusted/{PAGE_SIZES[0]}")
+        assert legacy.json() == trusted.json(), "both paths must produce the same body"
+
+        print(f"{'rows':>6} {'legacy rows/s':>15} {'trusted rows/s':>15} {'speed-up':>9}")
+        for size in PAGE_SIZES:
+            size_rounds = max(rounds * PAGE_SIZES[0] // size, 3)
+            legacy_rate = await measure(client, f"/legacy/{size}", size, size_rounds)
+            trusted_rate = await measure(client, f"/trusted/{size}", size, size_rounds)
+            print(f"{size:>6} {legacy_rate:>15,.0f} {trusted_rate:>15,.0f} {trusted_rate / legacy_rate:>8.1f}x")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    asyncio.run(run(rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Request Event Hub for Payment Management System
+Fans request.created / request.decided out to Server-Sent Event streams, for both APIs
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Iterable, Optional, Set
+from fastapi.responses import StreamingResponse
+from metrics import metrics
+
+REQUEST_CREATED = "request.created"
+REQUEST_DECIDED = "request.decided"
+
+# (request id, version) pairs remembered to recognise this instance's own writes
+RECENT_PUBLISHED = 10000
+
+# Fields of a request sent with each event (enough to update a list row in place)
+EVENT_REQUEST_FIELDS = (
+    "id", "employee_id", "employee_name", "employee_email", "request_type", "amount", "description",
+    "status", "current_approver_id", "created_at", "updated_at"
+)
+
+class EventHubFullError(Exception):
+    """Raised when the subscriber limit is reached"""
+
+class Subscription:
+    """One connected client: its identity and a bounded queue of encoded SSE frames"""
+
+    __slots__ = ("user_id", "role", "queue", "dropped")
+
+    def __init__(self, user_id: str, role: str, queue_size: int):
+        self.user_id = user_id
+        self.role = role
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+class RequestEventHub:
+    """
+    In-process fan-out of request events to Server-Sent Event streams.
+
+    Subscribers are indexed by user ID and by role, so publishing touches
+    only the subscribers an event is addressed to; each frame is encoded
+    once and the same bytes are queued for every recipient. An idle
+    subscriber costs one small queue and one suspended task. A subscriber
+    whose queue fills up (a stalled client) is disconnected rather than
+    buffered without bound; EventSource reconnects and the client refetches.
+
+    A stream is registered only once its body starts, so a client that
+    disconnects before then never holds a slot. Streams end with an
+    `expired` event when the access token they were opened with expires,
+    and are closed by `revoke` when the user's role changes or the account
+    is removed or disabled; the reconnect is authenticated afresh.
+
+    Configuration (environment variables):
+        EVENTS_MAX_SUBSCRIBERS: open streams per instance (default: 10000)
+        EVENTS_QUEUE_SIZE: frames buffered per subscriber (default: 100)
+        EVENTS_HEARTBEAT_SECONDS: keep-alive comment interval (default: 15)
+    """
+
+    def __init__(self):
+        self.max_subscribers = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "10000"))
+        self.queue_size = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+        self.heartbeat = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+        self._by_user: Dict[str, Set[Subscription]] = {}
+        self._by_role: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+        self._recent: "OrderedDict[tuple, None]" = OrderedDict()
+        self.published = 0
+        self.disconnected_slow = 0
+        self.revoked = 0
+
+    @property
+    def subscribers(self) -> int:
+        return self._count
+
+    @property
+    def is_full(self) -> bool:
+        return self._count >= self.max_subscribers
+
+    def subscribe(self, user_id: str, role: str) -> Subscription:
+        if self.is_full:
+            raise EventHubFullError()
+        subscription = Subscription(user_id, role, self.queue_size)
+        self._by_user.setdefault(user_id, set()).add(subscription)
+        self._by_role.setdefault(role, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for index, key in ((self._by_user, subscription.user_id), (self._by_role, subscription.role)):
+            members = index.get(key)
+            if members is not None and subscription in members:
+                members.discard(subscription)
+                if not members:
+                    del index[key]
+        if not subscription.dropped:
+            subscription.dropped = True
+            self._count -= 1
+
+    def publish(
+        self,
+        event_type: str,
+        request: dict,
+        user_ids: Iterable[Optional[str]] = (),
+        roles: Iterable[str] = ()
+    ) -> int:
+        """Queue an event for the given users and roles; returns the number of recipients"""
+        self._recent[self._key(request)] = None
+        if len(self._recent) > RECENT_PUBLISHED:
+            self._recent.popitem(last=False)
+
+        recipients: Set[Subscription] = set()
+        for user_id in user_ids:
+            if user_id:
+                recipients.update(self._by_user.get(user_id, ()))
+        for role in roles:
+            recipients.update(self._by_role.get(role, ()))
+        if not recipients:
+            return 0
+
+        payload = {"type": event_type, "request": {field: request.get(field) for field in EVENT_REQUEST_FIELDS}}
+        frame = f"event: {event_type}\ndata: {json.dumps(payload, default=str)}\n\n".encode()
+        for subscription in recipients:
+            try:
+                subscription.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+        self.published += 1
+        return len(recipients)
+
+    @staticmethod
+    def _key(request: dict) -> tuple:
+        return (str(request.get("id")), request.get("version", 0))
+
+    def already_published(self, request: dict) -> bool:
+        """Whether this state of `request` was published here (so a relayed copy is a duplicate)"""
+        return self._key(request) in self._recent
+
+    def _close(self, subscription: Subscription):
+        """End a subscriber's stream: empty its queue and leave a close marker"""
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def _drop(self, subscription: Subscription):
+        """Disconnect a subscriber that stopped reading"""
+        self._close(subscription)
+        self.disconnected_slow += 1
+
+    def revoke(self, user_id: str, role: Optional[str] = None) -> int:
+        """
+        Close a user's streams opened under a role other than `role` (all of
+        them when role is None); returns the number closed
+        """
+        closed = 0
+        for subscription in list(self._by_user.get(user_id, ())):
+            if role is None or subscription.role != role:
+                self._close(subscription)
+                closed += 1
+        self.revoked += closed
+        return closed
+
+    def revoke_all(self) -> int:
+        """Close every stream (each reconnect is authenticated again)"""
+        return sum(self.revoke(user_id) for user_id in list(self._by_user))
+
+    async def frames(self, user_id: str, role: str, expires_at: Optional[float] = None) -> AsyncIterator[bytes]:
+        """
+        SSE frames for one subscriber, with heartbeats while idle.
+
+        Subscribes when the body starts and unsubscribes when it ends; stops
+        with an `expired` event at `expires_at` (a Unix timestamp).
+        """
+        try:
+            subscription = self.subscribe(user_id, role)
+        except EventHubFullError:
+            # Filled up since the handler checked; EventSource retries after the hint
+            yield b"retry: 5000\n\n"
+            return
+        try:
+            yield b"retry: 3000\n\nevent: ready\ndata: {}\n\n"
+            while True:
+                timeout = self.heartbeat
+                if expires_at is not None:
+                    remaining = expires_at - time.time()
+                    if remaining <= 0:
+                        yield b"event: expired\ndata: {}\n\n"
+                        return
+                    timeout = min(timeout, remaining)
+                try:
+                    frame = await asyncio.wait_for(subscription.queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    def stream(self, user_id: str, role: str, expires_at: Optional[float] = None) -> StreamingResponse:
+        """
+        Streaming response for one client.
+
+        Raises EventHubFullError if no slot is free, so the handler can
+        answer 503 before the stream starts.
+        """
+        if self.is_full:
+            raise EventHubFullError()
+        return StreamingResponse(
+            self.frames(user_id, role, expires_at),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self._count,
+            "max_subscribers": self.max_subscribers,
+            "published": self.published,
+            "disconnected_slow": self.disconnected_slow,
+            "revoked": self.revoked
+        }
+
+# Global hub instance
+request_events = RequestEventHub()
+
+metrics.register_collector(lambda: [
+    ("event_stream_subscribers", "Open request event streams", {}, request_events.subscribers)
+])
@@ -0,0 +1,85 @@
+"""
+Health Checks for Payment Management System
+Liveness only confirms the process answers; readiness checks MongoDB latency,
+pool saturation, PDF queue depth and email backlog, answering 503 when any fails
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Dict, Union
+from fastapi.responses import JSONResponse
+
+# Readiness thresholds (environment variables)
+CHECK_TIMEOUT = float(os.getenv("READINESS_TIMEOUT_MS", "1000")) / 1000
+MAX_MONGO_LATENCY_MS = float(os.getenv("READINESS_MAX_MONGO_LATENCY_MS", "250"))
+MAX_POOL_UTILIZATION = float(os.getenv("READINESS_MAX_POOL_UTILIZATION", "0.9"))
+MAX_PDF_QUEUE_UTILIZATION = float(os.getenv("READINESS_MAX_PDF_QUEUE_UTILIZATION", "1.0"))
+MAX_OUTBOX_BACKLOG = int(os.getenv("READINESS_MAX_OUTBOX_BACKLOG", "1000"))
+
+def liveness() -> dict:
+    """The process is up and its event loop answers; no dependencies are touched"""
+    return {"status": "alive"}
+
+async def check_mongo(client) -> dict:
+    """Ping MongoDB and compare the round trip with the latency budget"""
+    started = time.perf_counter()
+    await client.admin.command("ping")
+    latency_ms = (time.perf_counter() - started) * 1000
+    return {
+        "ok": latency_ms <= MAX_MONGO_LATENCY_MS,
+        "latency_ms": round(latency_ms, 1),
+        "max_latency_ms": MAX_MONGO_LATENCY_MS
+    }
+
+def check_pool(snapshot: dict, max_pool_size: int) -> dict:
+    """Connection pool saturation from PoolStats counters"""
+    utilization = snapshot["checked_out"] / max(max_pool_size, 1)
+    return {
+        "ok": utilization < MAX_POOL_UTILIZATION,
+        "checked_out": snapshot["checked_out"],
+        "waiting": snapshot["waiting"],
+        "max_pool_size": max_pool_size,
+        "utilization": round(utilization, 3)
+    }
+
+def check_pdf_queue(pool) -> dict:
+    """PDF render queue depth against its bound"""
+    utilization = pool.queue_depth / max(pool.max_queue, 1)
+    return {
+        "ok": utilization < MAX_PDF_QUEUE_UTILIZATION,
+        "queue_depth": pool.queue_depth,
+        "max_queue": pool.max_queue,
+        "utilization": round(utilization, 3)
+    }
+
+async def check_backlog(count: Awaitable[int]) -> dict:
+    """Email outbox messages still waiting for delivery"""
+    backlog = await count
+    return {"ok": backlog <= MAX_OUTBOX_BACKLOG, "backlog": backlog, "max_backlog": MAX_OUTBOX_BACKLOG}
+
+async def _run_check(check: Union[Awaitable[dict], dict]) -> dict:
+    if isinstance(check, dict):
+        return check
+    try:
+        return await asyncio.wait_for(check, timeout=CHECK_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"timed out after {CHECK_TIMEOUT * 1000:.0f} ms"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+async def readiness(checks: Dict[str, Union[Awaitable[dict], dict]]) -> JSONResponse:
+    """
+    Run readiness checks concurrently (each bounded by READINESS_TIMEOUT_MS).
+
+    Answers 200 when every check passes, otherwise 503 so the load balancer
+    stops routing to this instance until it recovers.
+    """
+    names = list(checks)
+    results = await asyncio.gather(*(_run_check(checks[name]) for name in names))
+    report = dict(zip(names, results))
+    ready = all(result["ok"] for result in results)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": report}
+    )
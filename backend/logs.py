@@ -0,0 +1,235 @@
+"""
+Structured Logging for Payment Management System
+JSON log lines written by a background thread, with request correlation IDs and sampling
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from metrics import metrics
+
+# Correlation ID of the HTTP request being served (None outside a request)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Events logged at a fraction of their rate unless LOG_SAMPLE_RATES overrides them
+DEFAULT_SAMPLE_RATES = {"http.request": 0.1, "email.sent": 0.1}
+
+# Standard LogRecord attributes; anything else on a record is an extra field
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+log_records_dropped = metrics.counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse "event=rate,event=rate" into a dict, ignoring malformed entries"""
+    rates = {}
+    for item in value.split(","):
+        name, _, rate = item.partition("=")
+        try:
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event, request_id and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without ever waiting.
+
+    The record is stamped with the current request ID here, on the calling
+    task, because the context variable is not visible from the listener
+    thread. When the queue is full the record is dropped and counted rather
+    than blocking the event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        # Resolve args and tracebacks now; the listener must not touch live objects
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+class LogPipeline:
+    """
+    Structured logging with all output written by a background thread.
+
+    Loggers (including uvicorn's) feed a bounded in-memory queue; a
+    QueueListener thread formats and writes the records, so a slow stdout or
+    log collector never stalls request handling.
+
+    Configuration (environment variables):
+        LOG_LEVEL: minimum level written (default: INFO)
+        LOG_FORMAT: json or text (default: json)
+        LOG_QUEUE_SIZE: records buffered before new ones are dropped (default: 10000)
+        LOG_SAMPLE_RATES: per-event sampling, e.g. "http.request=0.1,email.sent=0.5"
+            (default: http.request=0.1,email.sent=0.1; warnings and errors are never sampled)
+        LOG_SLOW_REQUEST_MS: requests at least this slow are always logged (default: 1000;
+            event streams are long-lived by design and never count as slow)
+    """
+
+    def __init__(self):
+        self.level = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.format = os.getenv("LOG_FORMAT", "json").lower()
+        self.queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+        self.sample_rates = dict(DEFAULT_SAMPLE_RATES)
+        self.sample_rates.update(parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "")))
+        self.slow_request_ms = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+        self._listener: Optional[QueueListener] = None
+
+    def start(self):
+        """Route the root and uvicorn loggers through the queue (idempotent)"""
+        if self._listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stdout)
+        if self.format == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+        log_queue = queue.Queue(maxsize=self.queue_size)
+        handler = NonBlockingQueueHandler(log_queue)
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(self.level)
+        # uvicorn installs its own stdout handlers; send its records through the queue too
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+            logger = logging.getLogger(name)
+            logger.handlers = []
+            logger.propagate = True
+        # One unsampled line per request is what we are avoiding; the sampled
+        # http.request event from RequestContextMiddleware replaces it
+        logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+
+        self._listener = QueueListener(log_queue, output, respect_handler_level=True)
+        self._listener.start()
+
+    def stop(self):
+        """Flush queued records and stop the writer thread"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def log_event(self, logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+        """
+        Log a named event with structured fields, applying its sample rate.
+
+        Sampled-in records carry `sample_rate` so counts can be re-weighted.
+        """
+        if not logger.isEnabledFor(level):
+            return
+        rate = self.sample_rates.get(event, 1.0)
+        if level < logging.WARNING and rate < 1.0:
+            if random.random() >= rate:
+                return
+            fields["sample_rate"] = rate
+        logger.log(level, event, extra=fields)
+
+# Global pipeline
+log_pipeline = LogPipeline()
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    log_pipeline.log_event(logger, event, level, **fields)
+
+access_logger = logging.getLogger("app.access")
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware giving each request a correlation ID and an access log.
+
+    The ID comes from an incoming X-Request-ID header or is generated, is
+    available to every log call made while serving the request, and is echoed
+    back in the response headers. Access lines are sampled (http.request);
+    5xx responses and slow requests are always logged, except Server-Sent
+    Event streams, whose duration is the connection's lifetime.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        status_code = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                streaming = any(
+                    name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in headers
+                )
+                headers.append((REQUEST_ID_HEADER.encode(), request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            fields = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": duration_ms
+            }
+            if status_code >= 500:
+                log_event(access_logger, "http.request", logging.ERROR, **fields)
+            elif duration_ms >= log_pipeline.slow_request_ms and not streaming:
+                log_event(access_logger, "http.request", logging.WARNING, **fields)
+            else:
+                log_event(access_logger, "http.request", **fields)
+            request_id_var.reset(token)
@@ -0,0 +1,62 @@
+"""
+Notification Digest Windows for Payment Management System
+Decides when an approver's batched new-request notices are due, for both the
+standalone API and the app package's DigestScheduler
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+IMMEDIATE = "immediate"
+HOURLY = "hourly"
+DAILY = "daily"
+WEEKLY = "weekly"
+
+FREQUENCIES = (IMMEDIATE, HOURLY, DAILY, WEEKLY)
+
+
+def notification_frequency(user: dict) -> str:
+    """A user's `notifications.notificationFrequency` preference, defaulting to immediate"""
+    preference = (user.get("notifications") or {}).get("notificationFrequency")
+    return preference if preference in FREQUENCIES else IMMEDIATE
+
+
+def wants_email(user: dict) -> bool:
+    """False only when the user has switched email notifications off"""
+    return (user.get("notifications") or {}).get("emailNotifications") is not False
+
+
+def digest_window_end(frequency: str, now: datetime) -> datetime:
+    """End of the digest window that `now` falls into"""
+    if frequency == HOURLY:
+        return now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if frequency == DAILY:
+        return midnight + timedelta(days=1)
+    # Weekly digests go out at the start of Monday
+    return midnight + timedelta(days=7 - now.weekday())
+
+
+def group_digest_items(items: Iterable[dict]) -> List[dict]:
+    """
+    Group parked notices into one digest per approver and window
+
+    Items are dicts with approver_email, approver_name, frequency, window_end,
+    created_at and the notice fields; groups keep notices in creation order.
+    """
+    groups: Dict[tuple, dict] = {}
+    for item in sorted(items, key=lambda item: item["created_at"]):
+        key = (item["approver_email"], item["window_end"])
+        group = groups.setdefault(key, {
+            "approver_email": item["approver_email"],
+            "approver_name": item.get("approver_name", ""),
+            "frequency": item["frequency"],
+            "notices": []
+        })
+        group["notices"].append({
+            "employee_name": item["employee_name"],
+            "request_type": item["request_type"],
+            "amount": item["amount"],
+            "request_id": item["request_id"]
+        })
+    return list(groups.values())
@@ -0,0 +1,168 @@
+"""
+Content-Addressed PDF Cache for Payment Management System
+Keeps rendered PDFs keyed by a hash of their inputs so repeat downloads skip ReportLab
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PDFCache:
+    """
+    Size-bounded LRU cache of rendered PDFs with an optional on-disk tier
+
+    Keys are content fingerprints (see pdf_generator.paycheck_fingerprint),
+    so entries never need invalidating: changed input simply hashes to a new
+    key and the stale entry ages out.
+
+    Configuration (environment variables):
+        PDF_CACHE_MAX_BYTES: memory tier budget (default: 64 MB, 0 disables)
+        PDF_CACHE_DIR: directory for the disk tier (default: disabled)
+        PDF_CACHE_DISK_MAX_BYTES: disk tier budget (default: 1 GB)
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        directory: Optional[str] = None,
+        disk_max_bytes: Optional[int] = None
+    ):
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+        )
+        self.directory = directory or os.getenv("PDF_CACHE_DIR") or None
+        self.disk_max_bytes = disk_max_bytes if disk_max_bytes is not None else int(
+            os.getenv("PDF_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024))
+        )
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        """Rebuild the disk LRU order from file modification times"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pdf"):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return cached PDF bytes, or None on a miss (disk reads run in a thread)"""
+        content = self._memory.get(key)
+        if content is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return content
+
+        if self.directory and key in self._disk:
+            content = await asyncio.to_thread(self._read_file, key)
+            if content is None:
+                self._forget_disk(key)
+            else:
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self._remember(key, content)
+                self.hits += 1
+                return content
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, content: bytes):
+        """Store rendered PDF bytes under their content key (disk writes run in a thread)"""
+        self._remember(key, content)
+        if self.directory and key not in self._disk:
+            if not await asyncio.to_thread(self._write_file, key, content):
+                return
+            if key in self._disk:
+                return
+            # Index bookkeeping stays on the event loop; only file I/O is threaded
+            self._disk[key] = len(content)
+            self._disk_bytes += len(content)
+            evicted: List[str] = []
+            while self._disk_bytes > self.disk_max_bytes and self._disk:
+                oldest = next(iter(self._disk))
+                self._forget_disk(oldest)
+                evicted.append(oldest)
+            if evicted:
+                await asyncio.to_thread(self._remove_files, evicted)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._memory or key in self._disk
+
+    def _remember(self, key: str, content: bytes):
+        if len(content) > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+
+        self._memory[key] = content
+        self._memory_bytes += len(content)
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _read_file(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_file(self, key: str, content: bytes) -> bool:
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("pdf_cache.write_failed", extra={"key": key, "error": str(e)})
+            return False
+        return True
+
+    def _remove_files(self, keys: List[str]):
+        for key in keys:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def _forget_disk(self, key: str):
+        size = self._disk.pop(key, 0)
+        self._disk_bytes -= size
+
+    def stats(self) -> dict:
+        """Hit/miss counters and tier sizes"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
@@ -8,95 +8,333 @@ from reportlab.lib.units import inch
 from reportlab.lib.colors import Color, black, white, grey, blue, orange
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus.frames import Frame
+from reportlab.platypus.doctemplate import PageTemplate
 from reportlab.platypus.flowables import HRFlowable
 from reportlab.graphics.shapes import Drawing, Rect
 from reportlab.graphics.charts.barcharts import VerticalBarChart
 from reportlab.graphics.charts.piecharts import Pie
 from datetime import datetime, date
+from functools import lru_cache
+from types import MappingProxyType
+import hashlib
 import io
-from typing import Dict, Any, Optional
+import itertools
+import json
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import os
 
 
+# Bump whenever paycheck layout or wording changes, so cached PDFs are re-rendered
+TEMPLATE_VERSION = "2"
+
+# Fields that feed into a rendered paycheck (see paycheck_fingerprint)
+PAYCHECK_REQUEST_FIELDS = (
+    'id', 'request_type', 'amount', 'description', 'status',
+    'created_at', 'updated_at', 'approved_at', 'approved_by', 'approval_history'
+)
+PAYCHECK_USER_FIELDS = ('id', 'name', 'email', 'role', 'department')
+
+# Fields the summary report reads from each request
+REPORT_FIELDS = ('id', 'employee_email', 'request_type', 'amount', 'status', 'created_at')
+
+# Rows per detail table chunk on the summary report
+REPORT_ROWS_PER_TABLE = 200
+
+APPROVED_STATUSES = ('approved', 'approved_final')
+
+
+# Company colors - matching the theme
+PRIMARY_COLOR = Color(0.97, 0.45, 0.02)  # Orange #F7720D
+DARK_COLOR = Color(0.1, 0.1, 0.1)        # Dark #1A1A1A
+LIGHT_GREY = Color(0.95, 0.95, 0.95)     # Light grey
+MEDIUM_GREY = Color(0.6, 0.6, 0.6)       # Medium grey
+
+
+def _build_paragraph_styles() -> Dict[str, ParagraphStyle]:
+    """Build the sample stylesheet plus our custom paragraph styles"""
+    styles = getSampleStyleSheet()
+    
+    # Company header style
+    styles.add(ParagraphStyle(
+        name='CompanyHeader',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=PRIMARY_COLOR,
+        spaceAfter=6,
+        alignment=TA_CENTER
+    ))
+    
+    # Document title style
+    styles.add(ParagraphStyle(
+        name='DocumentTitle',
+        parent=styles['Heading2'],
+        fontSize=18,
+        textColor=DARK_COLOR,
+        spaceAfter=12,
+        alignment=TA_CENTER
+    ))
+    
+    # Section header style
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading3'],
+        fontSize=14,
+        textColor=DARK_COLOR,
+        spaceBefore=12,
+        spaceAfter=6,
+        leftIndent=0
+    ))
+    
+    # Field label style
+    styles.add(ParagraphStyle(
+        name='FieldLabel',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=MEDIUM_GREY,
+        spaceAfter=2
+    ))
+    
+    # Field value style
+    styles.add(ParagraphStyle(
+        name='FieldValue',
+        parent=styles['Normal'],
+        fontSize=12,
+        textColor=DARK_COLOR,
+        spaceAfter=8,
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Footer style
+    styles.add(ParagraphStyle(
+        name='Footer',
+        parent=styles['Normal'],
+        fontSize=9,
+        textColor=MEDIUM_GREY,
+        alignment=TA_CENTER
+    ))
+    
+    return dict(styles.byName)
+
+
+def _field_table_style(font_size: int, top_padding: int, bottom_padding: int) -> TableStyle:
+    """Label/value table style used by the info sections"""
+    return TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('TEXTCOLOR', (0, 0), (0, -1), MEDIUM_GREY),
+        ('TEXTCOLOR', (1, 0), (1, -1), DARK_COLOR),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+        ('TOPPADDING', (0, 0), (-1, -1), top_padding),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), bottom_padding),
+    ])
+
+
+def _build_table_styles() -> Dict[str, TableStyle]:
+    """Build every table style used by the generator"""
+    return {
+        # Document info block on the paycheck
+        'doc_info': _field_table_style(10, 2, 6),
+        # Employee/payment details and report summary
+        'fields': _field_table_style(11, 4, 4),
+        # Highlighted payment amount box
+        'amount': TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 16),
+            ('TEXTCOLOR', (0, 0), (0, 0), DARK_COLOR),
+            ('TEXTCOLOR', (1, 0), (1, 0), PRIMARY_COLOR),
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('BACKGROUND', (0, 0), (-1, -1), LIGHT_GREY),
+            ('BOX', (0, 0), (-1, -1), 2, PRIMARY_COLOR),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+            ('TOPPADDING', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ]),
+        # Signature block
+        'signature': TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (2, 0), (2, 0), 'Helvetica-Bold'),
+            ('TEXTCOLOR', (0, 0), (-1, -1), DARK_COLOR),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 4),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ]),
+        # Gridded request details table on the summary report
+        'request_grid': TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BACKGROUND', (0, 0), (-1, 0), LIGHT_GREY),
+            ('TEXTCOLOR', (0, 0), (-1, 0), DARK_COLOR),
+            ('TEXTCOLOR', (0, 1), (-1, -1), DARK_COLOR),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (3, 0), (3, -1), 'RIGHT'),  # Amount column
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 1, MEDIUM_GREY),
+            ('LEFTPADDING', (0, 0), (-1, -1), 6),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 4),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ]),
+    }
+
+
+class PDFTheme:
+    """
+    Paragraph and table styles shared by every render in the process
+    
+    Building the stylesheet is the bulk of per-document setup cost, so it is
+    done once (see get_theme) and exposed through read-only mappings.
+    """
+    
+    def __init__(self):
+        self.primary_color = PRIMARY_COLOR
+        self.dark_color = DARK_COLOR
+        self.light_grey = LIGHT_GREY
+        self.medium_grey = MEDIUM_GREY
+        self.styles = MappingProxyType(_build_paragraph_styles())
+        self.table_styles = MappingProxyType(_build_table_styles())
+
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    """Parse an ISO date/datetime string (or pass a datetime through)"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return None
+
+
+def paycheck_fingerprint(request_data: Dict[str, Any], user_data: Dict[str, Any]) -> str:
+    """
+    Content hash of everything a paycheck is rendered from
+    
+    Rendering is deterministic, so two calls with the same fingerprint produce
+    byte-identical PDFs; the hash is safe to use as a cache key and ETag.
+    """
+    payload = {
+        'template': TEMPLATE_VERSION,
+        'request': {field: request_data.get(field) for field in PAYCHECK_REQUEST_FIELDS},
+        'user': {field: user_data.get(field) for field in PAYCHECK_USER_FIELDS},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def summarize_requests(requests_data: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Count and total requests by status in a single pass"""
+    totals = {
+        'total_requests': 0,
+        'approved_count': 0,
+        'pending_count': 0,
+        'rejected_count': 0,
+        'total_requested': 0.0,
+        'total_approved': 0.0,
+    }
+    
+    for req in requests_data:
+        amount = float(req.get('amount') or 0)
+        status = req.get('status')
+        totals['total_requests'] += 1
+        totals['total_requested'] += amount
+        if status in APPROVED_STATUSES:
+            totals['approved_count'] += 1
+            totals['total_approved'] += amount
+        elif status == 'pending':
+            totals['pending_count'] += 1
+        elif status == 'rejected':
+            totals['rejected_count'] += 1
+    
+    return totals
+
+
+class JsonLinesRows:
+    """
+    Re-iterable rows read lazily from a JSON-lines file
+
+    Lets a report's rows be handed to a worker process as a file path and
+    read back one line at a time, instead of pickling one large list.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+class StreamingDocTemplate(SimpleDocTemplate):
+    """
+    SimpleDocTemplate that lays out flowables pulled from an iterator
+    
+    build() needs the whole story as a list up front. build_iter() feeds the
+    same page layout one flowable at a time through handle_flowable(), so
+    only the flowable being placed (and any part of it split onto the next
+    page) is held in memory.
+    """
+    
+    def build_iter(self, flowables: Iterable):
+        self._calc()
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        # Same First/Later templates as SimpleDocTemplate.build (handle_pageBegin switches to 'Later')
+        self.addPageTemplates([
+            PageTemplate(id='First', frames=frame, pagesize=self.pagesize),
+            PageTemplate(id='Later', frames=frame, pagesize=self.pagesize)
+        ])
+        self._startBuild()
+        self.canv._doctemplate = self
+        try:
+            for flowable in flowables:
+                # handle_flowable consumes the list and pushes back any split-off remainder
+                pending = [flowable]
+                while pending:
+                    self.clean_hanging()
+                    self.handle_flowable(pending)
+        finally:
+            del self.canv._doctemplate
+        self._endBuild()
+
+
+@lru_cache(maxsize=1)
+def get_theme() -> PDFTheme:
+    """Return the process-wide theme, building it on first use"""
+    return PDFTheme()
+
+
 class PaymentPDFGenerator:
     """Professional PDF generator for payment documents"""
     
-    def __init__(self):
+    def __init__(self, theme: Optional[PDFTheme] = None):
         self.page_width, self.page_height = letter
         self.margin = 0.75 * inch
         self.content_width = self.page_width - (2 * self.margin)
         
-        # Company colors - matching the theme
-        self.primary_color = Color(0.97, 0.45, 0.02)  # Orange #F7720D
-        self.dark_color = Color(0.1, 0.1, 0.1)       # Dark #1A1A1A
-        self.light_grey = Color(0.95, 0.95, 0.95)    # Light grey
-        self.medium_grey = Color(0.6, 0.6, 0.6)      # Medium grey
-        
-        # Setup styles
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-    
-    def _setup_custom_styles(self):
-        """Setup custom paragraph styles"""
-        # Company header style
-        self.styles.add(ParagraphStyle(
-            name='CompanyHeader',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            textColor=self.primary_color,
-            spaceAfter=6,
-            alignment=TA_CENTER
-        ))
-        
-        # Document title style
-        self.styles.add(ParagraphStyle(
-            name='DocumentTitle',
-            parent=self.styles['Heading2'],
-            fontSize=18,
-            textColor=self.dark_color,
-            spaceAfter=12,
-            alignment=TA_CENTER
-        ))
-        
-        # Section header style
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Heading3'],
-            fontSize=14,
-            textColor=self.dark_color,
-            spaceBefore=12,
-            spaceAfter=6,
-            leftIndent=0
-        ))
-        
-        # Field label style
-        self.styles.add(ParagraphStyle(
-            name='FieldLabel',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=self.medium_grey,
-            spaceAfter=2
-        ))
-        
-        # Field value style
-        self.styles.add(ParagraphStyle(
-            name='FieldValue',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            textColor=self.dark_color,
-            spaceAfter=8,
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Footer style
-        self.styles.add(ParagraphStyle(
-            name='Footer',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            textColor=self.medium_grey,
-            alignment=TA_CENTER
-        ))
+        # Shared styles - built once per process
+        self.theme = theme or get_theme()
+        self.primary_color = self.theme.primary_color
+        self.dark_color = self.theme.dark_color
+        self.light_grey = self.theme.light_grey
+        self.medium_grey = self.theme.medium_grey
+        self.styles = self.theme.styles
+        self.table_styles = self.theme.table_styles
     
     def _create_header(self):
         """Create document header with company branding"""
@@ -114,7 +352,7 @@ class PaymentPDFGenerator:
         
         return header_elements
     
-    def _create_footer(self):
+    def _create_footer(self, generated_at: Optional[datetime] = None):
         """Create document footer"""
         footer_elements = []
         
@@ -123,7 +361,8 @@ class PaymentPDFGenerator:
         footer_elements.append(Spacer(1, 0.1 * inch))
         
         # Footer text
-        footer_text = f"Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}"
+        generated_at = generated_at or datetime.now()
+        footer_text = f"Generated on {generated_at.strftime('%B %d, %Y at %I:%M %p')}"
         footer_elements.append(Paragraph(footer_text, self.styles['Footer']))
         
         disclaimer = "This document is generated automatically by the Payment Management System."
@@ -131,6 +370,38 @@ class PaymentPDFGenerator:
         
         return footer_elements
     
+    def _create_document(self, buffer: io.BytesIO) -> StreamingDocTemplate:
+        """Create a letter-size document with the standard margins"""
+        return StreamingDocTemplate(
+            buffer,
+            pagesize=letter,
+            rightMargin=self.margin,
+            leftMargin=self.margin,
+            topMargin=self.margin,
+            bottomMargin=self.margin,
+            # Fixed creation date and document ID so identical input gives identical bytes
+            invariant=1
+        )
+    
+    def _build_pdf(self, story: list) -> bytes:
+        """Render a story into PDF bytes"""
+        buffer = io.BytesIO()
+        doc = self._create_document(buffer)
+        doc.build(story)
+        
+        # Get PDF content
+        pdf_content = buffer.getvalue()
+        buffer.close()
+        
+        return pdf_content
+    
+    def _build_pdf_iter(self, flowables: Iterable) -> bytes:
+        """Render flowables into PDF bytes as they are produced"""
+        buffer = io.BytesIO()
+        doc = self._create_document(buffer)
+        doc.build_iter(flowables)
+        return buffer.getvalue()
+    
     def generate_paycheck(self, request_data: Dict[str, Any], user_data: Dict[str, Any]) -> bytes:
         """
         Generate a professional paycheck PDF for an approved payment request
@@ -142,21 +413,55 @@ class PaymentPDFGenerator:
         Returns:
             bytes: PDF content as bytes
         """
-        # Create PDF buffer
-        buffer = io.BytesIO()
+        return self._build_pdf(self._build_paycheck_story(request_data, user_data))
+    
+    def generate_paycheck_bundle(self, paychecks: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> bytes:
+        """
+        Generate one PDF containing several paychecks, each starting on a new page
         
-        # Create document
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            rightMargin=self.margin,
-            leftMargin=self.margin,
-            topMargin=self.margin,
-            bottomMargin=self.margin
-        )
+        Args:
+            paychecks: List of (request_data, user_data) pairs
+            
+        Returns:
+            bytes: PDF content as bytes
+        """
+        story = []
+        for index, (request_data, user_data) in enumerate(paychecks):
+            if index:
+                story.append(PageBreak())
+            story.extend(self._build_paycheck_story(request_data, user_data))
         
-        # Build document content
+        return self._build_pdf(story)
+    
+    def _latest_approval(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Most recent approval history entry, if any"""
+        history = request_data.get('approval_history') or []
+        return history[-1] if history else {}
+    
+    def _issue_date(self, request_data: Dict[str, Any]) -> datetime:
+        """
+        Date printed on a paycheck
+        
+        Taken from the request itself (approval, then last update, then creation)
+        rather than the wall clock, so re-rendering gives the same document.
+        """
+        latest_approval = self._latest_approval(request_data)
+        for value in (
+            request_data.get('approved_at'),
+            latest_approval.get('approved_at'),
+            request_data.get('updated_at'),
+            request_data.get('created_at'),
+        ):
+            parsed = _parse_date(value)
+            if parsed is not None:
+                return parsed
+        return datetime.now()
+    
+    def _build_paycheck_story(self, request_data: Dict[str, Any], user_data: Dict[str, Any]) -> list:
+        """Build the flowables for a single paycheck"""
         story = []
+        issued_at = self._issue_date(request_data)
+        latest_approval = self._latest_approval(request_data)
         
         # Header
         story.extend(self._create_header())
@@ -168,25 +473,13 @@ class PaymentPDFGenerator:
         # Document info table
         doc_info_data = [
             ['Document Number:', f"PAY-{request_data.get('id', '000000')}"],
-            ['Issue Date:', datetime.now().strftime('%B %d, %Y')],
+            ['Issue Date:', issued_at.strftime('%B %d, %Y')],
             ['Status:', 'APPROVED'],
             ['Payment Method:', 'Direct Deposit']
         ]
         
         doc_info_table = Table(doc_info_data, colWidths=[2*inch, 2.5*inch])
-        doc_info_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('TEXTCOLOR', (0, 0), (0, -1), self.medium_grey),
-            ('TEXTCOLOR', (1, 0), (1, -1), self.dark_color),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-            ('TOPPADDING', (0, 0), (-1, -1), 2),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
+        doc_info_table.setStyle(self.table_styles['doc_info'])
         
         story.append(doc_info_table)
         story.append(Spacer(1, 0.3 * inch))
@@ -203,19 +496,7 @@ class PaymentPDFGenerator:
         ]
         
         employee_table = Table(employee_data, colWidths=[2*inch, 3.5*inch])
-        employee_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('TEXTCOLOR', (0, 0), (0, -1), self.medium_grey),
-            ('TEXTCOLOR', (1, 0), (1, -1), self.dark_color),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+        employee_table.setStyle(self.table_styles['fields'])
         
         story.append(employee_table)
         story.append(Spacer(1, 0.3 * inch))
@@ -230,25 +511,13 @@ class PaymentPDFGenerator:
         payment_data = [
             ['Request Type:', request_data.get('request_type', 'Payment').title()],
             ['Description:', request_data.get('description', 'N/A')],
-            ['Request Date:', request_data.get('created_at', datetime.now().strftime('%B %d, %Y'))],
-            ['Approval Date:', request_data.get('approved_at', datetime.now().strftime('%B %d, %Y'))],
-            ['Approved By:', request_data.get('approved_by', 'System')],
+            ['Request Date:', request_data.get('created_at', issued_at.strftime('%B %d, %Y'))],
+            ['Approval Date:', request_data.get('approved_at', issued_at.strftime('%B %d, %Y'))],
+            ['Approved By:', request_data.get('approved_by', latest_approval.get('approver_name', 'System'))],
         ]
         
         payment_table = Table(payment_data, colWidths=[2*inch, 3.5*inch])
-        payment_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('TEXTCOLOR', (0, 0), (0, -1), self.medium_grey),
-            ('TEXTCOLOR', (1, 0), (1, -1), self.dark_color),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+        payment_table.setStyle(self.table_styles['fields'])
         
         story.append(payment_table)
         story.append(Spacer(1, 0.2 * inch))
@@ -259,21 +528,7 @@ class PaymentPDFGenerator:
         ]
         
         amount_table = Table(amount_box_data, colWidths=[3*inch, 2.5*inch])
-        amount_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 16),
-            ('TEXTCOLOR', (0, 0), (0, 0), self.dark_color),
-            ('TEXTCOLOR', (1, 0), (1, 0), self.primary_color),
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BACKGROUND', (0, 0), (-1, -1), self.light_grey),
-            ('BOX', (0, 0), (-1, -1), 2, self.primary_color),
-            ('LEFTPADDING', (0, 0), (-1, -1), 12),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-            ('TOPPADDING', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ]))
+        amount_table.setStyle(self.table_styles['amount'])
         
         story.append(amount_table)
         story.append(Spacer(1, 0.4 * inch))
@@ -294,63 +549,36 @@ class PaymentPDFGenerator:
         # Signature section
         signature_data = [
             ['Approved By:', '_' * 30, 'Date:', '_' * 20],
-            ['', 'Digital Signature', '', datetime.now().strftime('%m/%d/%Y')]
+            ['', 'Digital Signature', '', issued_at.strftime('%m/%d/%Y')]
         ]
         
         signature_table = Table(signature_data, colWidths=[1*inch, 2.5*inch, 0.7*inch, 1.3*inch])
-        signature_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (2, 0), (2, 0), 'Helvetica-Bold'),
-            ('TEXTCOLOR', (0, 0), (-1, -1), self.dark_color),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+        signature_table.setStyle(self.table_styles['signature'])
         
         story.append(signature_table)
         story.append(Spacer(1, 0.5 * inch))
         
         # Footer
-        story.extend(self._create_footer())
-        
-        # Build PDF
-        doc.build(story)
+        story.extend(self._create_footer(issued_at))
         
-        # Get PDF content
-        pdf_content = buffer.getvalue()
-        buffer.close()
-        
-        return pdf_content
+        return story
     
-    def generate_expense_report(self, requests_data: list, date_range: Dict[str, Any]) -> bytes:
+    def generate_expense_report(self, requests_data: Iterable[Dict[str, Any]], date_range: Dict[str, Any]) -> bytes:
         """
         Generate an expense/payment summary report
         
+        Every request is listed; the detail table is split into chunks of
+        REPORT_ROWS_PER_TABLE rows that are only built as ReportLab lays out
+        the pages, so memory stays bounded for very large periods.
+        
         Args:
-            requests_data: List of request dictionaries
+            requests_data: Re-iterable collection of request dictionaries
+                (iterated twice: once for the totals, once for the rows)
             date_range: Dictionary with 'start_date' and 'end_date'
             
         Returns:
             bytes: PDF content as bytes
         """
-        # Create PDF buffer
-        buffer = io.BytesIO()
-        
-        # Create document
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            rightMargin=self.margin,
-            leftMargin=self.margin,
-            topMargin=self.margin,
-            bottomMargin=self.margin
-        )
-        
         # Build document content
         story = []
         
@@ -367,33 +595,18 @@ class PaymentPDFGenerator:
         story.append(Spacer(1, 0.3 * inch))
         
         # Summary statistics
-        total_amount = sum(float(req.get('amount', 0)) for req in requests_data)
-        approved_requests = [req for req in requests_data if req.get('status') in ['approved', 'approved_final']]
-        pending_requests = [req for req in requests_data if req.get('status') == 'pending']
-        rejected_requests = [req for req in requests_data if req.get('status') == 'rejected']
+        totals = summarize_requests(requests_data)
         
         summary_data = [
-            ['Total Requests:', str(len(requests_data))],
-            ['Approved Requests:', str(len(approved_requests))],
-            ['Pending Requests:', str(len(pending_requests))],
-            ['Rejected Requests:', str(len(rejected_requests))],
-            ['Total Amount (Approved):', f"${sum(float(req.get('amount', 0)) for req in approved_requests):,.2f}"]
+            ['Total Requests:', str(totals['total_requests'])],
+            ['Approved Requests:', str(totals['approved_count'])],
+            ['Pending Requests:', str(totals['pending_count'])],
+            ['Rejected Requests:', str(totals['rejected_count'])],
+            ['Total Amount (Approved):', f"${totals['total_approved']:,.2f}"]
         ]
         
         summary_table = Table(summary_data, colWidths=[2.5*inch, 2*inch])
-        summary_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('TEXTCOLOR', (0, 0), (0, -1), self.medium_grey),
-            ('TEXTCOLOR', (1, 0), (1, -1), self.dark_color),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+        summary_table.setStyle(self.table_styles['fields'])
         
         story.append(summary_table)
         story.append(Spacer(1, 0.3 * inch))
@@ -401,59 +614,57 @@ class PaymentPDFGenerator:
         # Detailed requests table
         story.append(Paragraph("Request Details", self.styles['SectionHeader']))
         
-        if requests_data:
-            # Table headers
-            table_data = [['ID', 'Employee', 'Type', 'Amount', 'Status', 'Date']]
-            
-            # Add request data
-            for req in requests_data[:20]:  # Limit to first 20 for space
+        if totals['total_requests']:
+            rest = self._request_detail_tables(requests_data)
+        else:
+            rest = iter([Paragraph("No requests found for the specified period.", self.styles['Normal'])])
+        
+        return self._build_pdf_iter(itertools.chain(story, rest, self._closing_elements()))
+    
+    def _closing_elements(self) -> Iterator:
+        """Spacer and footer that end a report"""
+        yield Spacer(1, 0.5 * inch)
+        yield from self._create_footer()
+    
+    def _request_detail_tables(self, requests_data: Iterable[Dict[str, Any]]) -> Iterator[Table]:
+        """Yield the request details as a series of tables, one chunk of rows at a time"""
+        header = ['ID', 'Employee', 'Type', 'Amount', 'Status', 'Date']
+        col_widths = [0.8*inch, 1.5*inch, 1*inch, 0.8*inch, 0.8*inch, 0.8*inch]
+        
+        rows = iter(requests_data)
+        while True:
+            table_data = [header]
+            for req in itertools.islice(rows, REPORT_ROWS_PER_TABLE):
                 table_data.append([
-                    str(req.get('id', 'N/A'))[:8],
-                    req.get('employee_email', 'N/A')[:20],
-                    req.get('request_type', 'N/A').title()[:15],
-                    f"${float(req.get('amount', 0)):,.0f}",
-                    req.get('status', 'N/A').title(),
-                    req.get('created_at', 'N/A')[:10]
+                    # Projected rows carry missing fields as None, so fall back with `or`
+                    str(req.get('id') or 'N/A')[:8],
+                    (req.get('employee_email') or 'N/A')[:20],
+                    (req.get('request_type') or 'N/A').title()[:15],
+                    f"${float(req.get('amount') or 0):,.0f}",
+                    (req.get('status') or 'N/A').title(),
+                    (req.get('created_at') or 'N/A')[:10]
                 ])
+            if len(table_data) == 1:
+                return
             
-            requests_table = Table(table_data, colWidths=[0.8*inch, 1.5*inch, 1*inch, 0.8*inch, 0.8*inch, 0.8*inch])
-            requests_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BACKGROUND', (0, 0), (-1, 0), self.light_grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), self.dark_color),
-                ('TEXTCOLOR', (0, 1), (-1, -1), self.dark_color),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (3, 0), (3, -1), 'RIGHT'),  # Amount column
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('GRID', (0, 0), (-1, -1), 1, self.medium_grey),
-                ('LEFTPADDING', (0, 0), (-1, -1), 6),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            
-            story.append(requests_table)
-        else:
-            story.append(Paragraph("No requests found for the specified period.", self.styles['Normal']))
-        
-        story.append(Spacer(1, 0.5 * inch))
-        
-        # Footer
-        story.extend(self._create_footer())
-        
-        # Build PDF
-        doc.build(story)
-        
-        # Get PDF content
-        pdf_content = buffer.getvalue()
-        buffer.close()
-        
-        return pdf_content
+            # repeatRows keeps the header on every page the chunk spills onto
+            requests_table = Table(table_data, colWidths=col_widths, repeatRows=1)
+            requests_table.setStyle(self.table_styles['request_grid'])
+            yield requests_table
 
 
 # Utility functions for easy PDF generation
+@lru_cache(maxsize=1)
+def get_default_generator() -> PaymentPDFGenerator:
+    """Return the shared generator used by the utility functions"""
+    return PaymentPDFGenerator()
+
+
+def warm_up():
+    """Build the shared theme ahead of the first render (used as a worker initializer)"""
+    get_default_generator()
+
+
 def generate_paycheck_pdf(request_data: Dict[str, Any], user_data: Dict[str, Any]) -> bytes:
     """
     Utility function to generate a paycheck PDF
@@ -465,16 +676,29 @@ def generate_paycheck_pdf(request_data: Dict[str, Any], user_data: Dict[str, Any
     Returns:
         bytes: PDF content as bytes
     """
-    generator = PaymentPDFGenerator()
-    return generator.generate_paycheck(request_data, user_data)
+    return get_default_generator().generate_paycheck(request_data, user_data)
+
+
+def generate_paycheck_bundle_pdf(paychecks: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> bytes:
+    """
+    Utility function to generate several paychecks as one merged PDF
+    
+    Args:
+        paychecks: List of (request_data, user_data) pairs
+        
+    Returns:
+        bytes: PDF content as bytes
+    """
+    return get_default_generator().generate_paycheck_bundle(paychecks)
 
 
-def generate_report_pdf(requests_data: list, date_range: Dict[str, Any] = None) -> bytes:
+def generate_report_pdf(requests_data: Iterable[Dict[str, Any]], date_range: Dict[str, Any] = None) -> bytes:
     """
     Utility function to generate a summary report PDF
     
     Args:
-        requests_data: List of request dictionaries
+        requests_data: Re-iterable collection of request dictionaries
+            (e.g. JsonLinesRows, so large reports reach the worker as a file)
         date_range: Optional date range dictionary
         
     Returns:
@@ -486,8 +710,7 @@ def generate_report_pdf(requests_data: list, date_range: Dict[str, Any] = None)
             'end_date': datetime.now().strftime('%Y-%m-%d')
         }
     
-    generator = PaymentPDFGenerator()
-    return generator.generate_expense_report(requests_data, date_range)
+    return get_default_generator().generate_expense_report(requests_data, date_range)
 
 
 # Test function
@@ -0,0 +1,226 @@
+"""
+PDF Render Pool for Payment Management System
+Runs ReportLab builds in worker processes so the event loop stays responsive
+"""
+
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Iterable, Optional, Tuple
+
+
+class PDFQueueFullError(Exception):
+    """Raised when the render backlog is at its configured limit"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"PDF render queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PDFSlotLease:
+    """Queue slots claimed from a PDFRenderPool; release() is safe to call more than once"""
+
+    def __init__(self, pool: "PDFRenderPool", slots: int):
+        self.pool = pool
+        self.slots = slots
+
+    def release(self):
+        if self.slots:
+            self.pool.release(self.slots)
+            self.slots = 0
+
+
+class PDFRenderPool:
+    """
+    Bounded process pool for PDF rendering
+
+    Configuration (environment variables):
+        PDF_WORKERS: number of worker processes (default: CPU count)
+        PDF_MAX_QUEUE: maximum renders in flight or waiting (default: 4 x workers)
+        PDF_RETRY_AFTER: minimum Retry-After hint in seconds when saturated (default: 1)
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        min_retry_after: Optional[int] = None,
+        initializer: Optional[Callable[[], None]] = None,
+        on_render: Optional[Callable[[str, float], None]] = None
+    ):
+        self.max_workers = max_workers or int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+        self.max_queue = max_queue or int(os.getenv("PDF_MAX_QUEUE", str(self.max_workers * 4)))
+        self.min_retry_after = min_retry_after or int(os.getenv("PDF_RETRY_AFTER", "1"))
+        # Runs once in each worker process, e.g. to build shared PDF styles
+        self.initializer = initializer
+        # Called with (function name, seconds) after each successful render, e.g. to record a metric
+        self.on_render = on_render
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        # Exponentially weighted average render time, used for Retry-After hints
+        self._avg_render_seconds = 1.0
+
+    def start(self):
+        """Start the worker processes"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=self.initializer
+            )
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of renders currently running or waiting for a worker"""
+        return self._pending
+
+    @property
+    def is_saturated(self) -> bool:
+        return self._pending >= self.max_queue
+
+    def retry_after(self) -> int:
+        """Estimate how long until a worker frees up, in whole seconds"""
+        backlog = self._pending / max(self.max_workers, 1)
+        return max(self.min_retry_after, math.ceil(backlog * self._avg_render_seconds))
+
+    def reserve(self):
+        """
+        Claim a queue slot without submitting work yet
+
+        Raises:
+            PDFQueueFullError: if the backlog is already at max_queue
+        """
+        if self.is_saturated:
+            raise PDFQueueFullError(self.retry_after())
+        self._pending += 1
+
+    def reserve_up_to(self, slots: int) -> int:
+        """
+        Claim as many free queue slots as possible, up to `slots`
+
+        Returns:
+            int: number of slots claimed (at least one)
+
+        Raises:
+            PDFQueueFullError: if no slot is free
+        """
+        self.reserve()
+        claimed = 1
+        while claimed < slots and not self.is_saturated:
+            self._pending += 1
+            claimed += 1
+        return claimed
+
+    def lease(self, slots: int) -> PDFSlotLease:
+        """
+        Claim up to `slots` queue slots as a lease, for work whose end is not
+        tied to one await (e.g. a streamed response, which must release the
+        slots whether or not its body is ever iterated)
+
+        Raises:
+            PDFQueueFullError: if no slot is free
+        """
+        return PDFSlotLease(self, self.reserve_up_to(slots))
+
+    def release(self, slots: int = 1):
+        """Return slots claimed with reserve() or reserve_up_to()"""
+        self._pending -= slots
+
+    async def run_reserved(self, func: Callable[..., bytes], *args: Any) -> bytes:
+        """Run func in a worker process using a slot already claimed with reserve()"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        started = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM kill); replace the pool so later renders
+            # recover. Renders that failed on the same broken pool skip this.
+            if self._executor is executor:
+                self.shutdown()
+                self.start()
+            raise
+
+        elapsed = time.perf_counter() - started
+        self._avg_render_seconds = 0.8 * self._avg_render_seconds + 0.2 * elapsed
+        if self.on_render is not None:
+            self.on_render(getattr(func, "__name__", "unknown"), elapsed)
+        return result
+
+    async def render(self, func: Callable[..., bytes], *args: Any) -> bytes:
+        """
+        Render a PDF in a worker process
+
+        Args:
+            func: Module-level (picklable) render function, e.g. generate_paycheck_pdf
+            *args: Picklable arguments for func
+
+        Returns:
+            bytes: PDF content as bytes
+
+        Raises:
+            PDFQueueFullError: if the backlog is at max_queue
+        """
+        self.reserve()
+        try:
+            return await self.run_reserved(func, *args)
+        finally:
+            self.release()
+
+    async def render_many(
+        self,
+        func: Callable[..., bytes],
+        jobs: Iterable[Tuple[Any, tuple]],
+        slots: int
+    ) -> AsyncIterator[Tuple[Any, Optional[bytes], Optional[BaseException]]]:
+        """
+        Render many PDFs, yielding each one as soon as it finishes
+
+        Keeps at most `slots` renders in flight and pulls jobs lazily, so
+        neither the job list nor the finished PDFs pile up in memory. The
+        slots must already be claimed with reserve_up_to() and are released
+        by the caller.
+
+        Args:
+            func: Module-level (picklable) render function
+            jobs: Iterable of (key, args) pairs
+            slots: Number of concurrent renders
+
+        Yields:
+            (key, pdf_bytes, None) on success or (key, None, error) on failure
+        """
+        jobs = iter(jobs)
+        in_flight = {}
+
+        def submit_next() -> bool:
+            for key, args in jobs:
+                task = asyncio.ensure_future(self.run_reserved(func, *args))
+                in_flight[task] = key
+                return True
+            return False
+
+        try:
+            for _ in range(slots):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    key = in_flight.pop(task)
+                    error = task.exception()
+                    yield key, (None if error else task.result()), error
+                    submit_next()
+        finally:
+            for task in in_flight:
+                task.cancel()
@@ -0,0 +1,579 @@
+"""
+Storage Repositories for the Payment Management API
+One async interface over users and payment requests with an in-memory and a
+MongoDB backend, so handlers never scan a whole table to find their rows
+"""
+
+import copy
+import os
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+
+def request_approver_ids(request: dict) -> Set[str]:
+    """Users a request is assigned to or was decided by"""
+    approvers = {entry.get('approver_id') for entry in request.get('approval_history') or []}
+    approvers.add(request.get('current_approver_id'))
+    approvers.discard(None)
+    return approvers
+
+
+APPROVED_STATUSES = ('approved', 'approved_final')
+
+# Aggregate scopes: every request counts towards ALL_SCOPE and its employee's scope
+ALL_SCOPE = 'all'
+
+# Requests read per batch when the aggregates are rebuilt
+ANALYTICS_REBUILD_BATCH = 1000
+
+
+def employee_scope(employee_id: str) -> str:
+    return f"employee:{employee_id}"
+
+
+def _field_key(value) -> str:
+    """Make a value safe to use as a (Mongo) sub-document key"""
+    return str(value).replace('.', '_').lstrip('$') or 'unknown'
+
+
+def analytics_facts(request: Optional[dict]) -> Optional[tuple]:
+    """The parts of a request the analytics aggregates depend on"""
+    if request is None:
+        return None
+    created_at = request.get('created_at') or ''
+    month = created_at.strftime('%Y-%m') if isinstance(created_at, datetime) else str(created_at)[:7]
+    return (
+        request.get('employee_id'),
+        request.get('status'),
+        request.get('request_type') or 'unknown',
+        month or 'unknown',
+        float(request.get('amount') or 0),
+    )
+
+
+def analytics_changes(before: Optional[tuple], after: Optional[tuple]) -> Dict[str, Dict[str, float]]:
+    """
+    Counter increments per scope for a request going from `before` to `after`
+
+    Either side may be None (a create has no `before`). Fields use dotted
+    paths, e.g. {"all": {"total": 1, "statuses.pending": 1, ...}}.
+    """
+    changes: Dict[str, Dict[str, float]] = {}
+    if before == after:
+        return changes
+
+    for facts, sign in ((before, -1), (after, 1)):
+        if facts is None:
+            continue
+        employee_id, status, request_type, month, amount = facts
+        fields = {
+            'total': sign,
+            f"statuses.{_field_key(status)}": sign,
+            f"types.{_field_key(request_type)}": sign,
+            f"months.{_field_key(month)}": sign,
+            'amount_requested': sign * amount,
+        }
+        if status in APPROVED_STATUSES:
+            fields['amount_approved'] = sign * amount
+        for scope in (ALL_SCOPE, employee_scope(employee_id)):
+            scope_changes = changes.setdefault(scope, {})
+            for field, value in fields.items():
+                scope_changes[field] = scope_changes.get(field, 0) + value
+
+    # Drop fields that cancel out (e.g. an approve only moves between statuses)
+    return {
+        scope: {field: value for field, value in fields.items() if value}
+        for scope, fields in changes.items()
+        if any(fields.values())
+    }
+
+
+def empty_aggregate() -> dict:
+    return {'total': 0, 'statuses': {}, 'types': {}, 'months': {}, 'amount_requested': 0.0, 'amount_approved': 0.0}
+
+
+def aggregate_documents(totals: Dict[str, Dict[str, float]]) -> Dict[str, dict]:
+    """Turn per-scope dotted counters (as from analytics_changes) into whole aggregate documents"""
+    documents = {}
+    for scope, fields in totals.items():
+        aggregate = documents[scope] = empty_aggregate()
+        for field, value in fields.items():
+            if '.' in field:
+                group, key = field.split('.', 1)
+                aggregate[group][key] = value
+            else:
+                aggregate[field] = value
+    return documents
+
+
+class SecondaryIndex:
+    """Maps an attribute value to the set of primary keys that carry it"""
+
+    def __init__(self):
+        self._entries: Dict[str, Set[str]] = {}
+
+    def add(self, key: str, values: Iterable):
+        for value in values:
+            self._entries.setdefault(value, set()).add(key)
+
+    def remove(self, key: str, values: Iterable):
+        for value in values:
+            keys = self._entries.get(value)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._entries[value]
+
+    def lookup(self, value) -> Set[str]:
+        return self._entries.get(value, set())
+
+
+class MemoryUserRepository:
+    """Users held in process memory, indexed by id and email"""
+
+    def __init__(self):
+        self._users: Dict[str, dict] = {}
+        self._ids_by_email: Dict[str, str] = {}
+        self._emails_by_id: Dict[str, str] = {}
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        return self._users.get(user_id)
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        user_id = self._ids_by_email.get(email)
+        return self._users.get(user_id) if user_id is not None else None
+
+    async def add(self, user: dict):
+        if user['email'] in self._ids_by_email:
+            raise ValueError(f"Email already registered: {user['email']}")
+        await self.save(user)
+
+    async def save(self, user: dict):
+        """Persist changes to a user returned by this repository (email changes re-index)"""
+        previous_email = self._emails_by_id.get(user['id'])
+        if previous_email is not None and previous_email != user['email']:
+            del self._ids_by_email[previous_email]
+        self._users[user['id']] = user
+        self._ids_by_email[user['email']] = user['id']
+        self._emails_by_id[user['id']] = user['email']
+
+    async def list_all(self) -> List[dict]:
+        return list(self._users.values())
+
+    async def count(self) -> int:
+        return len(self._users)
+
+
+class MemoryAnalyticsRepository:
+    """Per-scope analytics counters held in process memory"""
+
+    def __init__(self):
+        self._aggregates: Dict[str, dict] = {}
+
+    async def apply(self, changes: Dict[str, Dict[str, float]]):
+        for scope, fields in changes.items():
+            aggregate = self._aggregates.setdefault(scope, empty_aggregate())
+            for field, value in fields.items():
+                if '.' in field:
+                    group, key = field.split('.', 1)
+                    counts = aggregate[group]
+                    counts[key] = counts.get(key, 0) + value
+                else:
+                    aggregate[field] += value
+
+    async def get(self, scope: str) -> dict:
+        return copy.deepcopy(self._aggregates.get(scope) or empty_aggregate())
+
+    async def replace(self, totals: Dict[str, Dict[str, float]]):
+        """Set every aggregate to the given totals"""
+        self._aggregates = aggregate_documents(totals)
+
+    async def is_empty(self) -> bool:
+        return not self._aggregates
+
+
+class MemoryRequestRepository:
+    """
+    Payment requests held in process memory
+
+    Secondary indexes by employee_id, status and approver are kept in step
+    on every add/save, so lookups cost O(result) rather than O(table). The
+    analytics aggregates are updated from the same before/after snapshot.
+    """
+
+    def __init__(self, analytics: MemoryAnalyticsRepository):
+        self._requests: Dict[str, dict] = {}
+        # Index keys and analytics facts each request was last recorded with
+        self._indexed: Dict[str, tuple] = {}
+        self._counted: Dict[str, tuple] = {}
+        self._by_employee = SecondaryIndex()
+        self._by_status = SecondaryIndex()
+        self._by_approver = SecondaryIndex()
+        self._analytics = analytics
+
+    def _index(self, request: dict):
+        request_id = request['id']
+        previous = self._indexed.get(request_id)
+        if previous is not None:
+            employee_id, status, approvers = previous
+            self._by_employee.remove(request_id, [employee_id])
+            self._by_status.remove(request_id, [status])
+            self._by_approver.remove(request_id, approvers)
+
+        current = (request.get('employee_id'), request.get('status'), request_approver_ids(request))
+        self._by_employee.add(request_id, [current[0]])
+        self._by_status.add(request_id, [current[1]])
+        self._by_approver.add(request_id, current[2])
+        self._indexed[request_id] = current
+
+    def _resolve(self, request_ids: Iterable[str]) -> List[dict]:
+        return [self._requests[request_id] for request_id in request_ids]
+
+    async def get(self, request_id: str) -> Optional[dict]:
+        return self._requests.get(request_id)
+
+    async def get_many(self, request_ids: Iterable[str]) -> List[dict]:
+        """Requests for the given ids, in that order, skipping unknown ids"""
+        return [self._requests[rid] for rid in request_ids if rid in self._requests]
+
+    async def _count(self, request: dict):
+        facts = analytics_facts(request)
+        await self._analytics.apply(analytics_changes(self._counted.get(request['id']), facts))
+        self._counted[request['id']] = facts
+
+    async def add(self, request: dict):
+        self._requests[request['id']] = request
+        self._index(request)
+        await self._count(request)
+
+    async def save(self, request: dict):
+        """Persist changes to a request returned by this repository"""
+        self._requests[request['id']] = request
+        self._index(request)
+        await self._count(request)
+
+    async def by_employee(self, employee_id: str, status: Optional[str] = None) -> List[dict]:
+        matches = self._by_employee.lookup(employee_id)
+        if status is not None:
+            matches = matches & self._by_status.lookup(status)
+        return self._resolve(matches)
+
+    async def by_status(self, *statuses: str) -> List[dict]:
+        matches = set()
+        for status in statuses:
+            matches |= self._by_status.lookup(status)
+        return self._resolve(matches)
+
+    async def by_approver(self, approver_id: str, status: Optional[str] = None) -> List[dict]:
+        matches = self._by_approver.lookup(approver_id)
+        if status is not None:
+            matches = matches & self._by_status.lookup(status)
+        return self._resolve(matches)
+
+    async def list_all(self) -> List[dict]:
+        return list(self._requests.values())
+
+    async def iter_batches(self, batch_size: int) -> AsyncIterator[List[dict]]:
+        """Every request, `batch_size` at a time"""
+        requests = list(self._requests.values())
+        for start in range(0, len(requests), batch_size):
+            yield requests[start:start + batch_size]
+
+    async def count(self) -> int:
+        return len(self._requests)
+
+
+class MemoryDigestRepository:
+    """New-request notices parked until their approver's digest window closes"""
+
+    def __init__(self):
+        self._items: Dict[str, dict] = {}
+
+    async def add(self, item: dict):
+        self._items[item['id']] = item
+
+    async def claim_due(self, now: datetime, claim: str, stale_before: datetime) -> List[dict]:
+        """Mark every item whose window has closed (and is unclaimed or stale) as `claim`"""
+        claimed = []
+        for item in self._items.values():
+            if item['window_end'] <= now and (item['claimed_by'] is None or item['claimed_at'] < stale_before):
+                item['claimed_by'] = claim
+                item['claimed_at'] = now
+                claimed.append(item)
+        return claimed
+
+    async def release(self, claim: str):
+        for item in self._items.values():
+            if item['claimed_by'] == claim:
+                item['claimed_by'] = None
+                item['claimed_at'] = None
+
+    async def delete_claimed(self, claim: str):
+        self._items = {key: item for key, item in self._items.items() if item['claimed_by'] != claim}
+
+
+def _from_mongo(document: Optional[dict]) -> Optional[dict]:
+    if document is not None:
+        document.pop('_id', None)
+    return document
+
+
+class MongoUserRepository:
+    """Users in a MongoDB collection keyed by id, with a unique email index"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def ensure_indexes(self):
+        await self._collection.create_index([('email', ASCENDING)], unique=True, name='email_unique')
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        return _from_mongo(await self._collection.find_one({'_id': user_id}))
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return _from_mongo(await self._collection.find_one({'email': email}))
+
+    async def add(self, user: dict):
+        try:
+            await self._collection.insert_one({**user, '_id': user['id']})
+        except DuplicateKeyError as e:
+            raise ValueError(f"Email already registered: {user['email']}") from e
+
+    async def save(self, user: dict):
+        await self._collection.replace_one({'_id': user['id']}, {**user, '_id': user['id']}, upsert=True)
+
+    async def list_all(self) -> List[dict]:
+        return [_from_mongo(doc) async for doc in self._collection.find()]
+
+    async def count(self) -> int:
+        return await self._collection.count_documents({})
+
+
+class MongoAnalyticsRepository:
+    """Per-scope analytics counters, one document per scope updated with $inc (rebuilt with replaces)"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def apply(self, changes: Dict[str, Dict[str, float]]):
+        if changes:
+            await self._collection.bulk_write(
+                [UpdateOne({'_id': scope}, {'$inc': fields}, upsert=True) for scope, fields in changes.items()],
+                ordered=False
+            )
+
+    async def get(self, scope: str) -> dict:
+        document = await self._collection.find_one({'_id': scope}) or {}
+        document.pop('_id', None)
+        return {**empty_aggregate(), **document}
+
+    async def replace(self, totals: Dict[str, Dict[str, float]]):
+        """
+        Overwrite each scope's aggregate with the given totals
+
+        Whole-document replaces are idempotent, so two instances rebuilding
+        at the same time both write the same values instead of adding up.
+        """
+        if totals:
+            await self._collection.bulk_write(
+                [
+                    ReplaceOne({'_id': scope}, document, upsert=True)
+                    for scope, document in aggregate_documents(totals).items()
+                ],
+                ordered=False
+            )
+
+    async def is_empty(self) -> bool:
+        return await self._collection.find_one({}, {'_id': 1}) is None
+
+
+class MongoRequestRepository:
+    """
+    Payment requests in a MongoDB collection keyed by id
+
+    Saves swap the document with find_one_and_replace so the analytics
+    aggregates can be moved by the difference between old and new.
+    """
+
+    def __init__(self, collection, analytics: MongoAnalyticsRepository):
+        self._collection = collection
+        self._analytics = analytics
+
+    async def ensure_indexes(self):
+        await self._collection.create_indexes([
+            IndexModel([('employee_id', ASCENDING), ('status', ASCENDING), ('created_at', DESCENDING)],
+                       name='employee_status_created'),
+            IndexModel([('status', ASCENDING), ('created_at', DESCENDING)], name='status_created'),
+            IndexModel([('approver_ids', ASCENDING), ('status', ASCENDING)], name='approver_status'),
+        ])
+
+    @staticmethod
+    def _to_mongo(request: dict) -> dict:
+        # approver_ids is a stored copy of request_approver_ids() so the approver index can serve lookups
+        return {**request, '_id': request['id'], 'approver_ids': sorted(request_approver_ids(request))}
+
+    @staticmethod
+    def _from_mongo(document: Optional[dict]) -> Optional[dict]:
+        if document is not None:
+            document.pop('approver_ids', None)
+        return _from_mongo(document)
+
+    async def _find(self, query: dict) -> List[dict]:
+        return [self._from_mongo(doc) async for doc in self._collection.find(query)]
+
+    async def get(self, request_id: str) -> Optional[dict]:
+        return self._from_mongo(await self._collection.find_one({'_id': request_id}))
+
+    async def get_many(self, request_ids: Iterable[str]) -> List[dict]:
+        request_ids = list(request_ids)
+        found = {doc['id']: doc for doc in await self._find({'_id': {'$in': request_ids}})}
+        return [found[rid] for rid in request_ids if rid in found]
+
+    async def add(self, request: dict):
+        await self._collection.insert_one(self._to_mongo(request))
+        await self._analytics.apply(analytics_changes(None, analytics_facts(request)))
+
+    async def save(self, request: dict):
+        before = await self._collection.find_one_and_replace(
+            {'_id': request['id']},
+            self._to_mongo(request),
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        await self._analytics.apply(analytics_changes(analytics_facts(before), analytics_facts(request)))
+
+    async def by_employee(self, employee_id: str, status: Optional[str] = None) -> List[dict]:
+        query = {'employee_id': employee_id}
+        if status is not None:
+            query['status'] = status
+        return await self._find(query)
+
+    async def by_status(self, *statuses: str) -> List[dict]:
+        return await self._find({'status': {'$in': list(statuses)}})
+
+    async def by_approver(self, approver_id: str, status: Optional[str] = None) -> List[dict]:
+        query = {'approver_ids': approver_id}
+        if status is not None:
+            query['status'] = status
+        return await self._find(query)
+
+    async def list_all(self) -> List[dict]:
+        return await self._find({})
+
+    async def iter_batches(self, batch_size: int) -> AsyncIterator[List[dict]]:
+        """Every request, read from a cursor `batch_size` documents at a time"""
+        batch = []
+        async for document in self._collection.find({}).batch_size(batch_size):
+            batch.append(self._from_mongo(document))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def count(self) -> int:
+        return await self._collection.count_documents({})
+
+
+class MongoDigestRepository:
+    """Parked digest notices in a MongoDB collection, claimed with one update_many per flush"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def ensure_indexes(self):
+        await self._collection.create_indexes([
+            IndexModel([('window_end', ASCENDING), ('claimed_by', ASCENDING)], name='window_claim'),
+            IndexModel([('claimed_by', ASCENDING)], name='claimed_by'),
+        ])
+
+    async def add(self, item: dict):
+        await self._collection.insert_one({**item, '_id': item['id']})
+
+    async def claim_due(self, now: datetime, claim: str, stale_before: datetime) -> List[dict]:
+        await self._collection.update_many(
+            {
+                'window_end': {'$lte': now},
+                '$or': [{'claimed_by': None}, {'claimed_at': {'$lt': stale_before}}]
+            },
+            {'$set': {'claimed_by': claim, 'claimed_at': now}}
+        )
+        return [_from_mongo(doc) async for doc in self._collection.find({'claimed_by': claim})]
+
+    async def release(self, claim: str):
+        await self._collection.update_many({'claimed_by': claim}, {'$set': {'claimed_by': None, 'claimed_at': None}})
+
+    async def delete_claimed(self, claim: str):
+        await self._collection.delete_many({'claimed_by': claim})
+
+
+class Store:
+    """
+    The users, requests, analytics and digest repositories for one backend
+
+    `event_listeners` are passed to the Motor client of the mongo backend
+    (e.g. a command listener that records query latency).
+
+    Configuration (environment variables):
+        STORE_BACKEND: "memory" (default) or "mongo"
+        MONGODB_URL / DATABASE_NAME: connection for the mongo backend
+    """
+
+    def __init__(self, backend: Optional[str] = None, event_listeners: Iterable = ()):
+        self.backend = backend or os.getenv("STORE_BACKEND", "memory")
+        self.client = None
+        if self.backend == "memory":
+            self.users = MemoryUserRepository()
+            self.analytics = MemoryAnalyticsRepository()
+            self.requests = MemoryRequestRepository(self.analytics)
+            self.digests = MemoryDigestRepository()
+        elif self.backend == "mongo":
+            self.client = AsyncIOMotorClient(os.getenv("MONGODB_URL"), event_listeners=list(event_listeners))
+            database = self.client[os.getenv("DATABASE_NAME", "payment_management")]
+            self.users = MongoUserRepository(database["users"])
+            self.analytics = MongoAnalyticsRepository(database["analytics_aggregates"])
+            self.requests = MongoRequestRepository(database["requests"], self.analytics)
+            self.digests = MongoDigestRepository(database["notification_digest_items"])
+        else:
+            raise ValueError(f"Unknown STORE_BACKEND: {self.backend}")
+
+    async def open(self, seed_users: Iterable[dict] = (), seed_requests: Iterable[dict] = ()):
+        """Create indexes (mongo) and insert any seed records that are not stored yet"""
+        if self.backend == "mongo":
+            await self.users.ensure_indexes()
+            await self.requests.ensure_indexes()
+            await self.digests.ensure_indexes()
+            if await self.analytics.is_empty():
+                await self.rebuild_analytics()
+
+        for user in seed_users:
+            if await self.users.get_by_email(user['email']) is None:
+                await self.users.add(copy.deepcopy(user))
+        for request in seed_requests:
+            if await self.requests.get(request['id']) is None:
+                await self.requests.add(copy.deepcopy(request))
+
+    async def rebuild_analytics(self):
+        """
+        Recompute every aggregate from the stored requests (one pass) and overwrite them
+
+        Requests are read in batches, so memory grows with the number of
+        scopes rather than the size of the collection.
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        async for batch in self.requests.iter_batches(ANALYTICS_REBUILD_BATCH):
+            for request in batch:
+                for scope, fields in analytics_changes(None, analytics_facts(request)).items():
+                    scope_totals = totals.setdefault(scope, {})
+                    for field, value in fields.items():
+                        scope_totals[field] = scope_totals.get(field, 0) + value
+        await self.analytics.replace(totals)
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
@@ -0,0 +1,247 @@
+"""
+Approval endpoint tests - conditional decisions against an in-memory MongoDB (mongomock-motor)
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+from bson import ObjectId
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from app.models import BulkApproval, RequestApproval, User
+from app.routers import requests as requests_router
+
+MANAGER = User(_id="manager-1", email="manager@example.com", full_name="Manager One", role="manager")
+OTHER_MANAGER = User(_id="manager-2", email="manager2@example.com", full_name="Manager Two", role="manager")
+HR = User(_id="hr-1", email="hr@example.com", full_name="HR One", role="hr")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Fresh database for the requests router, with email delivery captured"""
+    database = AsyncMongoMockClient()["payment_management_test"]
+
+    async def get_database():
+        return database
+
+    queued = []
+
+    async def enqueue_many(messages):
+        queued.extend(messages)
+        return len(messages)
+
+    monkeypatch.setattr(requests_router, "get_database", get_database)
+    monkeypatch.setattr(requests_router.email_outbox, "enqueue_many", enqueue_many)
+    database.queued_emails = queued
+    return database
+
+
+def insert_request(db, **fields) -> str:
+    now = datetime.utcnow()
+    document = {
+        "employee_id": "employee-1",
+        "employee_name": "Test Employee",
+        "employee_email": "test@example.com",
+        "request_type": "reimbursement",
+        "amount": 120.0,
+        "description": "Travel",
+        "status": "pending",
+        "current_approver_id": MANAGER.id,
+        "version": 0,
+        "created_at": now,
+        "updated_at": now,
+        **fields
+    }
+    result = asyncio.run(db.requests.insert_one(document))
+    return str(result.inserted_id)
+
+
+def decide(request_id: str, user: User, status: str, expected_version=None, comments=None):
+    approval = RequestApproval(status=status, comments=comments, expected_version=expected_version)
+    return asyncio.run(requests_router.approve_reject_request(request_id, approval, current_user=user))
+
+
+def decide_error(request_id: str, user: User, status: str, expected_version=None) -> HTTPException:
+    with pytest.raises(HTTPException) as error:
+        decide(request_id, user, status, expected_version)
+    return error.value
+
+
+def test_assigned_manager_decision_is_applied(db):
+    request_id = insert_request(db)
+
+    response = decide(request_id, MANAGER, "approved_l1", expected_version=0, comments="Looks fine")
+
+    assert response["request"].status == "approved_l1"
+    assert response["request"].version == 1
+    stored = asyncio.run(db.requests.find_one({"_id": ObjectId(request_id)}))
+    assert stored["latest_decision"]["approver_id"] == MANAGER.id
+    events = asyncio.run(db.approval_events.find({"request_id": request_id}).to_list(None))
+    assert [event["status"] for event in events] == ["approved_l1"]
+    assert len(db.queued_emails) == 1
+
+
+def test_invalid_id_is_rejected(db):
+    assert decide_error("not-an-id", HR, "rejected").status_code == 400
+
+
+def test_missing_request_is_not_found(db):
+    assert decide_error(str(ObjectId()), HR, "rejected").status_code == 404
+
+
+def test_unassigned_manager_is_forbidden(db):
+    request_id = insert_request(db)
+
+    assert decide_error(request_id, OTHER_MANAGER, "approved_l1").status_code == 403
+    stored = asyncio.run(db.requests.find_one({"_id": ObjectId(request_id)}))
+    assert stored["status"] == "pending" and stored["version"] == 0
+
+
+def test_stale_expected_version_conflicts(db):
+    request_id = insert_request(db, version=2)
+
+    error = decide_error(request_id, MANAGER, "approved_l1", expected_version=1)
+
+    assert error.status_code == 409
+    assert error.detail["status"] == "pending"
+    assert error.detail["version"] == 2
+
+
+def test_already_decided_request_conflicts(db):
+    request_id = insert_request(db)
+    decide(request_id, HR, "rejected")
+
+    error = decide_error(request_id, HR, "approved_final")
+
+    assert error.status_code == 409
+    assert error.detail["status"] == "rejected"
+    assert len(db.queued_emails) == 1
+
+
+def test_legacy_request_without_version_counts_as_version_zero(db):
+    request_id = insert_request(db)
+    asyncio.run(db.requests.update_one({"_id": ObjectId(request_id)}, {"$unset": {"version": ""}}))
+
+    assert decide_error(request_id, MANAGER, "approved_l1", expected_version=1).detail["version"] == 0
+    response = decide(request_id, MANAGER, "approved_l1", expected_version=0)
+
+    assert response["request"].version == 1
+
+
+def test_racing_decisions_have_one_winner(db):
+    request_id = insert_request(db, status="approved_l1", version=1)
+
+    async def race():
+        return await asyncio.gather(*(
+            requests_router.approve_reject_request(
+                request_id, RequestApproval(status=status, expected_version=1), current_user=HR
+            )
+            for status in ("approved_final", "rejected")
+        ), return_exceptions=True)
+
+    outcomes = asyncio.run(race())
+
+    winners = [outcome for outcome in outcomes if isinstance(outcome, dict)]
+    losers = [outcome for outcome in outcomes if isinstance(outcome, HTTPException)]
+    assert len(winners) == 1 and [loser.status_code for loser in losers] == [409]
+    stored = asyncio.run(db.requests.find_one({"_id": ObjectId(request_id)}))
+    assert stored["status"] == winners[0]["request"].status
+    assert asyncio.run(db.approval_events.count_documents({"request_id": request_id})) == 1
+
+
+
+def bulk_decide(request_ids, user: User, status: str):
+    bulk = BulkApproval(request_ids=request_ids, status=status)
+    return asyncio.run(requests_router.bulk_approve_reject_requests(bulk, current_user=user))
+
+
+def test_bulk_reports_each_item(db):
+    assigned = insert_request(db)
+    unassigned = insert_request(db, current_approver_id=OTHER_MANAGER.id)
+    decided = insert_request(db, status="rejected", current_approver_id=MANAGER.id, version=1)
+    missing = str(ObjectId())
+
+    result = bulk_decide([assigned, unassigned, decided, missing, "not-an-id", assigned], MANAGER, "approved_l1")
+
+    assert [(item.request_id, item.result) for item in result.results] == [
+        (assigned, "updated"),
+        (unassigned, "forbidden"),
+        (decided, "conflict"),
+        (missing, "not_found"),
+        ("not-an-id", "invalid_id")
+    ]
+    assert (result.updated, result.failed) == (1, 4)
+    assert result.results[0].status == "approved_l1" and result.results[0].version == 1
+    events = asyncio.run(db.approval_events.find().to_list(None))
+    assert [event["request_id"] for event in events] == [assigned]
+    assert len(db.queued_emails) == 1
+
+
+def test_bulk_loses_to_an_earlier_decision(db):
+    first, second = insert_request(db), insert_request(db)
+    decide(second, HR, "rejected")
+
+    result = bulk_decide([first, second], HR, "approved_final")
+
+    assert [item.result for item in result.results] == ["updated", "conflict"]
+    # The request another approver decided keeps their decision
+    assert result.results[1].status == "rejected"
+    stored = asyncio.run(db.requests.find_one({"_id": ObjectId(second)}))
+    assert stored["latest_decision"]["status"] == "rejected"
+
+
+def test_concurrent_bulk_calls_split_the_winners(db):
+    request_ids = [insert_request(db) for _ in range(6)]
+
+    async def race():
+        return await asyncio.gather(
+            requests_router.bulk_approve_reject_requests(
+                BulkApproval(request_ids=request_ids, status="approved_final"), current_user=HR
+            ),
+            requests_router.bulk_approve_reject_requests(
+                BulkApproval(request_ids=list(reversed(request_ids)), status="rejected"), current_user=HR
+            )
+        )
+
+    approved, rejected = asyncio.run(race())
+
+    # Every request is won by exactly one call, and each call reports what it won
+    assert approved.updated + rejected.updated == len(request_ids)
+    won = {item.request_id for result in (approved, rejected) for item in result.results if item.result == "updated"}
+    assert won == set(request_ids)
+    for result in (approved, rejected):
+        for item in result.results:
+            assert item.result in ("updated", "conflict")
+    assert asyncio.run(db.approval_events.count_documents({})) == len(request_ids)
+
+
+def test_failed_history_write_keeps_the_decision(db, monkeypatch):
+    request_id = insert_request(db)
+
+    async def insert_many(*args, **kwargs):
+        raise RuntimeError("history unavailable")
+
+    monkeypatch.setattr(type(db.approval_events), "insert_many", insert_many)
+
+    response = decide(request_id, MANAGER, "approved_l1")
+
+    assert response["request"].status == "approved_l1"
+    assert len(db.queued_emails) == 1
+
+
+def test_failed_history_write_keeps_bulk_decisions(db, monkeypatch):
+    request_ids = [insert_request(db), insert_request(db)]
+
+    async def insert_many(*args, **kwargs):
+        raise RuntimeError("history unavailable")
+
+    monkeypatch.setattr(type(db.approval_events), "insert_many", insert_many)
+
+    result = bulk_decide(request_ids, MANAGER, "approved_l1")
+
+    assert result.updated == 2
+    assert len(db.queued_emails) == 2
@@ -0,0 +1,94 @@
+"""
+Change listener tests - the updated_at polling fallback used on a standalone server
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+from mongomock_motor import AsyncMongoMockClient
+
+from app import database as database_module
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def listener(monkeypatch):
+    monkeypatch.setattr(database_module.db, "database", AsyncMongoMockClient()["payment_management_test"])
+    listener = database_module.ChangeListener()
+    listener.changes_seen = []
+    listener.on("users", lambda change: listener.changes_seen.append(
+        (change["document_id"], change["document"]["updated_at"])
+    ))
+    return listener
+
+
+def users():
+    return database_module.db.database.users
+
+
+def poll(listener, since, seen):
+    """One polling pass; returns the new high-water mark and the changes it dispatched"""
+    listener.changes_seen.clear()
+    since = asyncio.run(listener._poll_collection("users", since, seen))
+    return since, list(listener.changes_seen)
+
+
+def test_first_poll_starts_from_the_collection_not_the_local_clock(listener):
+    asyncio.run(users().insert_one({"_id": "existing", "updated_at": START}))
+
+    assert asyncio.run(listener._latest_update("users")) == START
+    asyncio.run(users().delete_many({}))
+    assert asyncio.run(listener._latest_update("users")) == database_module.POLL_EPOCH
+
+
+def test_bulk_write_sharing_one_timestamp_spans_pages(listener):
+    since, seen = START, {}
+    count = database_module.POLL_PAGE_SIZE * 2 + 7
+    asyncio.run(users().insert_many([
+        {"_id": f"user-{i:04d}", "updated_at": START + timedelta(seconds=1)} for i in range(count)
+    ]))
+
+    since, changes = poll(listener, since, seen)
+
+    assert len(changes) == count and len(set(changes)) == count
+    assert since == START + timedelta(seconds=1)
+
+
+def test_late_commit_inside_the_lookback_is_seen_once(listener):
+    asyncio.run(users().insert_one({"_id": "fresh", "updated_at": START + timedelta(seconds=30)}))
+    seen = {}
+    since, _ = poll(listener, START, seen)
+
+    # Stamped before the high-water mark but committed after the last poll
+    late = START + timedelta(seconds=30) - listener.poll_lookback / 2
+    asyncio.run(users().insert_one({"_id": "late", "updated_at": late}))
+    since, changes = poll(listener, since, seen)
+    assert changes == [("late", late)]
+
+    assert poll(listener, since, seen)[1] == []
+
+
+def test_repeat_updates_are_dispatched_again(listener):
+    asyncio.run(users().insert_one({"_id": "user", "updated_at": START}))
+    since, seen = START, {}
+    since, _ = poll(listener, since, seen)
+
+    asyncio.run(users().update_one({"_id": "user"}, {"$set": {"updated_at": START + timedelta(seconds=1)}}))
+
+    assert poll(listener, since, seen)[1] == [("user", START + timedelta(seconds=1))]
+
+
+def test_entries_older_than_the_lookback_are_forgotten(listener):
+    asyncio.run(users().insert_many([
+        {"_id": "old", "updated_at": START},
+        {"_id": "new", "updated_at": START + listener.poll_lookback * 3}
+    ]))
+    seen = {}
+
+    poll(listener, START, seen)
+
+    assert set(seen) == {"new"}
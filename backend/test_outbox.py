@@ -0,0 +1,132 @@
+"""
+Email outbox tests - claiming, leases, retries and a worker that survives failures
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+from mongomock_motor import AsyncMongoMockClient
+
+from app.utils import outbox as outbox_module
+
+
+class FakeSender:
+    """Records sends; subjects listed in `failing` raise, those in `erroring` return an error result"""
+
+    def __init__(self, failing=(), erroring=()):
+        self.failing = set(failing)
+        self.erroring = set(erroring)
+        self.sent = []
+
+    async def send_email(self, to_emails, subject, html_content, plain_text_content=None):
+        if subject in self.failing:
+            raise RuntimeError("smtp down")
+        if subject in self.erroring:
+            return {"status": "error", "message": "rejected"}
+        self.sent.append(subject)
+        return {"status": "success"}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = AsyncMongoMockClient()["payment_management_test"]
+
+    async def get_database():
+        return database
+
+    monkeypatch.setattr(outbox_module, "get_database", get_database)
+    return database
+
+
+def run(db, sender, scenario):
+    """Run `scenario(outbox)` on a fresh outbox (its Event and Semaphore belong to one loop)"""
+    async def main():
+        return await scenario(outbox_module.EmailOutbox(sender=sender))
+    return asyncio.run(main())
+
+
+def statuses(db) -> dict:
+    documents = asyncio.run(db.email_outbox.find().to_list(None))
+    return {document["subject"]: document for document in documents}
+
+
+def test_claim_skips_live_leases_and_reclaims_expired_ones(db):
+    now = datetime.utcnow()
+    asyncio.run(db.email_outbox.insert_many([
+        {"subject": "due", "status": "pending", "attempts": 0, "next_attempt_at": now - timedelta(seconds=1)},
+        {"subject": "later", "status": "pending", "attempts": 1, "next_attempt_at": now + timedelta(minutes=5)},
+        {"subject": "leased", "status": "sending", "attempts": 1, "next_attempt_at": now, "locked_until": now + timedelta(minutes=1)},
+        {"subject": "abandoned", "status": "sending", "attempts": 1, "next_attempt_at": now, "locked_until": now - timedelta(seconds=1)}
+    ]))
+
+    async def claim(outbox):
+        return await outbox._claim_batch()
+
+    batch = run(db, FakeSender(), claim)
+
+    assert sorted(document["subject"] for document in batch) == ["abandoned", "due"]
+    stored = statuses(db)
+    assert stored["abandoned"]["attempts"] == 2 and stored["abandoned"]["locked_until"] > now
+    assert stored["leased"]["attempts"] == 1
+
+
+def test_failed_send_is_retried_with_backoff_then_failed(db):
+    async def deliver_due(outbox):
+        # Make the message due now, whatever its backoff
+        await db.email_outbox.update_many({}, {"$set": {"next_attempt_at": datetime.utcnow()}})
+        for document in await outbox._claim_batch():
+            await outbox._deliver(document)
+
+    async def scenario(outbox):
+        outbox.max_attempts = 2
+        await outbox.enqueue(["a@example.com"], "bounce", "<p>")
+        await deliver_due(outbox)
+        retried = await db.email_outbox.find_one({})
+        await deliver_due(outbox)
+        return retried
+
+    retried = run(db, FakeSender(erroring=["bounce"]), scenario)
+
+    assert retried["status"] == "pending" and retried["last_error"] == "rejected"
+    assert retried["next_attempt_at"] >= retried["updated_at"] + timedelta(seconds=30)
+    assert statuses(db)["bounce"]["status"] == "failed"
+
+
+def test_worker_survives_a_raising_sender(db):
+    sender = FakeSender(failing=["boom"])
+
+    async def scenario(outbox):
+        outbox.poll_interval = 0.01
+        await outbox.enqueue(["a@example.com"], "boom", "<p>")
+        await outbox.enqueue(["a@example.com"], "ok", "<p>")
+        outbox.start()
+        await asyncio.sleep(0.2)
+        alive = not outbox._task.done()
+        await outbox.stop()
+        return alive
+
+    assert run(db, sender, scenario)
+    stored = statuses(db)
+    assert stored["ok"]["status"] == "sent"
+    assert stored["boom"]["status"] == "pending" and stored["boom"]["last_error"] == "smtp down"
+    assert sender.sent == ["ok"]
+
+
+def test_failed_status_update_leaves_the_message_leased(db):
+    async def scenario(outbox):
+        async def record(document, result):
+            raise RuntimeError("primary stepped down")
+
+        outbox._record = record
+        await outbox.enqueue(["a@example.com"], "ok", "<p>")
+        for document in await outbox._claim_batch():
+            await outbox._deliver(document)
+
+    run(db, FakeSender(), scenario)
+
+    # Claimed again once the lease expires rather than lost
+    stored = statuses(db)["ok"]
+    assert stored["status"] == "sending" and stored["locked_until"] > datetime.utcnow()
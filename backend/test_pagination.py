@@ -0,0 +1,51 @@
+"""
+Keyset cursor tests - cursors round-trip and pages cover a listing exactly once
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.utils.pagination import KEYSET_SORT, apply_keyset, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips_object_ids():
+    document = {"_id": ObjectId(), "created_at": datetime(2026, 3, 1, 12, 30, 15, 250000)}
+
+    assert decode_cursor(encode_cursor(document)) == (document["created_at"], document["_id"])
+
+
+def test_cursor_round_trips_string_ids_and_missing_created_at():
+    assert decode_cursor(encode_cursor({"_id": "legacy-1"})) == (None, "legacy-1")
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "eyJ4IjoxfQ", encode_cursor({"_id": "x"})[:-4]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_document_once():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    collection = mongomock_motor.AsyncMongoMockClient()["payment_management_test"]["requests"]
+    start = datetime(2026, 1, 1)
+    documents = [{"_id": ObjectId(), "created_at": start + timedelta(minutes=i // 3)} for i in range(20)]
+    # Ties on created_at and documents written before created_at existed
+    documents += [{"_id": ObjectId()} for _ in range(3)]
+    asyncio.run(collection.insert_many(documents))
+
+    async def read_all(page_size):
+        seen, cursor = [], None
+        while True:
+            page = await collection.find(apply_keyset({}, cursor)).sort(KEYSET_SORT).limit(page_size).to_list(page_size)
+            seen.extend(document["_id"] for document in page)
+            if len(page) < page_size:
+                return seen
+            cursor = encode_cursor(page[-1])
+
+    expected = [document["_id"] for document in asyncio.run(collection.find().sort(KEYSET_SORT).to_list(None))]
+    assert len(expected) == len(documents)
+    for page_size in (1, 4, 7, 50):
+        assert asyncio.run(read_all(page_size)) == expected
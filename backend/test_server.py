@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Depends, Form, File, UploadFile, Request
+from fastapi import FastAPI, HTTPException, Depends, Form, File, UploadFile, Request, Header, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from fastapi.responses import StreamingResponse
@@ -9,19 +9,51 @@ from datetime import datetime, timedelta
 import hashlib
 import uuid
 import json
+import asyncio
 import io
+import os
+import tempfile
+import zipfile
+import logging
 
 # Import our PDF generator
 try:
-    from pdf_generator import generate_paycheck_pdf, generate_report_pdf
+    from pdf_generator import (
+        generate_paycheck_pdf, generate_paycheck_bundle_pdf, generate_report_pdf,
+        paycheck_fingerprint, warm_up as warm_up_pdf, REPORT_FIELDS, JsonLinesRows
+    )
 except ImportError as e:
-    print(f"Warning: Could not import PDF generator - {e}")
+    logging.getLogger("test_server").warning("pdf.generator_unavailable", extra={"error": str(e)})
     generate_paycheck_pdf = None
+    generate_paycheck_bundle_pdf = None
     generate_report_pdf = None
+    warm_up_pdf = None
+    REPORT_FIELDS = ()
+    JsonLinesRows = None
+
+from pdf_worker import PDFRenderPool, PDFQueueFullError, PDFSlotLease
+from pdf_cache import PDFCache
+from repository import Store, ALL_SCOPE, APPROVED_STATUSES, employee_scope
+from notification_digest import IMMEDIATE, notification_frequency, wants_email, digest_window_end, group_digest_items
+import health as health_checks
+from metrics import metrics, metrics_response, MetricsMiddleware, mongo_command_metrics, pdf_render_duration
+from logs import log_pipeline, log_event, RequestContextMiddleware
+from events import request_events, EventHubFullError, REQUEST_CREATED, REQUEST_DECIDED
+
+logger = logging.getLogger("test_server")
 
 # Simple FastAPI app for testing
 app = FastAPI(title="Payment Management Test API")
 
+# Worker processes for PDF rendering (sized by PDF_WORKERS / PDF_MAX_QUEUE)
+pdf_pool = PDFRenderPool(
+    initializer=warm_up_pdf,
+    on_render=lambda document, seconds: pdf_render_duration.observe(seconds, document=document)
+)
+
+# Rendered paychecks keyed by content hash (sized by PDF_CACHE_MAX_BYTES / PDF_CACHE_DIR)
+paycheck_cache = PDFCache()
+
 # CORS middleware configured for production
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +67,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latency histograms, in-flight gauge and status counts for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Correlation IDs and sampled access logs (outermost, so every log line carries the ID)
+app.add_middleware(RequestContextMiddleware)
+
+def collect_runtime_gauges():
+    """PDF queue and cache state sampled at scrape time"""
+    cache = paycheck_cache.stats()
+    return [
+        ("pdf_queue_depth", "PDF renders running or waiting for a worker", {}, pdf_pool.queue_depth),
+        ("pdf_queue_limit", "Maximum PDF renders admitted at once", {}, pdf_pool.max_queue),
+        ("paycheck_cache_bytes", "Bytes held by the paycheck PDF cache", {"tier": "memory"}, cache["memory_bytes"]),
+    ]
+
+metrics.register_collector(collect_runtime_gauges)
+
 # Secret key for JWT
 SECRET_KEY = "test-secret-key-for-development"
 ALGORITHM = "HS256"
@@ -42,8 +91,8 @@ ALGORITHM = "HS256"
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-# Simple in-memory user store
-users_db = {
+# Demo accounts, seeded into the store at startup if missing
+SEED_USERS = {
     "test@example.com": {
         "id": "user_1",
         "email": "test@example.com",
@@ -67,8 +116,8 @@ users_db = {
     }
 }
 
-# In-memory requests store with sample data
-requests_db = {
+# Sample requests, seeded into the store at startup if missing
+SEED_REQUESTS = {
     "req_001": {
         "id": "req_001",
         "employee_id": "user_1",
@@ -111,6 +160,9 @@ requests_db = {
     }
 }
 
+# Users and requests, in memory or in MongoDB (STORE_BACKEND)
+store = Store(event_listeners=[mongo_command_metrics])
+
 class UserResponse(BaseModel):
     id: str
     email: str
@@ -148,6 +200,14 @@ class ApprovalRequest(BaseModel):
     status: str  # 'approved_final' or 'rejected'
     comments: Optional[str] = None
 
+class PaycheckBatchRequest(BaseModel):
+    request_ids: Optional[List[str]] = None  # Explicit list; overrides the filters below
+    status: Optional[str] = None  # Defaults to all approved statuses
+    start_date: Optional[str] = None  # YYYY-MM-DD, matched against created_at
+    end_date: Optional[str] = None
+    department: Optional[str] = None
+    format: str = "zip"  # 'zip' (one file per paycheck) or 'pdf' (merged)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password using simple hash"""
     return hashlib.sha256(plain_password.encode()).hexdigest() == hashed_password
@@ -178,6 +238,14 @@ def verify_token(token: str):
     except jwt.InvalidTokenError:
         return None
 
+def token_expiry(token: str) -> Optional[float]:
+    """Expiry of an already verified token as a Unix timestamp, or None if it has none"""
+    try:
+        expires = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("exp")
+    except jwt.InvalidTokenError:
+        return None
+    return float(expires) if expires is not None else None
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """Get current user from JWT token"""
     credentials_exception = HTTPException(
@@ -190,24 +258,90 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     if email is None:
         raise credentials_exception
     
-    user = users_db.get(email)
+    user = await store.users.get_by_email(email)
     if user is None:
         raise credentials_exception
     
     return user
 
+@app.on_event("startup")
+async def start_logging():
+    log_pipeline.start()
+
+@app.on_event("startup")
+async def start_pdf_pool():
+    if generate_paycheck_pdf is not None:
+        pdf_pool.start()
+
+@app.on_event("shutdown")
+async def stop_pdf_pool():
+    pdf_pool.shutdown()
+
+@app.on_event("startup")
+async def open_store():
+    await store.open(SEED_USERS.values(), SEED_REQUESTS.values())
+
+@app.on_event("startup")
+async def start_digest_flusher():
+    app.state.digest_task = asyncio.create_task(run_digest_flusher())
+
+@app.on_event("shutdown")
+async def stop_digest_flusher():
+    app.state.digest_task.cancel()
+
+@app.on_event("shutdown")
+async def close_store():
+    store.close()
+
+@app.on_event("shutdown")
+async def stop_logging():
+    # Registered last so records from the other shutdown hooks are flushed
+    log_pipeline.stop()
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header (possibly a list or weak tags) against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def pdf_busy_exception(error: PDFQueueFullError) -> HTTPException:
+    """429 response telling the client when to retry a PDF download"""
+    return HTTPException(
+        status_code=429,
+        detail="PDF generation is busy, please retry shortly",
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
 @app.get("/")
 async def root():
     return {"message": "Payment Management Test API", "status": "running"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus text-format metrics"""
+    return metrics_response()
+
 @app.get("/health")
+@app.get("/health/live")
 async def health():
-    return {"status": "healthy"}
+    """Liveness: the process is running"""
+    return health_checks.liveness()
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness: the store answers and the PDF render queue has room"""
+    checks = {}
+    if store.client is not None:
+        checks["mongo"] = health_checks.check_mongo(store.client)
+    if generate_paycheck_pdf is not None:
+        checks["pdf_queue"] = health_checks.check_pdf_queue(pdf_pool)
+    return await health_checks.readiness(checks)
 
 @app.post("/api/auth/login", response_model=LoginResponse)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """Login endpoint"""
-    user = users_db.get(form_data.username)
+    user = await store.users.get_by_email(form_data.username)
     if not user or not verify_password(form_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=401,
@@ -249,7 +383,7 @@ async def create_admin_user(admin_secret: str = Form(...)):
         raise HTTPException(status_code=403, detail="Invalid admin creation secret")
     
     # Check if admin already exists
-    if "admin@paymentpro.com" in users_db:
+    if await store.users.get_by_email("admin@paymentpro.com") is not None:
         raise HTTPException(status_code=400, detail="Admin user already exists")
     
     # Create admin user
@@ -261,7 +395,7 @@ async def create_admin_user(admin_secret: str = Form(...)):
         "role": "admin"
     }
     
-    users_db["admin@paymentpro.com"] = admin_user
+    await store.users.add(admin_user)
     
     return {"message": "Admin user created successfully", "email": "admin@paymentpro.com"}
 
@@ -305,7 +439,8 @@ async def create_request(
         "rejection_reason": None
     }
     
-    requests_db[request_id] = request_data
+    await store.requests.add(request_data)
+    publish_request_event(REQUEST_CREATED, request_data)
     
     # Send notification to manager (mock)
     await send_new_request_notification(request_data, current_user)
@@ -315,6 +450,13 @@ async def create_request(
         "request_id": request_id
     }
 
+def log_mock_email(recipient_role: str, to: str, subject: str, message: str, request_id: Optional[str]):
+    """Record a mock email as an email.sent event; the body is only kept at DEBUG"""
+    fields = {"recipient_role": recipient_role, "to": to, "subject": subject, "payment_request_id": request_id}
+    if logger.isEnabledFor(logging.DEBUG):
+        fields["body"] = message.strip()
+    log_event(logger, "email.sent", **fields)
+
 async def send_new_request_notification(request: dict, employee: dict):
     """Mock email notification for new request submission"""
     # In real app, find manager email from database
@@ -339,16 +481,112 @@ async def send_new_request_notification(request: dict, employee: dict):
     Payment Management System
     """
     
-    # Mock email sending
-    print(f"""
-    📧 EMAIL SENT TO MANAGER
-    To: {manager_email}
-    Subject: {subject}
-    Message: {message.strip()}
-    """)
+    # Respect the approver's saved notification preferences (settings page)
+    manager = await store.users.get_by_email(manager_email) or {}
+    if not wants_email(manager):
+        return False
+    
+    frequency = notification_frequency(manager)
+    if frequency != IMMEDIATE:
+        # Parked until the approver's hourly/daily/weekly window closes (see flush_digests)
+        now = datetime.utcnow()
+        await store.digests.add({
+            "id": str(uuid.uuid4()),
+            "approver_email": manager_email,
+            "approver_name": manager.get("full_name", ""),
+            "frequency": frequency,
+            "window_end": digest_window_end(frequency, now),
+            "claimed_by": None,
+            "claimed_at": None,
+            "employee_name": employee["full_name"],
+            "request_type": request["request_type"],
+            "amount": request["amount"],
+            "request_id": request["id"],
+            "created_at": now
+        })
+        return True
+    
+    # Mock email sending: logged through the background log writer
+    log_mock_email("manager", manager_email, subject, message, request["id"])
     
     return True
 
+# How often closed digest windows are checked, and when a stuck claim is retaken
+DIGEST_FLUSH_SECONDS = float(os.getenv("DIGEST_FLUSH_SECONDS", "60"))
+DIGEST_CLAIM_LEASE = timedelta(seconds=int(os.getenv("DIGEST_CLAIM_LEASE_SECONDS", "300")))
+
+async def flush_digests() -> int:
+    """Send one digest email per approver for every closed window; returns emails sent"""
+    now = datetime.utcnow()
+    claim = uuid.uuid4().hex
+    items = await store.digests.claim_due(now, claim, now - DIGEST_CLAIM_LEASE)
+    if not items:
+        return 0
+    
+    try:
+        groups = group_digest_items(items)
+        for group in groups:
+            lines = "\n".join(
+                f"    - {notice['employee_name']}: {notice['request_type'].replace('_', ' ').title()} "
+                f"${notice['amount']:,.2f}"
+                for notice in group["notices"]
+            )
+            subject = f"🔔 {len(group['notices'])} payment request(s) awaiting approval ({group['frequency']} digest)"
+            message = f"""
+    Dear {group['approver_name'] or 'Manager'},
+
+    These payment requests were submitted for your approval:
+
+{lines}
+
+    Please review and approve/reject them in the system.
+
+    Best regards,
+    Payment Management System
+    """
+            log_mock_email("manager", group["approver_email"], subject, message, None)
+    except Exception:
+        # Hand the items back so the next flush retries them
+        await store.digests.release(claim)
+        raise
+    
+    await store.digests.delete_claimed(claim)
+    return len(groups)
+
+async def run_digest_flusher():
+    while True:
+        try:
+            await flush_digests()
+        except Exception:
+            logger.exception("digest.flush_failed")
+        await asyncio.sleep(DIGEST_FLUSH_SECONDS)
+
+def publish_request_event(event_type: str, request: dict, *user_ids: str):
+    """
+    Push a request event to everyone whose /api/requests list includes it:
+    the employee, HR/admin, and managers (who see every pending request).
+    """
+    request_events.publish(
+        event_type,
+        request,
+        user_ids=(request["employee_id"], *user_ids),
+        roles=("manager", "hr", "admin")
+    )
+
+@app.get("/api/events/stream")
+async def stream_request_events(token: str = Query(...)):
+    """
+    Server-Sent Events for request.created / request.decided, replacing
+    list polling. EventSource cannot send headers, so the token is a
+    query parameter. The stream ends with an `expired` event when the
+    token expires.
+    """
+    current_user = await get_current_user(token)
+    try:
+        return request_events.stream(current_user["id"], current_user["role"], token_expiry(token))
+    except EventHubFullError:
+        raise HTTPException(status_code=503, detail="Too many event streams, please retry shortly", headers={"Retry-After": "5"})
+
 @app.get("/api/requests", response_model=List[RequestResponse])
 async def get_requests(
     status: Optional[str] = None,
@@ -356,26 +594,24 @@ async def get_requests(
 ):
     """Get payment requests based on user role"""
     
-    filtered_requests = []
-    
-    for request in requests_db.values():
-        # Role-based filtering
-        if current_user["role"] == "employee":
-            # Employees only see their own requests
-            if request["employee_id"] != current_user["id"]:
-                continue
-        elif current_user["role"] == "manager":
-            # Managers see requests they can approve + their own
-            if (request["employee_id"] != current_user["id"] and 
-                request["status"] != "pending"):
-                continue
+    # Role-based filtering, served from the store's secondary indexes
+    if current_user["role"] == "employee":
+        # Employees only see their own requests
+        visible = await store.requests.by_employee(current_user["id"], status)
+    elif current_user["role"] == "manager":
+        # Managers see requests they can approve + their own
+        visible = {req["id"]: req for req in await store.requests.by_employee(current_user["id"], status)}
+        if status in (None, "pending"):
+            for req in await store.requests.by_status("pending"):
+                visible.setdefault(req["id"], req)
+        visible = visible.values()
+    elif status:
         # HR and Admin see all requests
-        
-        # Status filtering
-        if status and request["status"] != status:
-            continue
-            
-        filtered_requests.append(RequestResponse(**request))
+        visible = await store.requests.by_status(status)
+    else:
+        visible = await store.requests.list_all()
+    
+    filtered_requests = [RequestResponse(**request) for request in visible]
     
     # Sort by creation date (newest first)
     filtered_requests.sort(key=lambda x: x.created_at, reverse=True)
@@ -389,11 +625,10 @@ async def get_request(
 ):
     """Get specific payment request"""
     
-    if request_id not in requests_db:
+    request = await store.requests.get(request_id)
+    if request is None:
         raise HTTPException(status_code=404, detail="Request not found")
     
-    request = requests_db[request_id]
-    
     # Check permissions
     can_view = (
         request["employee_id"] == current_user["id"] or  # Own request
@@ -413,11 +648,10 @@ async def approve_reject_request(
 ):
     """Approve or reject a payment request"""
     
-    if request_id not in requests_db:
+    request = await store.requests.get(request_id)
+    if request is None:
         raise HTTPException(status_code=404, detail="Request not found")
     
-    request = requests_db[request_id]
-    
     # Check permissions
     if current_user["role"] not in ["manager", "hr", "admin"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -445,6 +679,9 @@ async def approve_reject_request(
     if approval.status == "rejected":
         request["rejection_reason"] = approval.comments
     
+    await store.requests.save(request)
+    publish_request_event(REQUEST_DECIDED, request, current_user["id"])
+    
     # Send email notifications
     await send_email_notification(request, approval.status, current_user, approval.comments)
     
@@ -496,21 +733,24 @@ async def send_email_notification(request: dict, status: str, approver: dict, co
         """
     
     # Mock email sending (in production, use SendGrid, etc.)
-    print(f"""
-    📧 EMAIL SENT
-    To: {employee_email}
-    Subject: {subject}
-    Message: {message.strip()}
-    """)
+    log_mock_email("employee", employee_email, subject, message, request["id"])
     
     return True
 
 
 # PDF Generation Endpoints
 @app.get("/api/reports/paycheck/{request_id}")
-async def generate_paycheck(request_id: str, token: str = Depends(oauth2_scheme)):
+async def generate_paycheck(
+    request_id: str,
+    token: str = Depends(oauth2_scheme),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Generate PDF paycheck for an approved payment request
+
+    Paychecks render deterministically, so the content fingerprint doubles as
+    the ETag: a matching If-None-Match gets a 304 and a repeat download is
+    served from the cache instead of being rebuilt.
     """
     if generate_paycheck_pdf is None:
         raise HTTPException(status_code=500, detail="PDF generation not available")
@@ -521,12 +761,12 @@ async def generate_paycheck(request_id: str, token: str = Depends(oauth2_scheme)
         raise HTTPException(status_code=401, detail="Invalid token")
     
     # Get full user object
-    current_user = users_db.get(email)
+    current_user = await store.users.get_by_email(email)
     if not current_user:
         raise HTTPException(status_code=401, detail="User not found")
     
     # Get request
-    request_data = requests_db.get(request_id)
+    request_data = await store.requests.get(request_id)
     if not request_data:
         raise HTTPException(status_code=404, detail="Request not found")
     
@@ -543,13 +783,7 @@ async def generate_paycheck(request_id: str, token: str = Depends(oauth2_scheme)
         raise HTTPException(status_code=403, detail="Not authorized to generate paycheck for this request")
     
     # Get employee data
-    employee_email = request_data['employee_email']
-    employee_data = None
-    for user in users_db.values():
-        if user['email'] == employee_email:
-            employee_data = user
-            break
-    
+    employee_data = await store.users.get_by_email(request_data['employee_email'])
     if not employee_data:
         raise HTTPException(status_code=404, detail="Employee not found")
     
@@ -558,23 +792,214 @@ async def generate_paycheck(request_id: str, token: str = Depends(oauth2_scheme)
         if generate_paycheck_pdf is None:
             raise HTTPException(status_code=500, detail="PDF generation not available - ReportLab not installed")
         
-        # Generate PDF
-        pdf_content = generate_paycheck_pdf(request_data, employee_data)
+        fingerprint = paycheck_fingerprint(request_data, employee_data)
+        etag = f'"{fingerprint}"'
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=cache_headers)
+        
+        pdf_content = await paycheck_cache.get(fingerprint)
+        cache_status = "HIT"
+        if pdf_content is None:
+            # Generate PDF in a worker process
+            pdf_content = await pdf_pool.render(generate_paycheck_pdf, request_data, employee_data)
+            await paycheck_cache.put(fingerprint, pdf_content)
+            cache_status = "MISS"
         
         # Create filename
         filename = f"paycheck_{request_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
         
-        # Return PDF as streaming response
-        return StreamingResponse(
-            io.BytesIO(pdf_content),
+        return Response(
+            content=pdf_content,
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers={
+                **cache_headers,
+                "Content-Disposition": f"attachment; filename={filename}",
+                "X-Cache": cache_status
+            }
         )
+    except PDFQueueFullError as e:
+        raise pdf_busy_exception(e)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error generating PDF: {e}")
+        logger.exception("pdf.paycheck_failed", extra={"payment_request_id": request_id})
         raise HTTPException(status_code=500, detail="Failed to generate PDF")
 
 
+# Upper bound on paychecks per batch export
+PAYCHECK_BATCH_LIMIT = int(os.getenv("PAYCHECK_BATCH_LIMIT", "5000"))
+# Merged PDFs are rendered by one worker and held in memory, so they get a much smaller cap
+PAYCHECK_MERGED_LIMIT = int(os.getenv("PAYCHECK_MERGED_LIMIT", "200"))
+
+# Rows read from the store per batch when spooling a summary report
+REPORT_SPOOL_BATCH = int(os.getenv("REPORT_SPOOL_BATCH", "1000"))
+
+class ZipChunkWriter(io.RawIOBase):
+    """Write-only, non-seekable sink that lets zipfile output be streamed in chunks"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        """Return and forget everything written since the last drain"""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class LeasedStreamingResponse(StreamingResponse):
+    """
+    Streaming response that returns its PDF pool slots when it ends
+
+    Releasing in the body generator alone is not enough: if the client is
+    gone before the body is first iterated, the generator never starts and
+    its finally block never runs.
+    """
+
+    def __init__(self, content, lease: PDFSlotLease, **kwargs):
+        super().__init__(content, **kwargs)
+        self.lease = lease
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.lease.release()
+
+async def select_batch_paychecks(batch: PaycheckBatchRequest, current_user: dict) -> List[tuple]:
+    """Resolve a batch filter to (request, employee) pairs the user may export"""
+    approved_statuses = ['approved', 'approved_final']
+    can_export_all = current_user.get('role') in ['manager', 'hr', 'admin']
+
+    if batch.request_ids is not None:
+        candidates = await store.requests.get_many(batch.request_ids)
+    elif not can_export_all:
+        candidates = await store.requests.by_employee(current_user['id'], batch.status)
+    else:
+        candidates = await store.requests.by_status(*([batch.status] if batch.status else approved_statuses))
+
+    employees = {}
+    selected = []
+    for request in candidates:
+        if request['status'] not in approved_statuses:
+            continue
+        if batch.status and request['status'] != batch.status:
+            continue
+        if not can_export_all and request['employee_id'] != current_user['id']:
+            continue
+
+        req_date = request.get('created_at', '')[:10]
+        if batch.start_date and req_date < batch.start_date:
+            continue
+        if batch.end_date and req_date > batch.end_date:
+            continue
+
+        email = request['employee_email']
+        if email not in employees:
+            employees[email] = await store.users.get_by_email(email)
+        employee = employees[email]
+        if employee is None:
+            continue
+        if batch.department and employee.get('department') != batch.department:
+            continue
+
+        selected.append((request, employee))
+        if len(selected) > PAYCHECK_BATCH_LIMIT:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Batch exceeds {PAYCHECK_BATCH_LIMIT} paychecks, narrow the filter"
+            )
+
+    return selected
+
+async def stream_paycheck_zip(paychecks: List[tuple], lease: PDFSlotLease):
+    """Render paychecks in parallel and stream them into a ZIP as each one finishes"""
+    sink = ZipChunkWriter()
+    failed = []
+    slots = lease.slots
+    try:
+        # PDFs are already compressed, so store them as-is to keep the event loop free
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+            jobs = ((request['id'], (request, employee)) for request, employee in paychecks)
+            async for request_id, pdf_content, error in pdf_pool.render_many(generate_paycheck_pdf, jobs, slots):
+                if error is not None:
+                    logger.error("pdf.paycheck_failed", extra={"payment_request_id": request_id, "error": str(error)})
+                    failed.append(request_id)
+                    continue
+                archive.writestr(f"paycheck_{request_id}.pdf", pdf_content)
+                yield sink.drain()
+
+            if failed:
+                archive.writestr("FAILED.txt", "\n".join(failed) + "\n")
+        yield sink.drain()
+    finally:
+        lease.release()
+
+@app.post("/api/reports/paychecks/batch")
+async def generate_paycheck_batch(
+    batch: PaycheckBatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Export paychecks for many approved requests in one download
+
+    Select requests by `request_ids` or by status/date range/department, and
+    receive either a ZIP streamed as paychecks finish or one merged PDF.
+    """
+    if generate_paycheck_pdf is None:
+        raise HTTPException(status_code=500, detail="PDF generation not available")
+
+    if batch.format not in ['zip', 'pdf']:
+        raise HTTPException(status_code=400, detail="Format must be 'zip' or 'pdf'")
+
+    paychecks = await select_batch_paychecks(batch, current_user)
+    if not paychecks:
+        raise HTTPException(status_code=404, detail="No approved requests match the filter")
+
+    stamp = datetime.now().strftime('%Y%m%d')
+
+    if batch.format == 'pdf':
+        if len(paychecks) > PAYCHECK_MERGED_LIMIT:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Merged PDFs are limited to {PAYCHECK_MERGED_LIMIT} paychecks, use format 'zip'"
+            )
+        try:
+            pdf_content = await pdf_pool.render(generate_paycheck_bundle_pdf, paychecks)
+        except PDFQueueFullError as e:
+            raise pdf_busy_exception(e)
+        except Exception as e:
+            logger.exception("pdf.paycheck_bundle_failed", extra={"paychecks": len(paychecks)})
+            raise HTTPException(status_code=500, detail="Failed to generate PDF")
+
+        return Response(
+            content=pdf_content,
+            media_type="application/pdf",
+            headers={"Content-Disposition": f"attachment; filename=paychecks_{stamp}.pdf"}
+        )
+
+    # Claim worker slots up front so a saturated renderer answers 429 before streaming starts
+    try:
+        lease = pdf_pool.lease(min(pdf_pool.max_workers, len(paychecks)))
+    except PDFQueueFullError as e:
+        raise pdf_busy_exception(e)
+
+    return LeasedStreamingResponse(
+        stream_paycheck_zip(paychecks, lease),
+        lease,
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=paychecks_{stamp}.zip"}
+    )
+
+
 @app.get("/api/reports/summary")
 async def generate_summary_report(
     start_date: Optional[str] = None,
@@ -593,7 +1018,7 @@ async def generate_summary_report(
         raise HTTPException(status_code=401, detail="Invalid token")
     
     # Get full user object
-    current_user = users_db.get(email)
+    current_user = await store.users.get_by_email(email)
     if not current_user:
         raise HTTPException(status_code=401, detail="User not found")
     
@@ -603,23 +1028,9 @@ async def generate_summary_report(
         raise HTTPException(status_code=403, detail="Not authorized to generate summary reports")
     
     try:
-        # Get all requests (managers can see all, employees only their own)
-        all_requests = list(requests_db.values())
-        
-        # Filter by date range if provided
-        if start_date or end_date:
-            filtered_requests = []
-            for req in all_requests:
-                req_date = req.get('created_at', '')[:10]  # Get date part
-                
-                if start_date and req_date < start_date:
-                    continue
-                if end_date and req_date > end_date:
-                    continue
-                    
-                filtered_requests.append(req)
-            
-            all_requests = filtered_requests
+        # Check if PDF generation is available
+        if generate_report_pdf is None:
+            raise HTTPException(status_code=500, detail="PDF generation not available - ReportLab not installed")
         
         # Set up date range for report
         date_range = {
@@ -627,25 +1038,56 @@ async def generate_summary_report(
             'end_date': end_date or 'Present'
         }
         
-        # Check if PDF generation is available
-        if generate_report_pdf is None:
-            raise HTTPException(status_code=500, detail="PDF generation not available - ReportLab not installed")
-        
-        # Generate PDF
-        pdf_content = generate_report_pdf(all_requests, date_range)
+        # Claim a worker slot first so a saturated renderer answers 429 before any rows are read
+        pdf_pool.reserve()
+        try:
+            # One pass over the store: apply the date filter and keep only the
+            # columns the report prints. Rows are spooled to a temporary
+            # JSON-lines file a batch at a time and the worker reads them back
+            # lazily, so the full row set is never held or pickled in one piece.
+            spool = await asyncio.to_thread(
+                tempfile.NamedTemporaryFile, "w", suffix=".jsonl", delete=False, encoding="utf-8"
+            )
+            try:
+                async for batch in store.requests.iter_batches(REPORT_SPOOL_BATCH):
+                    lines = []
+                    for req in batch:
+                        req_date = (req.get('created_at') or '')[:10]  # Get date part
+                        
+                        if start_date and req_date < start_date:
+                            continue
+                        if end_date and req_date > end_date:
+                            continue
+                        
+                        row = {field: req.get(field) for field in REPORT_FIELDS}
+                        lines.append(json.dumps(row, default=str) + "\n")
+                    await asyncio.to_thread(spool.writelines, lines)
+                await asyncio.to_thread(spool.close)
+                
+                # Generate PDF in a worker process
+                pdf_content = await pdf_pool.run_reserved(generate_report_pdf, JsonLinesRows(spool.name), date_range)
+            finally:
+                await asyncio.to_thread(spool.close)
+                await asyncio.to_thread(os.remove, spool.name)
+        finally:
+            pdf_pool.release()
         
         # Create filename
         filename = f"payment_summary_{datetime.now().strftime('%Y%m%d')}.pdf"
         
         # Return PDF as streaming response
-        return StreamingResponse(
-            io.BytesIO(pdf_content),
+        return Response(
+            content=pdf_content,
             media_type="application/pdf",
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
         
+    except PDFQueueFullError as e:
+        raise pdf_busy_exception(e)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error generating summary report: {e}")
+        logger.exception("pdf.summary_report_failed")
         raise HTTPException(status_code=500, detail="Failed to generate report")
 
 
@@ -653,6 +1095,9 @@ async def generate_summary_report(
 async def get_analytics_data(token: str = Depends(oauth2_scheme)):
     """
     Get analytics data for dashboard charts
+
+    Served from the store's incrementally maintained aggregates, so the cost
+    does not grow with request history.
     """
     # Verify token and get user
     email = verify_token(token)
@@ -660,41 +1105,47 @@ async def get_analytics_data(token: str = Depends(oauth2_scheme)):
         raise HTTPException(status_code=401, detail="Invalid token")
     
     # Get user from database
-    current_user = users_db.get(email)
+    current_user = await store.users.get_by_email(email)
     if not current_user:
         raise HTTPException(status_code=401, detail="User not found")
     
     user_role = current_user.get('role', '')
     
-    # Get requests based on user role
+    # Read the pre-aggregated counters for the user's scope (kept current on create/approve/reject)
     if user_role in ['manager', 'hr', 'admin']:
         # Managers can see all requests
-        all_requests = list(requests_db.values())
+        aggregate = await store.analytics.get(ALL_SCOPE)
     else:
         # Employees can only see their own requests
-        user_id = current_user['id']
-        all_requests = [req for req in requests_db.values() if req['employee_id'] == user_id]
+        aggregate = await store.analytics.get(employee_scope(current_user['id']))
     
-    # Calculate analytics
-    total_requests = len(all_requests)
-    approved_count = len([req for req in all_requests if req['status'] in ['approved', 'approved_final']])
-    pending_count = len([req for req in all_requests if req['status'] == 'pending'])
-    rejected_count = len([req for req in all_requests if req['status'] == 'rejected'])
+    statuses = aggregate['statuses']
+    total_requests = aggregate['total']
+    approved_count = sum(statuses.get(name, 0) for name in APPROVED_STATUSES)
+    pending_count = statuses.get('pending', 0)
+    rejected_count = statuses.get('rejected', 0)
     
     # Request types breakdown
     request_types = {}
-    for req in all_requests:
-        req_type = req.get('request_type', 'Unknown').title()
-        request_types[req_type] = request_types.get(req_type, 0) + 1
-    
-    # Monthly trends (simplified for demo)
-    monthly_data = {
-        'October 2025': total_requests  # Simplified - in real app would calculate by month
-    }
+    for req_type, count in aggregate['types'].items():
+        if count:
+            label = req_type.title()
+            request_types[label] = request_types.get(label, 0) + count
+    
+    # Monthly trends, oldest month first
+    monthly_data = {}
+    for month, count in sorted(aggregate['months'].items()):
+        if not count:
+            continue
+        try:
+            label = datetime.strptime(month, '%Y-%m').strftime('%B %Y')
+        except ValueError:
+            label = month
+        monthly_data[label] = monthly_data.get(label, 0) + count
     
     # Amount statistics
-    total_amount_requested = sum(req.get('amount', 0) for req in all_requests)
-    total_amount_approved = sum(req.get('amount', 0) for req in all_requests if req['status'] in ['approved', 'approved_final'])
+    total_amount_requested = aggregate['amount_requested']
+    total_amount_approved = aggregate['amount_approved']
     
     analytics_data = {
         'summary': {
@@ -726,7 +1177,7 @@ async def update_user_profile(request: Request):
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = users_db.get(email)
+    user = await store.users.get_by_email(email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
@@ -747,7 +1198,7 @@ async def update_user_profile(request: Request):
         user['updated_at'] = datetime.now().isoformat()
         
         # Update in database
-        users_db[email] = user
+        await store.users.save(user)
         
         return {"message": "Profile updated successfully", "user": user}
         
@@ -763,7 +1214,7 @@ async def change_password(request: Request):
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = users_db.get(email)
+    user = await store.users.get_by_email(email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
@@ -788,7 +1239,7 @@ async def change_password(request: Request):
         user['updated_at'] = datetime.now().isoformat()
         
         # Update in database
-        users_db[email] = user
+        await store.users.save(user)
         
         return {"message": "Password changed successfully"}
         
@@ -806,7 +1257,7 @@ async def update_notification_settings(request: Request):
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = users_db.get(email)
+    user = await store.users.get_by_email(email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
@@ -822,7 +1273,7 @@ async def update_notification_settings(request: Request):
         user['updated_at'] = datetime.now().isoformat()
         
         # Update in database
-        users_db[email] = user
+        await store.users.save(user)
         
         return {"message": "Notification settings updated successfully"}
         
@@ -838,7 +1289,7 @@ async def update_security_settings(request: Request):
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = users_db.get(email)
+    user = await store.users.get_by_email(email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
@@ -854,7 +1305,7 @@ async def update_security_settings(request: Request):
         user['updated_at'] = datetime.now().isoformat()
         
         # Update in database
-        users_db[email] = user
+        await store.users.save(user)
         
         return {"message": "Security settings updated successfully"}
         
@@ -870,7 +1321,7 @@ async def update_user_preferences(request: Request):
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = users_db.get(email)
+    user = await store.users.get_by_email(email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
@@ -886,7 +1337,7 @@ async def update_user_preferences(request: Request):
         user['updated_at'] = datetime.now().isoformat()
         
         # Update in database
-        users_db[email] = user
+        await store.users.save(user)
         
         return {"message": "Preferences updated successfully"}
         
@@ -904,7 +1355,7 @@ async def update_company_settings(request: Request):
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = users_db.get(email)
+    user = await store.users.get_by_email(email)
     if not user or user.get('role') not in ['hr', 'admin']:
         raise HTTPException(status_code=403, detail="Not authorized to update company settings")
     
@@ -926,7 +1377,7 @@ async def get_all_users(current_user: dict = Depends(get_current_user)):
     
     # Return all users without passwords
     users_list = []
-    for email, user_data in users_db.items():
+    for user_data in await store.users.list_all():
         users_list.append({
             "id": user_data["id"],
             "email": user_data["email"],
@@ -948,7 +1399,7 @@ async def update_system_settings(request: Request):
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = users_db.get(email)
+    user = await store.users.get_by_email(email)
     if not user or user.get('role') != 'admin':
         raise HTTPException(status_code=403, detail="Not authorized to update system settings")
     
@@ -971,7 +1422,7 @@ async def get_user_settings(request: Request):
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = users_db.get(email)
+    user = await store.users.get_by_email(email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
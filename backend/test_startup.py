@@ -0,0 +1,23 @@
+"""
+Startup tests - the app package comes up (live, not ready) while MongoDB is unreachable
+"""
+
+from fastapi.testclient import TestClient
+
+
+def test_startup_survives_an_unreachable_mongo(monkeypatch):
+    # Nothing listens on port 1; fail server selection quickly
+    monkeypatch.setenv("MONGODB_URL", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=300")
+    monkeypatch.setenv("DATABASE_NAME", "payment_management_test")
+    monkeypatch.setenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "300")
+    monkeypatch.setenv("MONGO_WARMUP_CONNECTIONS", "1")
+    from app.database import db
+    from app.main import app
+
+    with TestClient(app) as client:
+        assert client.get("/health/live").status_code == 200
+        ready = client.get("/health/ready")
+        assert ready.status_code == 503
+        assert ready.json()["checks"]["warm_up"]["ok"] is False
+        # Warm-up (and index creation after it) keeps retrying in the background
+        assert db.warm_up_task is not None and not db.warm_up_task.done()
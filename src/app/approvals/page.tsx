@@ -20,7 +20,7 @@ import {
   X
 } from 'lucide-react'
 import Link from 'next/link'
-import api from '@/lib/api'
+import api, { subscribeToRequestEvents, RequestEvent } from '@/lib/api'
 
 interface PaymentRequest {
   id: string
@@ -44,8 +44,29 @@ export default function ApprovalsPage() {
 
   useEffect(() => {
     fetchPendingRequests()
+
+    // Keep the queue current from pushed events instead of refetching
+    let connected = false
+    return subscribeToRequestEvents(applyRequestEvent, {
+      onOpen: () => {
+        // After a reconnect, refetch to pick up anything missed meanwhile
+        if (connected) fetchPendingRequests()
+        connected = true
+      }
+    })
   }, [])
 
+  const applyRequestEvent = ({ request }: RequestEvent) => {
+    setRequests((current) => {
+      const others = current.filter((req) => req.id !== request.id)
+      if (request.status !== 'pending') {
+        return others
+      }
+      const existing = current.find((req) => req.id === request.id)
+      return [{ ...existing, ...request } as PaymentRequest, ...others]
+    })
+  }
+
   const fetchPendingRequests = async () => {
     try {
       setLoading(true)
@@ -35,7 +35,7 @@ interface UserSettings {
     requestUpdates: boolean
     approvalReminders: boolean
     systemUpdates: boolean
-    notificationFrequency: 'immediate' | 'daily' | 'weekly'
+    notificationFrequency: 'immediate' | 'hourly' | 'daily' | 'weekly'
   }
   security: {
     twoFactorEnabled: boolean
@@ -636,12 +636,13 @@ export default function SettingsPage() {
                       ...userSettings,
                       notifications: { 
                         ...userSettings.notifications, 
-                        notificationFrequency: e.target.value as 'immediate' | 'daily' | 'weekly'
+                        notificationFrequency: e.target.value as 'immediate' | 'hourly' | 'daily' | 'weekly'
                       }
                     })}
                     className="w-full px-3 py-2 border border-gray-300 dark:border-gray-600 rounded-lg focus:ring-2 focus:ring-orange-500 focus:border-transparent bg-white dark:bg-gray-700 text-gray-900 dark:text-white"
                   >
                     <option value="immediate">Immediate</option>
+                    <option value="hourly">Hourly Digest</option>
                     <option value="daily">Daily Digest</option>
                     <option value="weekly">Weekly Summary</option>
                   </select>
@@ -33,3 +33,68 @@ api.interceptors.response.use(
 )
 
 export default api
+
+export type RequestEventType = 'request.created' | 'request.decided'
+
+export interface RequestEvent {
+  type: RequestEventType
+  request: {
+    id: string
+    employee_id: string
+    employee_name: string
+    employee_email: string
+    request_type: string
+    amount: number
+    description: string
+    status: string
+    current_approver_id?: string | null
+    created_at: string
+    updated_at: string
+  }
+}
+
+interface SubscribeOptions {
+  // Called when the stream (re)connects; refetch here to catch events missed while disconnected
+  onOpen?: () => void
+}
+
+// Subscribe to request.created / request.decided events for the signed-in user
+// (filtered server-side like GET /api/requests). Returns an unsubscribe function.
+export function subscribeToRequestEvents(
+  onEvent: (event: RequestEvent) => void,
+  options: SubscribeOptions = {}
+): () => void {
+  if (typeof EventSource === 'undefined') {
+    return () => {}
+  }
+
+  let source: EventSource | null = null
+  const handle = (message: MessageEvent) => onEvent(JSON.parse(message.data) as RequestEvent)
+
+  const open = (token: string) => {
+    // EventSource cannot send headers, so the token goes in the query string
+    const current = new EventSource(`${API_URL}/api/events/stream?token=${encodeURIComponent(token)}`)
+    current.addEventListener('ready', () => options.onOpen?.())
+    current.addEventListener('request.created', handle as EventListener)
+    current.addEventListener('request.decided', handle as EventListener)
+    // The server ends the stream when its token expires; reconnecting with the
+    // same URL would be rejected, so reopen only once a fresh token is stored
+    current.addEventListener('expired', () => {
+      current.close()
+      source = null
+      const latest = localStorage.getItem('token')
+      if (latest && latest !== token) {
+        open(latest)
+      }
+    })
+    source = current
+  }
+
+  const token = localStorage.getItem('token')
+  if (!token) {
+    return () => {}
+  }
+  open(token)
+
+  return () => source?.close()
+}